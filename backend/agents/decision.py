@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from .. import config
+from ..memory import memory
+from ..metrics import registry, record_stage
+from ..models.records import Stage as ApplicationStage
+
+logger = logging.getLogger(__name__)
+
+# Documents needed for a final decision and the verdict field each one must pass
+REQUIRED_DOCUMENTS = {"pan": "pan_valid", "aadhaar": "aadhaar_valid", "salary_slip": "salary_slip_valid"}
+
+# Seconds over which stats() reports jobs finished per second
+THROUGHPUT_WINDOW = 60
+
+stage_jobs = registry.counter(
+    "loan_pipeline_jobs_total", "Pipeline jobs finished per stage and outcome", labels=("stage", "outcome"))
+
+
+class StageSaturated(Exception):
+    """Raised when a stage already has max_queue jobs waiting for a slot"""
+
+
+class UnknownApplication(Exception):
+    """Raised when documents are recorded for a session that doesn't exist (or expired)"""
+
+
+class Stage:
+    """One pipeline step with its own concurrency limit and bounded queue.
+
+    Up to ``concurrency`` jobs run at once and up to ``max_queue`` more wait
+    for a slot; beyond that jobs are refused with StageSaturated. Stages
+    never share slots, so a backlog of OCR can't delay a chat turn.
+    """
+
+    def __init__(self, name, concurrency, max_queue):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self._slots = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+        self._finished = deque()  # completion times within THROUGHPUT_WINDOW
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the stage's slots for the enclosed block"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            self._rejected += 1
+            stage_jobs.inc(stage=self.name, outcome="rejected")
+            raise StageSaturated(f"{self.name} stage is busy, {self._waiting} jobs already waiting")
+
+        self._waiting += 1
+        started = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        record_stage(f"{self.name}_queue_wait", time.perf_counter() - started)
+
+        self._in_flight += 1
+        started = time.perf_counter()
+        outcome = "failed"
+        try:
+            yield
+            outcome = "completed"
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+            now = time.perf_counter()
+            self._busy_seconds += now - started
+            if outcome == "completed":
+                self._completed += 1
+                self._finished.append(now)
+            else:
+                self._failed += 1
+            stage_jobs.inc(stage=self.name, outcome=outcome)
+
+    async def run(self, func, *args, **kwargs):
+        """Run func in a slot; plain functions go to a thread, since they touch the session store"""
+        async with self.slot():
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    def stats(self):
+        cutoff = time.perf_counter() - THROUGHPUT_WINDOW
+        while self._finished and self._finished[0] < cutoff:
+            self._finished.popleft()
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "busy_seconds_total": round(self._busy_seconds, 3),
+            "per_second": round(len(self._finished) / THROUGHPUT_WINDOW, 3),
+        }
+
+
+def salary_check(slip, declared):
+    """Compare the net salary read from a salary slip verdict with the declared salary; None if either is unknown"""
+    net_salary = (slip or {}).get("net_salary")
+    if not net_salary or not declared:
+        return None
+    difference = abs(net_salary - declared) / declared
+    return {"declared_salary": declared, "net_salary": net_salary, "difference": round(difference, 3),
+            "matches": difference <= config.SALARY_MATCH_TOLERANCE}
+
+
+def final_decision(state):
+    """Combine the underwriting result with the document verdicts of one application (a SessionState)"""
+    underwriting = state.underwriting_result
+    if not underwriting or not underwriting.get("eligible"):
+        return {"status": "not_eligible", "reason": "The application has not passed underwriting."}
+
+    documents = state.documents
+    missing = [doc for doc in REQUIRED_DOCUMENTS if doc not in documents]
+    failed = [doc for doc, field in REQUIRED_DOCUMENTS.items() if doc in documents and not documents[doc].get(field)]
+    check = salary_check(documents.get("salary_slip"), state.applicant.salary)
+    mismatch = check is not None and not check["matches"] and "salary_slip" not in failed
+    if mismatch:
+        failed.append("salary_slip")
+    decision = {"missing_documents": missing, "failed_documents": failed, "salary_check": check,
+                "risk_score": underwriting.get("risk_score"), "loan_amount": state.applicant.loan_amount}
+    if mismatch and len(failed) == 1:
+        decision.update(status="documents_rejected",
+                        reason=f"The net salary on the salary slip (₹{check['net_salary']:,}) doesn't match "
+                               f"the declared monthly salary (₹{check['declared_salary']:,}).")
+    elif failed:
+        decision.update(status="documents_rejected",
+                        reason=f"Could not verify: {', '.join(failed)}. Please upload clearer copies.")
+    elif missing:
+        decision.update(status="awaiting_documents", reason=f"Still needed: {', '.join(missing)}.")
+    else:
+        decision.update(status="approved", reason="Underwriting passed and every document is verified.")
+    return decision
+
+
+class ApplicationPipeline:
+    """Extraction -> underwriting -> OCR per document -> final decision.
+
+    Each stage runs under its own Stage limits. The application's state
+    (stage, underwriting_result, documents, final_decision) lives in the
+    session's SessionState next to the applicant, so with a shared
+    SESSION_BACKEND it is seen by every worker and survives restarts.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or memory
+        self.stages = {
+            "extraction": Stage("extraction", config.PIPELINE_EXTRACTION_CONCURRENCY, config.PIPELINE_MAX_QUEUE),
+            "underwriting": Stage("underwriting", config.PIPELINE_UNDERWRITING_CONCURRENCY, config.PIPELINE_MAX_QUEUE),
+            "ocr": Stage("ocr", config.PIPELINE_OCR_CONCURRENCY, config.PIPELINE_MAX_QUEUE),
+            "decision": Stage("decision", config.PIPELINE_DECISION_CONCURRENCY, config.PIPELINE_MAX_QUEUE),
+        }
+
+    async def run(self, stage, func, *args, **kwargs):
+        return await self.stages[stage].run(func, *args, **kwargs)
+
+    async def record_documents(self, session_id, verdicts):
+        """Store document verdicts ({doc_type: verdict}) and decide the application again.
+
+        Unknown document types and verdicts that carry an error are ignored.
+        Returns the application's status.
+        """
+        verdicts = {doc: verdict for doc, verdict in verdicts.items()
+                    if doc in REQUIRED_DOCUMENTS and "error" not in verdict}
+        return await self.run("decision", self._decide, session_id, verdicts)
+
+    def _decide(self, session_id, verdicts):
+        def apply(state):
+            # Checked inside the update, so a session that expires meanwhile isn't recreated;
+            # raising leaves the store untouched
+            if state.empty:
+                raise UnknownApplication(f"Unknown or expired application '{session_id}'")
+            state.documents.update(verdicts)
+            decision = final_decision(state)
+            decision["decided_at"] = time.time()
+            state.final_decision = decision
+            if decision["status"] == "approved":
+                state.stage = ApplicationStage.APPROVED
+            return state
+
+        state = self.store.atomic_update(session_id, apply)
+        logger.info("Final decision for session %s: %s", session_id, state.final_decision["status"])
+        return self._status(state)
+
+    def _status(self, state):
+        return {
+            "stage": state.stage.label,
+            "underwriting_result": state.underwriting_result,
+            "documents": state.documents,
+            "final_decision": state.final_decision or final_decision(state),
+        }
+
+    def status(self, session_id):
+        """The application's stage, results so far and final decision, or None if there is no such session"""
+        state = self.store.get(session_id)
+        return None if state.empty else self._status(state)
+
+    def stats(self):
+        return {name: stage.stats() for name, stage in self.stages.items()}
+
+
+pipeline = ApplicationPipeline()
@@ -0,0 +1,106 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from .rules import normalize_applicant
+from .. import config
+from ..single_flight import SingleFlight
+
+APPLICANT_FIELDS = ("name", "age", "employment_type", "salary", "credit_score", "loan_amount")
+
+
+class DecisionCache:
+    """Underwriting decisions keyed by applicant and policy version, with TTL and LRU eviction.
+
+    Retries, double-submits and a re-sent final chat turn all carry the same
+    six applicant fields, so they get the stored decision instead of another
+    LLM call. Concurrent identical requests share a single underwriting run.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = config.DECISION_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.max_entries = config.DECISION_CACHE_ENTRIES if max_entries is None else max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, decision)
+        self._pending = SingleFlight()  # key -> the underwriting run in flight
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._shared = 0
+
+    @staticmethod
+    def key(customer_data: dict, version: str):
+        """Hash of the normalized applicant fields and the policy version, or None if they don't parse"""
+        try:
+            applicant = normalize_applicant(customer_data)
+        except (TypeError, ValueError):
+            return None
+        applicant["name"] = " ".join(str(customer_data.get("name") or "").split())
+        fields = [applicant[field] for field in APPLICANT_FIELDS]
+        return hashlib.sha256(json.dumps([version, fields], ensure_ascii=False).encode()).hexdigest()
+
+    def lookup(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self._hits += 1
+        return copy.deepcopy(entry[1])
+
+    def store(self, key, decision: dict):
+        with self._lock:
+            self.entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(decision))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    async def get_or_compute(self, key, compute):
+        """Return (decision, cached). compute() returns (decision, cacheable)."""
+        if key is None or self.ttl <= 0:
+            decision, _ = await compute()
+            return decision, False
+
+        decision = self.lookup(key)
+        if decision is not None:
+            return decision, True
+
+        async def compute_and_store():
+            decision, cacheable = await compute()
+            if cacheable:
+                self.store(key, decision)
+            return decision
+
+        decision, shared = await self._pending.run(key, compute_and_store)
+        if shared:
+            # An identical application was already being underwritten
+            with self._lock:
+                self._shared += 1
+        # Every caller gets its own copy, as each one adds to it
+        return copy.deepcopy(decision), shared
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "shared_in_flight": self._shared,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else None,
+            }
+
+
+decision_cache = DecisionCache()
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import re
+from ..metrics import timed
+from ..models.records import parse_number
+
+# Verdict field each document type must pass
+VALID_FIELDS = {"pan": "pan_valid", "aadhaar": "aadhaar_valid", "salary_slip": "salary_slip_valid"}
+
+# Any SALARY_SLIP_MIN_KEYWORDS of these make a salary slip
+SALARY_SLIP_KEYWORDS = ("basic pay", "hra", "gross salary", "net salary", "basic salary", "bank name", "allowances")
+SALARY_SLIP_MIN_KEYWORDS = 2
+
+# Labels printed in front of a value, per field
+LABELS = {
+    "net_salary": ("net salary", "net pay", "take home", "net amount payable"),
+    "gross_salary": ("gross salary", "gross pay", "gross earnings", "total earnings"),
+    "employer": ("employer", "employer name", "company name", "organisation name", "organization name"),
+}
+
+# Endings of a company name, for slips that print the employer as a letterhead without a label
+COMPANY_SUFFIXES = ("pvt ltd", "pvt. ltd", "pvt. ltd.", "private limited", "limited", "ltd", "llp")
+
+# PAN, and a 12-digit Aadhaar number (it never starts with 0 or 1). OCR often glues the
+# PAN to the label before it ("NumberABCDE1234F"), so it only needs no capital or digit
+# on either side rather than a word boundary.
+ID_RE = re.compile(r"(?<![A-Z0-9])(?P<pan>[A-Z]{5}[0-9]{4}[A-Z])(?![A-Z0-9])"
+                   r"|\b(?P<aadhaar>[2-9][0-9]{3}[ -]?[0-9]{4}[ -]?[0-9]{4})\b")
+
+# The amount right after a label, e.g. ": Rs. 56,600.00" or " (INR) 52,000"
+AMOUNT_RE = re.compile(r"\s*(?:\(\s*(?:in\s+)?(?:rs\.?|inr|₹|rupees)\s*\))?[\s:=-]*(?:(?:rs\.?|inr|₹)\s*)?"
+                       r"(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)\b")
+
+# How far after a label its value may start, and the longest employer name
+VALUE_WINDOW = 40
+EMPLOYER_MAX_CHARS = 60
+
+# Verhoeff checksum tables (dihedral group D5)
+VERHOEFF_MULTIPLY = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 2, 3, 4, 0, 6, 7, 8, 9, 5), (2, 3, 4, 0, 1, 7, 8, 9, 5, 6),
+    (3, 4, 0, 1, 2, 8, 9, 5, 6, 7), (4, 0, 1, 2, 3, 9, 5, 6, 7, 8), (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2), (7, 6, 5, 9, 8, 2, 1, 0, 4, 3), (8, 7, 6, 5, 9, 3, 2, 1, 0, 4),
+    (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+VERHOEFF_PERMUTE = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 5, 7, 6, 2, 8, 3, 0, 9, 4), (5, 8, 0, 3, 7, 9, 6, 1, 4, 2),
+    (8, 9, 1, 6, 0, 4, 3, 5, 2, 7), (9, 4, 5, 3, 1, 2, 6, 8, 7, 0), (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5), (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+
+
+def verhoeff_valid(number: str):
+    """True if the digits of number end in a correct Verhoeff check digit, as every Aadhaar number does"""
+    check = 0
+    for i, digit in enumerate(reversed([int(ch) for ch in number if ch.isdigit()])):
+        check = VERHOEFF_MULTIPLY[check][VERHOEFF_PERMUTE[i % 8][digit]]
+    return check == 0
+
+
+class KeywordMatcher:
+    """Finds every phrase in a lowercased text in one pass.
+
+    Uses an Aho-Corasick automaton from the optional 'pyahocorasick'
+    package when it is installed and a single compiled alternation
+    otherwise, which in CPython is faster than an automaton stepped in
+    Python. Only whole-word matches count; where phrases overlap the
+    longest one wins.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = sorted(set(phrases), key=len, reverse=True)
+        try:
+            import ahocorasick
+        except ImportError:
+            self._automaton = None
+            self._pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, self.phrases)) + r")\b")
+        else:
+            self._automaton = ahocorasick.Automaton()
+            for phrase in self.phrases:
+                self._automaton.add_word(phrase, phrase)
+            self._automaton.make_automaton()
+
+    def find(self, text):
+        """[(start, end, phrase)] in order of position"""
+        if self._automaton is None:
+            return [(m.start(), m.end(), m.group()) for m in self._pattern.finditer(text)]
+        hits = []
+        for last, phrase in self._automaton.iter(text):
+            start, end = last - len(phrase) + 1, last + 1
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                hits.append((start, end, phrase))
+        hits.sort(key=lambda hit: (hit[0], hit[0] - hit[1]))
+        matches, covered = [], 0
+        for hit in hits:
+            if hit[0] >= covered:
+                matches.append(hit)
+                covered = hit[1]
+        return matches
+
+
+class ScanResult:
+    """What one scan found; results of consecutive pages combine with merge"""
+    __slots__ = ("pan", "aadhaar", "net_salary", "gross_salary", "employer", "keywords")
+
+    def __init__(self):
+        self.pan = None
+        self.aadhaar = None
+        self.net_salary = None
+        self.gross_salary = None
+        self.employer = None
+        self.keywords = set()
+
+    def merge(self, other):
+        """Fill fields still missing from a later page's result"""
+        for field in ("pan", "aadhaar", "net_salary", "gross_salary", "employer"):
+            if getattr(self, field) is None:
+                setattr(self, field, getattr(other, field))
+        self.keywords |= other.keywords
+        return self
+
+    def verdict(self, doc_type):
+        if doc_type == "pan":
+            return {"pan_valid": self.pan is not None, "pan_number": self.pan}
+        if doc_type == "aadhaar":
+            # Only the last four digits leave the scanner
+            return {"aadhaar_valid": self.aadhaar is not None,
+                    "aadhaar_last4": self.aadhaar[-4:] if self.aadhaar else None}
+        if doc_type == "salary_slip":
+            return {"salary_slip_valid": len(self.keywords) >= SALARY_SLIP_MIN_KEYWORDS,
+                    "net_salary": self.net_salary, "gross_salary": self.gross_salary, "employer": self.employer}
+        return {"error": "Invalid document type"}
+
+
+class DocumentScanner:
+    """Extracts every document field from OCR text in a single pass per pattern set.
+
+    One keyword pass over the lowercased text finds the salary-slip
+    keywords, value labels and company-name endings; one regex pass finds
+    PAN and Aadhaar numbers. Label values are then read right where the
+    label ends, so the cost grows with the text once rather than once per
+    field. Multi-page documents are scanned page by page and merged.
+    """
+
+    def __init__(self):
+        self.roles = {}
+        for keyword in SALARY_SLIP_KEYWORDS:
+            self.roles.setdefault(keyword, []).append("keyword")
+        for field, labels in LABELS.items():
+            for label in labels:
+                self.roles.setdefault(label, []).append(field)
+        for suffix in COMPANY_SUFFIXES:
+            self.roles.setdefault(suffix, []).append("company_suffix")
+        self.matcher = KeywordMatcher(self.roles)
+
+    def scan(self, text):
+        result = ScanResult()
+        for match in ID_RE.finditer(text):
+            if match.lastgroup == "pan":
+                result.pan = result.pan or match.group()
+            elif result.aadhaar is None and verhoeff_valid(match.group()):
+                result.aadhaar = re.sub(r"\D", "", match.group())
+
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters lowercase to two; keep positions aligned with text
+            lowered = "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+        hits = self.matcher.find(lowered)
+        for i, (start, end, phrase) in enumerate(hits):
+            # A label's value ends where the next phrase starts
+            stop = hits[i + 1][0] if i + 1 < len(hits) else len(text)
+            for role in self.roles[phrase]:
+                if role == "keyword":
+                    result.keywords.add(phrase)
+                elif role == "company_suffix":
+                    if result.employer is None:
+                        result.employer = self._letterhead(text, start, end)
+                elif getattr(result, role) is None:
+                    if role == "employer":
+                        # Company-name endings belong to the name, not after it
+                        following = (hit[0] for hit in hits[i + 1:] if self.roles[hit[2]] != ["company_suffix"])
+                        result.employer = self._label_text(text, end, next(following, len(text)))
+                    else:
+                        match = AMOUNT_RE.match(lowered, end, min(stop, end + VALUE_WINDOW))
+                        setattr(result, role, parse_number(match.group(1)) if match else None)
+        return result
+
+    @staticmethod
+    def _label_text(text, start, stop):
+        """Name printed after a label, up to the end of its line, a digit or the next phrase"""
+        value = text[start:min(stop, start + EMPLOYER_MAX_CHARS)].split("\n")[0]
+        value = re.split(r"\d|\s{2,}", value.lstrip(" :-\t"))[0].strip(" :-,.\t")
+        return value or None
+
+    @staticmethod
+    def _letterhead(text, start, end):
+        """Company name ending in the suffix at start:end, e.g. 'ACME TECHNOLOGIES PVT LTD'"""
+        suffix = text[start:end]
+        word = r"[A-Z][A-Z0-9&.'-]*" if suffix.isupper() else r"[A-Z][\w&.'-]*"
+        match = re.search(rf"(?:{word}[ \t]+){{1,5}}$", text[max(0, start - EMPLOYER_MAX_CHARS):start])
+        return f"{match.group()}{suffix}" if match else None
+
+
+scanner = DocumentScanner()
+
+
+@timed("scan_document")
+def scan(text):
+    return scanner.scan(text)
+
+
+def passed(verdict):
+    """True if a verdict has no error and its *_valid field is set"""
+    return "error" not in verdict and all(verdict[field] for field in VALID_FIELDS.values() if field in verdict)
+
+
+def scanner_version():
+    """Hash of the patterns verdicts depend on; cached verdicts from other versions are recomputed"""
+    patterns = [VALID_FIELDS, SALARY_SLIP_KEYWORDS, SALARY_SLIP_MIN_KEYWORDS, LABELS, COMPANY_SUFFIXES,
+                ID_RE.pattern, AMOUNT_RE.pattern, VALUE_WINDOW, EMPLOYER_MAX_CHARS]
+    return hashlib.sha256(json.dumps(patterns, ensure_ascii=False).encode()).hexdigest()[:16]
+
+
+SCANNER_VERSION = scanner_version()
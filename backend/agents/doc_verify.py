@@ -1,50 +1,184 @@
-import easyocr
-import re
-import io
-from PIL import Image
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 import numpy as np
+from . import doc_scanner, image_preprocess, pdf_pages
+from .. import config
+from ..metrics import timed
+
+
+class ReaderPool:
+    """Bounded pool of preloaded EasyOCR readers shared by the whole process.
+
+    Readers are created lazily up to ``size`` (or all at once by ``warm_up``)
+    and handed out one per OCR call, so concurrent requests run on separate
+    readers instead of reloading the models from disk every time.
+    """
+
+    def __init__(self, size=None, languages=None, torch_threads=None):
+        self.size = max(1, size or config.OCR_POOL_SIZE)
+        self.languages = languages or config.OCR_LANGUAGES
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.size)
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._waiting = 0
+        self._in_use = 0
+        self._load_seconds = []
+
+    def _create_reader(self):
+        # Split the cores between the pooled readers so concurrent OCR calls
+        # don't oversubscribe the CPU with torch intra-op threads.
+        if not config.OCR_USE_GPU:
+            import torch
+            torch.set_num_threads(self.torch_threads)
+        # Imported here: it pulls in torch, which only workers that actually OCR should pay for
+        import easyocr
+
+        started = time.perf_counter()
+        reader = easyocr.Reader(self.languages, gpu=config.OCR_USE_GPU)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._load_seconds.append(elapsed)
+        return reader
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return True
+        return False
+
+    def warm_up(self):
+        """Load every reader up front so the first requests don't pay for it"""
+        while self._reserve_slot():
+            try:
+                self._idle.put(self._create_reader())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+    @contextmanager
+    def reader(self, timeout=None):
+        try:
+            reader = self._idle.get_nowait()
+        except queue.Empty:
+            reader = None
+
+        if reader is None and self._reserve_slot():
+            try:
+                reader = self._create_reader()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        if reader is None:
+            with self._lock:
+                self._waiting += 1
+            try:
+                reader = self._idle.get(timeout=timeout or config.OCR_ACQUIRE_TIMEOUT)
+            except queue.Empty:
+                raise TimeoutError("No OCR reader became available in time")
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield reader
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(reader)
+
+    def readtext(self, image):
+        with self.reader() as reader:
+            return reader.readtext(image)
+
+    def recognize(self, gray, boxes):
+        """Recognise only the given [x_min, x_max, y_min, y_max] boxes, skipping text detection"""
+        with self.reader() as reader:
+            return reader.recognize(gray, horizontal_list=boxes, free_list=[])
+
+    def stats(self):
+        with self._lock:
+            loads = list(self._load_seconds)
+            return {
+                "pool_size": self.size,
+                "readers_loaded": self._created,
+                "readers_idle": self._idle.qsize(),
+                "readers_in_use": self._in_use,
+                "queue_depth": self._waiting,
+                "model_load_seconds_total": round(sum(loads), 3),
+                "model_load_seconds_last": round(loads[-1], 3) if loads else None,
+            }
+
+
+reader_pool = ReaderPool()
+
 
 class DocumentVerifier:
-    def __init__(self):
-        self.reader = easyocr.Reader(['en'])
+    @staticmethod
+    def load_image(source):
+        """source is the upload's bytes or the path of its temp file"""
+        if config.OCR_PREPROCESS:
+            return image_preprocess.prepare(source)
+        image = image_preprocess.open_header(source)
+        return np.array(image)
 
     @staticmethod
-    def extract_text(file_bytes):
-        verifier = DocumentVerifier()
-        image = Image.open(io.BytesIO(file_bytes))
-        image_np = np.array(image)
-        results = verifier.reader.readtext(image_np)
+    @timed("ocr_extract_text")
+    def extract_text(source):
+        image_np = DocumentVerifier.load_image(source)
+        results = reader_pool.readtext(image_np)
         text = ' '.join([result[1] for result in results])
         return text
 
     @staticmethod
-    def verify_pan(text):
-        pattern = r"[A-Z]{5}[0-9]{4}[A-Z]"
-        match = re.search(pattern, text)
-        return bool(match)
+    def extract_page_text(source, page_index):
+        """Text of one PDF page: its embedded text layer if it has one, OCR otherwise"""
+        text = pdf_pages.text_layer(source, page_index)
+        if text is not None:
+            return text
+        # A rendered page is already the whole document, so don't crop it
+        image_np = image_preprocess.prepare_image(pdf_pages.render_page(source, page_index), crop=False)
+        results = reader_pool.readtext(image_np)
+        return ' '.join([result[1] for result in results])
 
     @staticmethod
-    def verify_aadhaar(text):
-        digits = re.findall(r"\b\d{4}\s\d{4}\s\d{4}\b", text)
-        return len(digits) > 0
+    def verify_region_first(doc_type, source):
+        """Fast path: OCR only the lines in doc_type's zone, falling back to the full page.
 
-    @staticmethod
-    def verify_salary_slip(text):
-        keywords = ["Basic Pay", "HRA", "Gross Salary", "Net Salary", "Basic Salary", "Bank name", "allowances"]
-        score = sum(k.lower() in text.lower() for k in keywords)
-        return score >= 2  # minimum 2 keywords
-
-    @staticmethod
-    def verify_document(doc_type, file_bytes):
-        text = DocumentVerifier.extract_text(file_bytes)
+        Returns (verdict, full_text); full_text is None when the zone alone
+        was enough to pass verification.
+        """
+        image_np = image_preprocess.prepare(source)
+        boxes = image_preprocess.roi_boxes(image_np, doc_type)
+        if boxes:
+            results = reader_pool.recognize(image_np, boxes)
+            verdict = DocumentVerifier.verdict(doc_type, ' '.join([result[1] for result in results]))
+            if doc_scanner.passed(verdict):
+                return verdict, None
 
-        if doc_type == "pan":
-            return {"pan_valid": DocumentVerifier.verify_pan(text)}
+        results = reader_pool.readtext(image_np)
+        text = ' '.join([result[1] for result in results])
+        return DocumentVerifier.verdict(doc_type, text), text
 
-        if doc_type == "aadhaar":
-            return {"aadhaar_valid": DocumentVerifier.verify_aadhaar(text)}
+    DOCUMENT_TYPES = tuple(doc_scanner.VALID_FIELDS)
 
-        if doc_type == "salary_slip":
-            return {"salary_slip_valid": DocumentVerifier.verify_salary_slip(text)}
+    @staticmethod
+    def verdict(doc_type, text):
+        """Check already extracted text for doc_type; the verdict carries the fields found in it"""
+        if doc_type not in DocumentVerifier.DOCUMENT_TYPES:
+            return {"error": "Invalid document type"}
+        return doc_scanner.scan(text).verdict(doc_type)
 
-        return {"error": "Invalid document type"}
\ No newline at end of file
+    @staticmethod
+    def verify_document(doc_type, source):
+        text = DocumentVerifier.extract_text(source)
+        return DocumentVerifier.verdict(doc_type, text)
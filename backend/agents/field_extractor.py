@@ -0,0 +1,200 @@
+import re
+from collections import namedtuple
+
+FieldMatch = namedtuple("FieldMatch", ["value", "confidence"])
+
+# One tokenizer pass over the lowercased message: numbers (with Indian
+# grouping, decimals and an optional unit) or words.
+TOKEN_RE = re.compile(r"""
+    (?P<number>\d+(?:,\d+)*(?:\.\d+)?)
+    (?:\s*(?P<unit>k|thousand|lakhs?|lacs?|l|crores?|cr)\b)?
+  | (?P<word>[a-z]+(?:['-][a-z]+)*|₹)
+""", re.VERBOSE)
+
+UNIT_MULTIPLIERS = {
+    "k": 1_000, "thousand": 1_000,
+    "l": 100_000, "lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000,
+    "cr": 10_000_000, "crore": 10_000_000, "crores": 10_000_000,
+}
+
+CURRENCY_WORDS = {"rs", "inr", "rupees", "rupee", "₹"}
+
+# Plausible range and context words for every numeric field
+NUMERIC_FIELDS = {
+    "age": {
+        "range": (18, 70),
+        "keywords": {"age", "aged", "years", "year", "yrs", "yr", "yo", "old", "am", "i'm", "im"},
+        "money": False,
+    },
+    "salary": {
+        "range": (10_000, 500_000),
+        "keywords": {"salary", "earn", "earns", "earning", "income", "monthly", "month", "pm",
+                     "take-home", "paid", "make"},
+        "money": True,
+    },
+    "credit_score": {
+        "range": (300, 900),
+        "keywords": {"credit", "score", "cibil"},
+        "money": False,
+    },
+    "loan_amount": {
+        "range": (10_000, 10_000_000),
+        "keywords": {"loan", "borrow", "amount", "need", "require", "required", "want", "looking"},
+        "money": True,
+    },
+}
+
+NAME_RE = re.compile(r"\b(?:my name is|name is|name's|i am|i'm|im|call me|this is)\s+([a-z]+(?:\s+[a-z]+){0,2})")
+NOT_NAME_WORDS = {
+    "a", "an", "the", "and", "looking", "interested", "salaried", "employed", "self", "working",
+    "from", "in", "at", "with", "not", "years", "year", "aged", "here", "fine", "good", "okay",
+    "ok", "applying", "currently", "earning", "need", "want", "planning", "doing",
+    "hi", "hello", "hey", "yes", "no", "yeah", "thanks", "thank", "you", "please", "sure", "loan",
+}
+
+SELF_EMPLOYED_RE = re.compile(r"\bself[\s-]?employed\b|\bbusiness\b|\bentrepreneur\b|\bfreelanc\w*\b|\bown (?:shop|firm|company)\b")
+SALARIED_RE = re.compile(r"\bsalaried\b|\bsalary job\b|\bemployed\b|\bworking (?:in|at|for)\b|\bemployee\b|\bjob\b")
+# "no job currently", "I am not employed", "lost my job": none of these is an employment type
+NOT_EMPLOYED_RE = re.compile(
+    r"\b(?:no|not|without|lost|left|quit|don't have|haven't got)\s+"
+    r"(?:(?:a|any|my|the|currently|presently|have|got)\s+)*(?:job|employed|working)\b"
+    r"|\bunemployed\b|\bjobless\b|\bout of (?:a )?(?:job|work)\b")
+
+# Words a bare reply to "what is your name?" can't be made of: questions and small talk
+NOT_BARE_NAME_WORDS = NOT_NAME_WORDS | {
+    "what", "why", "how", "when", "where", "who", "which", "whats", "what's", "can", "could", "is", "are",
+    "do", "does", "did", "tell", "me", "more", "about", "explain", "interest", "rate", "rates",
+    "i", "i'm", "im", "my", "it", "this", "that", "of", "for", "to", "idk", "sorry", "wait", "again",
+    "job", "unemployed", "jobless", "self-employed", "business",
+}
+
+
+def parse_amount(number: str, unit: str = None):
+    """'1,20,000' -> 120000, ('2.5', 'l') -> 250000, ('85', 'k') -> 85000"""
+    value = float(number.replace(",", ""))
+    if unit:
+        value *= UNIT_MULTIPLIERS[unit]
+    return int(round(value))
+
+
+def tokenize(text_lower: str):
+    """Return (kind, value, unit) tuples for an already-lowercased message in a single scan"""
+    tokens = []
+    for match in TOKEN_RE.finditer(text_lower):
+        if match.group("number"):
+            unit = match.group("unit")
+            tokens.append(("number", parse_amount(match.group("number"), unit), unit))
+        else:
+            tokens.append(("word", match.group("word"), None))
+    return tokens
+
+
+def _keyword_score(tokens, position, keywords):
+    best = None
+    for index, (kind, value, _) in enumerate(tokens):
+        if kind == "word" and value in keywords:
+            distance = abs(index - position)
+            best = distance if best is None else min(best, distance)
+    if best is None:
+        return 0
+    if best <= 1:
+        return 3
+    if best <= 3:
+        return 2
+    if best <= 6:
+        return 1
+    return 0
+
+
+def _score_numbers(tokens, missing, expected):
+    """Score every (number, field) pair; higher means more likely"""
+    candidates = []
+    for position, (kind, value, unit) in enumerate(tokens):
+        if kind != "number":
+            continue
+        money_hint = unit in UNIT_MULTIPLIERS or any(
+            tokens[i][1] in CURRENCY_WORDS for i in (position - 1, position + 1) if 0 <= i < len(tokens)
+        )
+        for field in missing:
+            spec = NUMERIC_FIELDS.get(field)
+            if spec is None:
+                continue
+            low, high = spec["range"]
+            if not low <= value <= high:
+                continue
+            score = 1 + _keyword_score(tokens, position, spec["keywords"])
+            if money_hint:
+                score += 1 if spec["money"] else -2
+            if field == expected:
+                score += 1.5
+            candidates.append((score, position, field, value))
+    return candidates
+
+
+def _extract_name(text_lower, tokens, expected):
+    match = NAME_RE.search(text_lower)
+    if match:
+        words = match.group(1).split()
+        while words and words[-1] in NOT_NAME_WORDS:
+            words.pop()
+        if words and words[0] not in NOT_NAME_WORDS:
+            confidence = 0.9 if len(words) >= 2 else 0.6
+            return FieldMatch(" ".join(words).title(), confidence)
+
+    # A bare "Asha Rao" reply right after we asked for the name; not a question like "what is emi?"
+    if expected == "name" and 1 <= len(tokens) <= 3 and "?" not in text_lower and all(
+        kind == "word" and len(value) > 1 and value not in NOT_BARE_NAME_WORDS for kind, value, _ in tokens
+    ):
+        return FieldMatch(" ".join(value for _, value, _ in tokens).title(), 0.7)
+    return None
+
+
+def _extract_employment(text_lower):
+    if NOT_EMPLOYED_RE.search(text_lower):
+        return None
+    # Check self-employment first: "self-employed" also contains "employed"
+    if SELF_EMPLOYED_RE.search(text_lower):
+        return FieldMatch("Self-employed", 0.9)
+    if SALARIED_RE.search(text_lower):
+        return FieldMatch("Salaried", 0.9)
+    return None
+
+
+def extract_fields(message: str, missing=None, expected: str = None):
+    """Pull applicant fields out of one chat message.
+
+    missing limits extraction to fields not collected yet; expected is the
+    field the agent just asked for and breaks ties in its favour. Returns
+    {field: FieldMatch(value, confidence)} with confidence in [0, 1].
+    """
+    missing = list(missing) if missing is not None else ["name", "employment_type", *NUMERIC_FIELDS]
+    text_lower = message.lower()
+    tokens = tokenize(text_lower)
+    found = {}
+
+    if "name" in missing:
+        name = _extract_name(text_lower, tokens, expected)
+        if name:
+            found["name"] = name
+
+    if "employment_type" in missing:
+        employment = _extract_employment(text_lower)
+        if employment:
+            found["employment_type"] = employment
+
+    candidates = _score_numbers(tokens, missing, expected)
+
+    # Greedy assignment: each number and each field is used at most once
+    used_positions = set()
+    for score, position, field, value in sorted(candidates, key=lambda c: c[0], reverse=True):
+        if field in found or position in used_positions:
+            continue
+        confidence = min(1.0, score / 4)
+        # Another number competed for this field, or this number fit another field about as well
+        rivals = [s for s, p, f, _ in candidates if (p == position) != (f == field)]
+        if rivals and max(rivals) >= score - 0.5:
+            confidence *= 0.6
+        found[field] = FieldMatch(value, round(confidence, 2))
+        used_positions.add(position)
+
+    return found
@@ -0,0 +1,213 @@
+import io
+import cv2
+import numpy as np
+from PIL import Image
+from .. import config
+
+# Where each document's key field sits on the (cropped, upright) document,
+# as (left, top, right, bottom) fractions: the PAN sits in the middle band of
+# the card, the Aadhaar number along the bottom, salary-slip keywords in the
+# header and earnings table.
+DOCUMENT_ZONES = {
+    "pan": (0.0, 0.25, 1.0, 0.85),
+    "aadhaar": (0.0, 0.55, 1.0, 1.0),
+    "salary_slip": (0.0, 0.0, 1.0, 0.8),
+}
+
+MAX_ROI_BOXES = 40
+
+
+REDUCED_GRAYSCALE = ((8, cv2.IMREAD_REDUCED_GRAYSCALE_8), (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+                     (2, cv2.IMREAD_REDUCED_GRAYSCALE_2))
+
+
+def open_header(source):
+    """Lazily opened PIL image for bytes or a file path; only the header is read"""
+    return Image.open(source if isinstance(source, str) else io.BytesIO(source))
+
+
+def raw_buffer(source):
+    """uint8 view of an upload without copying it: the bytes themselves or a read-only memory map"""
+    if isinstance(source, str):
+        return np.memmap(source, dtype=np.uint8, mode="r")
+    return np.frombuffer(source, np.uint8)
+
+
+def decode(source, max_side=None):
+    """Decode an upload (bytes or file path) straight to grayscale.
+
+    Images much larger than max_side are scaled down inside the decoder, so
+    a 12 MP JPEG never exists in memory at full resolution, and anything
+    over OCR_MAX_PIXELS is refused from its header alone. Falls back to
+    Pillow for formats OpenCV can't read.
+    """
+    max_side = max_side or config.OCR_MAX_SIDE
+    flag = cv2.IMREAD_GRAYSCALE
+    try:
+        width, height = open_header(source).size
+    except Exception:
+        width = height = 0
+    if width * height > config.OCR_MAX_PIXELS:
+        raise ValueError(f"Image of {width}x{height} pixels is too large to verify")
+    for factor, reduced_flag in REDUCED_GRAYSCALE:
+        if max(width, height) // factor >= max_side:
+            flag = reduced_flag
+            break
+
+    image = cv2.imdecode(raw_buffer(source), flag)
+    if image is None:
+        image = np.array(open_header(source).convert("L"))
+    return image
+
+
+def downscale(image, max_side=None):
+    """Shrink so the longer side is at most max_side; never upscale"""
+    max_side = max_side or config.OCR_MAX_SIDE
+    height, width = image.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def grayscale(image):
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def _order_corners(points):
+    # top-left, top-right, bottom-right, bottom-left
+    points = points.reshape(4, 2).astype("float32")
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([points[np.argmin(sums)], points[np.argmin(diffs)],
+                     points[np.argmax(sums)], points[np.argmax(diffs)]], dtype="float32")
+
+
+def crop_to_document(gray, min_area=0.2):
+    """Cut away the background around a photographed card or page.
+
+    Uses the largest contour covering at least min_area of the frame: a
+    four-corner outline is warped to a flat rectangle, anything else is
+    cropped to its bounding box. Returns the input unchanged when no such
+    region is found (e.g. scans that are already just the document).
+    """
+    height, width = gray.shape
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, np.ones((5, 5), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return gray
+
+    contour = max(contours, key=cv2.contourArea)
+    area = cv2.contourArea(contour)
+    if area < min_area * height * width or area > 0.95 * height * width:
+        return gray
+
+    approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+    if len(approx) == 4:
+        corners = _order_corners(approx)
+        tl, tr, br, bl = corners
+        out_w = int(max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl)))
+        out_h = int(max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr)))
+        target = np.array([[0, 0], [out_w - 1, 0], [out_w - 1, out_h - 1], [0, out_h - 1]], dtype="float32")
+        matrix = cv2.getPerspectiveTransform(corners, target)
+        document = cv2.warpPerspective(gray, matrix, (out_w, out_h), borderMode=cv2.BORDER_REPLICATE)
+    else:
+        x, y, w, h = cv2.boundingRect(contour)
+        document = gray[y:y + h, x:x + w]
+
+    # Drop the sliver of background the edge detector leaves around the outline
+    inset_y, inset_x = max(1, document.shape[0] // 100), max(1, document.shape[1] // 100)
+    return document[inset_y:-inset_y, inset_x:-inset_x]
+
+
+def text_lines(gray):
+    """Rotated rectangles around text lines, found with morphology only (no OCR model)"""
+    height, width = gray.shape
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # A frame of page edges would otherwise swallow every line into one contour
+    border_y, border_x = max(1, height // 100), max(1, width // 100)
+    binary[:border_y], binary[-border_y:], binary[:, :border_x], binary[:, -border_x:] = 0, 0, 0, 0
+    joined = cv2.morphologyEx(binary, cv2.MORPH_CLOSE,
+                              cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, width // 60), 1)))
+    contours, _ = cv2.findContours(joined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    lines = []
+    for contour in contours:
+        rect = cv2.minAreaRect(contour)
+        (w, h) = rect[1]
+        long_side, short_side = max(w, h), min(w, h)
+        # Text lines are much wider than tall and not taller than a headline
+        if short_side >= 6 and long_side >= 2.5 * short_side and short_side <= height / 6:
+            lines.append(rect)
+    return lines
+
+
+def _line_angle(rect):
+    (w, h), angle = rect[1], rect[2]
+    # minAreaRect angles depend on which side it calls the width; normalise to the long side
+    if w < h:
+        angle -= 90
+    while angle > 45:
+        angle -= 90
+    while angle < -45:
+        angle += 90
+    return angle
+
+
+def deskew(gray, max_angle=15):
+    """Rotate so text lines are horizontal, using the median angle of the detected lines"""
+    lines = text_lines(gray)
+    if len(lines) < 3:
+        return gray
+    angle = float(np.median([_line_angle(rect) for rect in lines]))
+    if abs(angle) < 0.5 or abs(angle) > max_angle:
+        return gray
+
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    out_w, out_h = int(height * sin + width * cos), int(height * cos + width * sin)
+    matrix[0, 2] += out_w / 2 - width / 2
+    matrix[1, 2] += out_h / 2 - height / 2
+    return cv2.warpAffine(gray, matrix, (out_w, out_h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def prepare_image(image, max_side=None, crop=True):
+    """Downscale, grayscale, crop and deskew an already decoded image"""
+    gray = grayscale(downscale(image, max_side))
+    if crop:
+        gray = crop_to_document(gray)
+    return deskew(gray)
+
+
+def prepare(source, max_side=None):
+    """Decode an upload (bytes or file path) and prepare it for OCR"""
+    return prepare_image(decode(source, max_side), max_side)
+
+
+def roi_boxes(gray, doc_type, pad=4):
+    """EasyOCR horizontal_list boxes for the text lines inside doc_type's zone.
+
+    Returns [] for unknown document types or when no line is found, in which
+    case the caller should fall back to full-page OCR.
+    """
+    zone = DOCUMENT_ZONES.get(doc_type)
+    if zone is None:
+        return []
+    height, width = gray.shape
+    left, top, right, bottom = zone[0] * width, zone[1] * height, zone[2] * width, zone[3] * height
+
+    boxes = []
+    for rect in text_lines(gray):
+        x, y, w, h = cv2.boundingRect(np.int32(cv2.boxPoints(rect)))
+        center_x, center_y = x + w / 2, y + h / 2
+        if left <= center_x <= right and top <= center_y <= bottom:
+            boxes.append([max(0, x - pad), min(width, x + w + pad), max(0, y - pad), min(height, y + h + pad)])
+
+    # Largest lines first: field values are printed bigger than footnotes
+    boxes.sort(key=lambda box: (box[3] - box[2]) * (box[1] - box[0]), reverse=True)
+    return sorted(boxes[:MAX_ROI_BOXES], key=lambda box: (box[2], box[0]))
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from .. import config
+from .doc_scanner import SCANNER_VERSION
+
+
+class OCRCache:
+    """Content-addressed cache of OCR text and document verdicts.
+
+    Entries are keyed by a SHA-256 of the uploaded bytes and hold the
+    extracted text plus every verdict computed from it, so re-uploading the
+    same image (for any document type) skips OCR entirely. The memory tier is
+    an LRU; the optional disk tier keeps one JSON file per entry and deletes
+    the least recently used files once it grows past max_disk_bytes.
+    Verdicts are tagged with the scanner version that computed them; after
+    the scanner changes they are recomputed from the cached text.
+    """
+
+    def __init__(self, max_entries=None, disk_dir=None, max_disk_bytes=None, version=SCANNER_VERSION):
+        self.max_entries = config.OCR_CACHE_ENTRIES if max_entries is None else max_entries
+        self.disk_dir = config.OCR_CACHE_DIR if disk_dir is None else disk_dir
+        self.max_disk_bytes = max_disk_bytes or config.OCR_CACHE_MAX_BYTES
+        self.version = version
+        self.entries = OrderedDict()  # key -> {"text": ..., "version": ..., "verdicts": {doc_type: verdict}}
+        self._lock = threading.Lock()
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+        self._disk_files = OrderedDict()  # key -> size in bytes, least recently used first
+        self._disk_bytes = 0
+        if self.disk_dir:
+            self._scan_disk()
+
+    @staticmethod
+    def hasher():
+        """SHA-256 to feed an upload's bytes into; its hexdigest is the cache key"""
+        # OCR output depends on the recognition languages as well as the image
+        return hashlib.sha256(",".join(config.OCR_LANGUAGES).encode())
+
+    @staticmethod
+    def key(source):
+        """Cache key of an upload given as bytes or as a file path"""
+        digest = OCRCache.hasher()
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        else:
+            digest.update(source)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _scan_disk(self):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                files.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk_files[key] = size
+            self._disk_bytes += size
+
+    def _read_disk(self, key):
+        if not self.disk_dir or key not in self._disk_files:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._disk_bytes -= self._disk_files.pop(key)
+            return None
+        self._disk_files.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return entry
+
+    def _write_disk(self, key, entry):
+        data = json.dumps(entry).encode("utf-8")
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self._disk_bytes += len(data) - self._disk_files.pop(key, 0)
+        self._disk_files[key] = len(data)
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk_files) > 1:
+            old_key, size = self._disk_files.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def _remember(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _copy(self, entry):
+        # Callers read entries outside the lock
+        verdicts = entry["verdicts"] if entry.get("version") == self.version else {}
+        return {"text": entry["text"], "verdicts": dict(verdicts)}
+
+    def lookup(self, key):
+        """Return the cached entry for key, or None"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self._hits["memory"] += 1
+                return self._copy(entry)
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+                self._hits["disk"] += 1
+                return self._copy(entry)
+            self._misses += 1
+            return None
+
+    def store(self, key, text, doc_type=None, verdict=None):
+        with self._lock:
+            entry = self.entries.get(key) or self._read_disk(key) or {"text": None, "verdicts": {}}
+            if text is not None:  # None: only a zone was read (OCR_ROI), keep any full text we have
+                entry["text"] = text
+            if entry.get("version") != self.version:
+                entry["verdicts"] = {}
+                entry["version"] = self.version
+            if doc_type is not None:
+                entry["verdicts"][doc_type] = verdict
+            self._remember(key, entry)
+            if self.disk_dir:
+                self._write_disk(key, entry)
+            return self._copy(entry)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            for key in list(self._disk_files):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._disk_files.clear()
+            self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            hits = self._hits["memory"] + self._hits["disk"]
+            lookups = hits + self._misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits_memory": self._hits["memory"],
+                "hits_disk": self._hits["disk"],
+                "misses": self._misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "disk_enabled": bool(self.disk_dir),
+                "disk_entries": len(self._disk_files),
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+            }
+
+
+ocr_cache = OCRCache()
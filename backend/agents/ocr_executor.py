@@ -0,0 +1,414 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import time
+import uuid
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from . import doc_scanner, doc_verify, pdf_pages
+from .doc_verify import DocumentVerifier, ReaderPool
+from .ocr_cache import ocr_cache
+from .. import config
+from ..metrics import span
+from ..single_flight import SingleFlight
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the OCR executor already has max_in_flight documents running"""
+
+
+class ExecutorUnavailable(Exception):
+    """Raised when the OCR executor is not running or its workers died"""
+
+
+def _init_worker(torch_threads):
+    # Each worker process owns exactly one warm reader
+    doc_verify.reader_pool = ReaderPool(size=1, torch_threads=torch_threads)
+    doc_verify.reader_pool.warm_up()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _pin(source):
+    """A link of its own to an upload's temp file, so the upload can be discarded while OCR reads it"""
+    if not isinstance(source, str):
+        return source
+    pinned = f"{source}.ocr"
+    try:
+        os.link(source, pinned)
+    except OSError:
+        shutil.copyfile(source, pinned)
+    return pinned
+
+
+def _unpin(source):
+    if isinstance(source, str):
+        try:
+            os.remove(source)
+        except FileNotFoundError:
+            pass
+
+
+class OCRExecutor:
+    """Runs document verification off the event loop with bounded concurrency.
+
+    In "process" mode every worker process holds its own EasyOCR reader, so
+    OCR runs in parallel across cores without touching the GIL of the API
+    worker. "thread" mode shares the in-process ReaderPool instead.
+    """
+
+    def __init__(self, mode=None, workers=None, max_in_flight=None, cache=None):
+        self.mode = mode or config.OCR_EXECUTOR
+        self.cache = cache or ocr_cache
+        self._extracting = SingleFlight()  # content key -> the OCR already running for it
+        self.workers = max(1, workers or config.OCR_WORKERS)
+        self.max_in_flight = max(1, max_in_flight or config.OCR_MAX_IN_FLIGHT)
+        self._pool = None
+        self._slots = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+        self._rejected = 0
+        self._failed = 0
+
+    @property
+    def running(self):
+        return self._pool is not None
+
+    def start(self):
+        if self._pool is not None:
+            return
+        if self.mode == "process":
+            torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(torch_threads,),
+            )
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+    def warm_up(self):
+        """Start every worker (and load its reader) before traffic arrives"""
+        self.start()
+        if self.mode == "process":
+            futures = [self._pool.submit(_ping) for _ in range(self.workers)]
+            for future in futures:
+                future.result()
+        else:
+            doc_verify.reader_pool.warm_up()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, func, *args, wait=False):
+        """Run func(*args) on a worker.
+
+        With wait=False the call is rejected with ExecutorSaturated when all
+        slots are busy; with wait=True it queues for a free slot instead.
+        """
+        if self._pool is None:
+            raise ExecutorUnavailable("OCR executor is not running")
+        if not wait and self._slots.locked():
+            self._rejected += 1
+            raise ExecutorSaturated(f"{self.max_in_flight} documents already being processed")
+
+        self._waiting += 1
+        try:
+            with span("ocr_queue_wait"):
+                await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        pool = self._pool
+        job = None
+        try:
+            if pool is None:
+                raise ExecutorUnavailable("OCR executor is not running")
+            job = pool.submit(func, *args)
+            # The slot stays taken until the worker is done with the job, even if
+            # the caller gives up first (e.g. the early stop in _verify_pages)
+            loop = asyncio.get_running_loop()
+            job.add_done_callback(lambda _: self._release_from(loop))
+            # Timed here because in process mode the worker's own spans stay in the worker
+            with span(f"ocr_worker_{func.__name__}"):
+                result = await asyncio.wrap_future(job)
+            self._completed += 1
+            return result
+        except BrokenProcessPool:
+            # A worker crashed (usually OOM); replace the pool for later calls
+            self._failed += 1
+            if self._pool is pool:
+                self._pool = None
+                self.start()
+            raise ExecutorUnavailable("OCR worker crashed, please retry")
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            if job is None:
+                self._release()
+
+    def _release(self):
+        self._in_flight -= 1
+        self._slots.release()
+
+    def _release_from(self, loop):
+        # Done callbacks run on a pool thread; the semaphore belongs to the loop
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass  # the loop is closed, and the semaphore with it
+
+    async def _extract(self, key, source, wait=False):
+        """OCR the whole page on a worker and cache the text under key"""
+        async def extract(pinned):
+            try:
+                text = await self.run(DocumentVerifier.extract_text, pinned, wait=wait)
+            finally:
+                _unpin(pinned)
+            return self.cache.store(key, text)
+
+        # The same bytes are already being OCR'd (e.g. a double-clicked upload): share that result.
+        # The OCR outlives this caller if it is cancelled, so it gets its own link to the file.
+        entry, _ = await self._extracting.run(key, lambda: extract(_pin(source)))
+        return entry
+
+    async def extract_text(self, source, wait=False):
+        """OCR source on a worker, or reuse the cached text of an identical upload"""
+        key = self.cache.key(source)
+        entry = self.cache.lookup(key)
+        if entry is None or entry["text"] is None:
+            entry = await self._extract(key, source, wait=wait)
+        return entry["text"]
+
+    async def verify(self, doc_type, source, wait=False, key=None):
+        return (await self.inspect(doc_type, source, wait=wait, key=key))["result"]
+
+    async def inspect(self, doc_type, source, wait=False, key=None):
+        """Verify one upload (image or PDF) and report how much of it had to be read.
+
+        source is the upload's bytes or the path of a spooled temp file;
+        workers get the path, so large uploads are never pickled. key is the
+        cache key if the caller already hashed the content.
+        """
+        report = {"document_type": doc_type, "result": None, "pages": None, "pages_read": 0, "cached": False}
+        if doc_type not in DocumentVerifier.DOCUMENT_TYPES:
+            report["result"] = DocumentVerifier.verdict(doc_type, "")
+            return report
+
+        key = key or self.cache.key(source)
+        entry = self.cache.lookup(key)
+        if entry is not None and doc_type in entry["verdicts"]:
+            report.update(result=entry["verdicts"][doc_type], cached=True)
+            return report
+        if entry is not None and entry["text"] is not None:
+            report.update(result=DocumentVerifier.verdict(doc_type, entry["text"]), cached=True)
+            self.cache.store(key, entry["text"], doc_type, report["result"])
+            return report
+
+        if pdf_pages.is_pdf(source):
+            verdict, text, pages, pages_read = await self._verify_pages(doc_type, source, wait=wait)
+            report.update(pages=pages, pages_read=pages_read)
+        elif config.OCR_ROI:
+            verdict, text = await self.run(DocumentVerifier.verify_region_first, doc_type, source, wait=wait)
+            report.update(pages=1, pages_read=1)
+        else:
+            text = (await self._extract(key, source, wait=wait))["text"]
+            verdict = DocumentVerifier.verdict(doc_type, text)
+            report.update(pages=1, pages_read=1)
+
+        self.cache.store(key, text, doc_type, verdict)
+        report["result"] = verdict
+        return report
+
+    async def _verify_pages(self, doc_type, source, wait=False):
+        """Read a PDF a few pages at a time and stop as soon as the verdict passes.
+
+        Up to one page per worker is in flight; each worker rasterises its
+        own page, so pages after the deciding one are never rendered. Every
+        page is scanned once as it arrives and the results are merged in
+        page order, so long documents aren't rescanned for each new page.
+        Returns (verdict, text or None if not every page was read, pages, pages_read).
+        """
+        pages = min(pdf_pages.page_count(source), config.OCR_MAX_PDF_PAGES)
+        texts = {}
+        scans = {}
+        running = {}
+        next_page = 0
+        verdict = DocumentVerifier.verdict(doc_type, "")
+        try:
+            while next_page < pages or running:
+                while next_page < pages and len(running) < self.workers:
+                    # Only the first page may be turned away; later ones queue behind it
+                    task = asyncio.ensure_future(self.run(DocumentVerifier.extract_page_text, source, next_page,
+                                                          wait=wait or next_page > 0))
+                    running[task] = next_page
+                    next_page += 1
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page = running.pop(task)
+                    texts[page] = task.result()
+                    scans[page] = doc_scanner.scan(texts[page])
+                merged = doc_scanner.ScanResult()
+                for page in sorted(scans):
+                    merged.merge(scans[page])
+                verdict = merged.verdict(doc_type)
+                if doc_scanner.passed(verdict):
+                    break
+        finally:
+            for task in running:
+                task.cancel()
+
+        text = " ".join(texts[page] for page in sorted(texts)) if len(texts) == pages else None
+        return verdict, text, pages, len(texts)
+
+    async def verify_batch(self, documents, slot=None):
+        """Verify several uploads concurrently and build one combined report.
+
+        documents is a list of (doc_type, filename, source, key). A document
+        that can't be read gets an error entry instead of failing the batch.
+        slot, if given, returns an async context manager each document is
+        verified under (a pipeline stage's slot); if it refuses a document,
+        e.g. with StageSaturated, the whole batch fails with that error.
+        """
+        async def verify_one(doc_type, filename, source, key):
+            started = time.perf_counter()
+            admitted = False
+            try:
+                async with slot() if slot is not None else nullcontext():
+                    admitted = True
+                    report = await self.inspect(doc_type, source, wait=True, key=key)
+            except ExecutorUnavailable:
+                raise
+            except Exception as e:
+                if not admitted:
+                    raise
+                report = {"document_type": doc_type, "result": {"error": str(e)},
+                          "pages": None, "pages_read": 0, "cached": False}
+            report["filename"] = filename
+            report["seconds"] = round(time.perf_counter() - started, 3)
+            return report
+
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(verify_one(*document)) for document in documents]
+        try:
+            reports = await asyncio.gather(*tasks)
+        except BaseException:
+            # The batch has failed; don't leave the other documents holding slots
+            for task in tasks:
+                task.cancel()
+            raise
+        return {
+            "documents": reports,
+            "all_verified": all(doc_scanner.passed(report["result"]) for report in reports),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+        }
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "running": self.running,
+            "workers": self.workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "failed": self._failed,
+        }
+
+
+class OCRJobs:
+    """In-process registry of asynchronous verification jobs"""
+
+    def __init__(self, executor, max_pending=None, ttl=None):
+        self.executor = executor
+        self.max_pending = max_pending or config.OCR_MAX_PENDING_JOBS
+        self.ttl = ttl or config.OCR_JOB_TTL
+        self.jobs = {}
+        self._events = {}
+        self._tasks = set()
+
+    def _pending(self):
+        return sum(1 for job in self.jobs.values() if job["status"] in ("queued", "running"))
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [k for k, job in self.jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+            del self.jobs[job_id]
+            self._events.pop(job_id, None)
+
+    def submit(self, doc_type, source, key=None, cleanup=None, slot=None, record=None, session_id=None):
+        """Queue a verification; cleanup() runs once the job is finished.
+
+        slot, as for verify_batch, returns the async context manager the
+        verification runs under. record, if given, is awaited with the
+        verdict and what it returns is kept as the job's "application"
+        (the status of session_id's application).
+        """
+        self._expire()
+        if not self.executor.running:
+            raise ExecutorUnavailable("OCR executor is not running")
+        if self._pending() >= self.max_pending:
+            raise ExecutorSaturated(f"{self.max_pending} verification jobs already pending")
+
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {
+            "job_id": job_id,
+            "document_type": doc_type,
+            "session_id": session_id,
+            "status": "queued",
+            "result": None,
+            "application": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        self._events[job_id] = asyncio.Event()
+        task = asyncio.create_task(self._run(job_id, doc_type, source, key, cleanup, slot, record))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return self.jobs[job_id]
+
+    async def _run(self, job_id, doc_type, source, key=None, cleanup=None, slot=None, record=None):
+        job = self.jobs[job_id]
+        try:
+            async with slot() if slot is not None else nullcontext():
+                job["status"] = "running"
+                job["result"] = await self.executor.verify(doc_type, source, wait=True, key=key)
+            if record is not None:
+                job["application"] = await record(job["result"])
+            job["status"] = "done"
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            if cleanup is not None:
+                cleanup()
+        job["finished_at"] = time.time()
+        self._events[job_id].set()
+
+    def get(self, job_id):
+        self._expire()
+        return self.jobs.get(job_id)
+
+    async def wait(self, job_id, timeout=None):
+        event = self._events.get(job_id)
+        if event is not None:
+            await asyncio.wait_for(event.wait(), timeout)
+        return self.jobs.get(job_id)
+
+
+ocr_executor = OCRExecutor()
+ocr_jobs = OCRJobs(ocr_executor)
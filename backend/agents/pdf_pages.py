@@ -0,0 +1,62 @@
+from .. import config
+
+# Pages whose embedded text layer has at least this many letters and digits
+# are read directly instead of being rasterised and OCR'd
+MIN_TEXT_LAYER_CHARS = 20
+
+
+def is_pdf(source):
+    """source is the upload's bytes or the path of its temp file"""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            head = f.read(1024)
+    else:
+        head = source[:1024]
+    # The header may be preceded by junk, but must start within the first KB
+    return b"%PDF-" in head
+
+
+def _open(source):
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise ValueError("PDF uploads require the optional 'pypdfium2' package")
+    try:
+        # pdfium reads a path lazily instead of loading the whole file
+        return pdfium.PdfDocument(source)
+    except pdfium.PdfiumError as e:
+        raise ValueError(f"Unreadable PDF: {e}")
+
+
+def page_count(source):
+    pdf = _open(source)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def text_layer(source, index):
+    """Embedded text of one page, or None when the page is a scan and needs OCR"""
+    pdf = _open(source)
+    try:
+        textpage = pdf[index].get_textpage()
+        text = textpage.get_text_bounded()
+    finally:
+        pdf.close()
+    if sum(ch.isalnum() for ch in text) < MIN_TEXT_LAYER_CHARS:
+        return None
+    return " ".join(text.split())
+
+
+def render_page(source, index, max_side=None):
+    """Rasterise one page to a grayscale array whose longer side is max_side pixels"""
+    max_side = max_side or config.OCR_MAX_SIDE
+    pdf = _open(source)
+    try:
+        page = pdf[index]
+        scale = max_side / max(page.get_size())
+        # Copy out of pdfium's buffer before the document is closed
+        return page.render(scale=scale, grayscale=True).to_numpy().copy()
+    finally:
+        pdf.close()
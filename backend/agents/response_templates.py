@@ -0,0 +1,109 @@
+import threading
+
+FIELD_LABELS = {
+    "name": "name",
+    "age": "age",
+    "employment_type": "employment type",
+    "salary": "monthly salary",
+    "credit_score": "credit score",
+    "loan_amount": "loan amount",
+}
+
+# What to say about the field the customer just gave us
+ACKNOWLEDGEMENTS = {
+    "name": "Nice to meet you, {first_name}!",
+    "age": "Thanks, I've noted your age as {age}.",
+    "employment_type": "Got it, you're {employment_type}.",
+    "salary": "Thanks, monthly salary of ₹{salary:,} noted.",
+    "credit_score": "Great, credit score {credit_score} noted.",
+    "loan_amount": "Thanks, loan amount of ₹{loan_amount:,} noted.",
+    None: "Thanks, I've noted your {captured_labels}.",  # several fields in one message
+}
+
+# How to ask for the next missing field
+QUESTIONS = {
+    "name": "Could you please tell me your full name?",
+    "age": "How old are you?",
+    "employment_type": "Are you salaried or self-employed?",
+    "salary": "What is your monthly salary in INR?",
+    "credit_score": "What is your credit score?",
+    "loan_amount": "How much would you like to borrow in INR? This is the loan amount, separate from your monthly salary.",
+}
+
+# Hand-written replies for the common (missing field, just-captured field) pairs
+OVERRIDES = {
+    ("age", "name"): "Nice to meet you, {first_name}! How old are you?",
+    ("salary", "employment_type"): "Got it, you're {employment_type}. What is your monthly salary in INR?",
+    ("loan_amount", "credit_score"): (
+        "Great, credit score {credit_score} noted. Last question: how much would you like to borrow in INR? "
+        "This is the loan amount, separate from your monthly salary."
+    ),
+}
+
+
+def _build_templates():
+    templates = {}
+    for missing, question in QUESTIONS.items():
+        for captured, acknowledgement in ACKNOWLEDGEMENTS.items():
+            if captured != missing:
+                templates[(missing, captured)] = f"{acknowledgement} {question}"
+    templates.update(OVERRIDES)
+    return templates
+
+
+TEMPLATES = _build_templates()
+
+
+class ResponseTemplates:
+    """Instant agent replies for turns whose next question is fully determined.
+
+    A turn is on-script when the extractor captured at least one field from
+    the customer's message; the reply is then just "acknowledge + ask for the
+    next missing field". Anything else goes to the LLM.
+    """
+
+    def __init__(self, templates=None):
+        self.templates = templates or TEMPLATES
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def render(self, captured: list, applicant):
+        """Return the templated reply for an ApplicantRecord, or None when the LLM should answer"""
+        # QUESTIONS is in the order the agent collects fields
+        missing_field = next((field for field in QUESTIONS if applicant.get(field) is None), None)
+        template = None
+        if missing_field and captured:
+            key = (missing_field, captured[0] if len(captured) == 1 else None)
+            template = self.templates.get(key)
+
+        if template is not None:
+            values = applicant.to_dict()
+            values["first_name"] = (applicant.name or "").split(" ")[0]
+            labels = [FIELD_LABELS[field] for field in captured]
+            values["captured_labels"] = " and ".join([", ".join(labels[:-1]), labels[-1]]) if len(labels) > 1 else labels[0]
+            try:
+                reply = template.format(**values)
+            except (KeyError, ValueError):
+                reply = None
+        else:
+            reply = None
+
+        with self._lock:
+            if reply is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return reply
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "template_replies": self._hits,
+                "llm_replies": self._misses,
+                "template_hit_rate": round(self._hits / total, 3) if total else None,
+            }
+
+
+response_templates = ResponseTemplates()
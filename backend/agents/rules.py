@@ -0,0 +1,252 @@
+import operator
+import numpy as np
+
+# Underwriting policy. Everything the underwriter checks lives in these tables;
+# the LLM prompt in underwriter.py describes the same criteria in prose.
+LOAN_TERM_YEARS = 5
+MAX_LOAN_TO_SALARY = 24
+EMPLOYMENT_TYPES = ("Salaried", "Self-employed")
+
+# Derived values the rules are written against. Each function works on plain
+# numbers as well as NumPy columns.
+METRICS = {
+    "age": lambda d: d["age"],
+    "age_at_maturity": lambda d: d["age"] + LOAN_TERM_YEARS,
+    "salary": lambda d: d["salary"],
+    "credit_score": lambda d: d["credit_score"],
+    "loan_amount": lambda d: d["loan_amount"],
+    "max_loan_amount": lambda d: d["salary"] * MAX_LOAN_TO_SALARY,
+    "employment_type": lambda d: d["employment_type"],
+}
+
+# (name, metric, op, limit, failure message, borderline margin)
+# The limit is either a constant or the name of another metric. A value within
+# the margin of its limit (on either side) makes the application borderline.
+ELIGIBILITY_RULES = [
+    ("min_age", "age", ">=", 21, "Age {age} below minimum 21", 1),
+    ("max_age_at_maturity", "age_at_maturity", "<=", 60,
+     "Age at loan maturity would be {age_at_maturity}, exceeding maximum 60", 1),
+    ("min_salary", "salary", ">=", 20000, "Salary ₹{salary:,} below minimum ₹20,000", 2000),
+    ("min_credit_score", "credit_score", ">=", 650, "Credit score {credit_score} below minimum 650", 15),
+    ("max_loan_amount", "loan_amount", "<=", "max_loan_amount",
+     "Loan amount ₹{loan_amount:,} exceeds maximum ₹{max_loan_amount:,} (24x salary)", 0.05),
+    ("employment", "employment_type", "in", EMPLOYMENT_TYPES,
+     "Employment type '{employment_type}' is not eligible (must be Salaried or Self-employed)", None),
+]
+
+ELIGIBLE_REASON = ("Meets all criteria: age {age}, salary ₹{salary:,}, credit score {credit_score}, "
+                   "loan amount ₹{loan_amount:,} within ₹{max_loan_amount:,} limit")
+
+# First tier whose conditions match (any of them) wins; the last tier is the default.
+RISK_TIERS = [
+    ("High", [("credit_score", "<", 650), ("salary", "<", 30000)]),
+    ("Medium", [("credit_score", "<", 700)]),
+    ("Low", []),
+]
+
+OPERATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+    "in": lambda value, options: value in options,
+}
+
+# Column-wise equivalents used by evaluate_columns
+VECTOR_OPERATORS = {
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    ">": np.greater,
+    "<": np.less,
+    "in": lambda values, options: np.isin(values, list(options)),
+}
+
+NUMERIC_FIELDS = ("age", "salary", "credit_score", "loan_amount")
+
+
+def _number(value):
+    if value is None or value == "":
+        return 0
+    if isinstance(value, str):
+        value = value.replace(",", "").strip()
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def normalize_applicant(customer_data: dict):
+    """Coerce applicant fields to the types the rules expect (missing numbers count as 0)"""
+    data = {field: _number(customer_data.get(field, 0)) for field in NUMERIC_FIELDS}
+    data["employment_type"] = str(customer_data.get("employment_type", "") or "").strip()
+    for employment_type in EMPLOYMENT_TYPES:
+        if data["employment_type"].lower() == employment_type.lower():
+            data["employment_type"] = employment_type
+    return data
+
+
+def _number_column(values, size):
+    if values is None:
+        return np.zeros(size)
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    # Slow path for blanks, thousands separators and junk (which becomes NaN)
+    column = np.empty(size)
+    for i, value in enumerate(values):
+        try:
+            column[i] = _number(value)
+        except (TypeError, ValueError):
+            column[i] = np.nan
+    return column
+
+
+def normalize_columns(columns: dict, size: int):
+    """Column-wise normalize_applicant: NumPy float columns plus a canonical employment column"""
+    data = {field: _number_column(columns.get(field), size) for field in NUMERIC_FIELDS}
+    canonical = {employment_type.lower(): employment_type for employment_type in EMPLOYMENT_TYPES}
+    employment = columns.get("employment_type")
+    if employment is None:
+        employment = [""] * size
+    # Only a handful of distinct values in practice, so normalize those and map back
+    raw = np.array([value or "" for value in employment], dtype=str)
+    distinct, inverse = np.unique(raw, return_inverse=True)
+    normalized = np.array(
+        [canonical.get(value.strip().lower(), value.strip()) for value in distinct.tolist()], dtype=object
+    )
+    data["employment_type"] = normalized[inverse] if size else normalized
+    return data
+
+
+class RuleDecision:
+    __slots__ = ("eligible", "failures", "borderline", "risk_score", "metrics")
+
+    def __init__(self, eligible, failures, borderline, risk_score, metrics):
+        self.eligible = eligible
+        self.failures = failures
+        self.borderline = borderline
+        self.risk_score = risk_score
+        self.metrics = metrics
+
+    @property
+    def reason(self):
+        if not self.eligible:
+            return "; ".join(self.failures)
+        return ELIGIBLE_REASON.format(**self.metrics)
+
+    def as_result(self):
+        return {
+            "eligible": self.eligible,
+            "reason": self.reason,
+            "risk_score": self.risk_score,
+            "next_step": "proceed_to_documents" if self.eligible else "rejected",
+        }
+
+
+class RuleEngine:
+    """Evaluates the underwriting tables above without touching the LLM.
+
+    The tables are compiled once into (metric, comparator, limit) closures so
+    a single decision is a handful of comparisons.
+    """
+
+    def __init__(self, rules=None, risk_tiers=None, metrics=None):
+        self.metrics = metrics or METRICS
+        self.rules = [self._compile_rule(*rule) for rule in (rules or ELIGIBILITY_RULES)]
+        self.risk_tiers = [
+            (tier, [(self.metrics[metric], OPERATORS[op], limit, VECTOR_OPERATORS[op])
+                    for metric, op, limit in conditions])
+            for tier, conditions in (risk_tiers or RISK_TIERS)
+        ]
+
+    def _compile_rule(self, name, metric, op, limit, message, margin):
+        if isinstance(limit, str):
+            limit_fn = self.metrics[limit]
+        else:
+            limit_fn = lambda d, limit=limit: limit
+        return (name, metric, self.metrics[metric], OPERATORS[op], limit_fn, message, margin, VECTOR_OPERATORS[op])
+
+    def compute_metrics(self, data):
+        return {name: fn(data) for name, fn in self.metrics.items()}
+
+    def evaluate(self, customer_data: dict):
+        data = normalize_applicant(customer_data)
+        metrics = self.compute_metrics(data)
+
+        failures = []
+        clear_failure = False
+        near_limit = False
+        for name, metric, metric_fn, compare, limit_fn, message, margin, _ in self.rules:
+            value = metric_fn(data)
+            limit = limit_fn(data)
+            passed = compare(value, limit)
+            near = False
+            if margin is not None:
+                # Relative margins (< 1) scale with the limit, e.g. 5% of the loan cap
+                window = margin * limit if margin < 1 else margin
+                near = abs(value - limit) <= window
+            if not passed:
+                failures.append(message.format(**metrics))
+                clear_failure = clear_failure or not near
+            near_limit = near_limit or near
+
+        # Only borderline if a near-limit value could still flip the outcome
+        borderline = near_limit and not clear_failure
+
+        risk_score = self.risk_tiers[-1][0]
+        for tier, conditions in self.risk_tiers:
+            if any(compare(metric_fn(data), limit) for metric_fn, compare, limit, _ in conditions):
+                risk_score = tier
+                break
+
+        return RuleDecision(not failures, failures, borderline, risk_score, metrics)
+
+    def evaluate_columns(self, columns: dict, size: int):
+        """Evaluate a whole batch at once.
+
+        Returns (eligible, borderline, risk_scores, failed, metrics) where failed
+        holds one boolean array per rule and metrics holds the derived columns.
+        Rows with unparseable numbers are marked invalid in metrics["_invalid"].
+        """
+        data = normalize_columns(columns, size)
+        metrics = {name: fn(data) for name, fn in self.metrics.items()}
+        invalid = np.zeros(size, dtype=bool)
+        for field in NUMERIC_FIELDS:
+            invalid |= np.isnan(data[field])
+
+        failed = []
+        clear_failure = np.zeros(size, dtype=bool)
+        near_limit = np.zeros(size, dtype=bool)
+        for name, metric, metric_fn, _, limit_fn, message, margin, compare in self.rules:
+            value = metric_fn(data)
+            limit = limit_fn(data)
+            failing = ~compare(value, limit)
+            if margin is not None:
+                window = margin * limit if margin < 1 else margin
+                near = np.abs(value - limit) <= window
+                clear_failure |= failing & ~near
+                near_limit |= near
+            else:
+                clear_failure |= failing
+            failed.append(failing)
+
+        eligible = ~np.logical_or.reduce(failed) & ~invalid
+        borderline = near_limit & ~clear_failure & ~invalid
+
+        default_tier = self.risk_tiers[-1][0]
+        risk_scores = np.full(size, default_tier, dtype=object)
+        assigned = np.zeros(size, dtype=bool)
+        for tier, conditions in self.risk_tiers:
+            if not conditions:
+                continue
+            matches = np.logical_or.reduce(
+                [compare(metric_fn(data), limit) for metric_fn, _, limit, compare in conditions]
+            ) & ~assigned
+            risk_scores[matches] = tier
+            assigned |= matches
+        risk_scores[invalid] = "High"
+
+        metrics["_invalid"] = invalid
+        return eligible, borderline, risk_scores, failed, metrics
+
+
+rule_engine = RuleEngine()
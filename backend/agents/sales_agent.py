@@ -1,70 +1,83 @@
 from ..models.ollama_model import LocalLLM
+from .response_templates import response_templates
+from .. import config
+from ..models.records import ApplicantRecord
+from ..metrics import timed
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 def get_sales_agent():
-    llm = LocalLLM(model_name="llama3.2:3b").get_llm()
+    llm = LocalLLM().get_llm()
     return llm
 
-def collect_customer_info(user_message: str, session_data=None):
-    llm = get_sales_agent()
-    
-    collected_fields = session_data or {}
-    
-    # Define required fields in order
-    required_fields = {
-        "name": "Full Name",
-        "age": "Age",
-        "employment_type": "Employment Type (Salaried/Self-employed)",
-        "salary": "Monthly Salary (INR)",
-        "credit_score": "Credit Score",
-        "loan_amount": "Loan Amount Required (INR)"
-    }
-    
-    # Check what's missing
-    missing_fields = {key: value for key, value in required_fields.items() if key not in collected_fields}
-    
-    system_prompt = """You are a friendly and professional Loan Sales Agent. Your goal is to collect loan application information politely and efficiently.
+# Static instructions, sent as the system prompt so the model can reuse its
+# evaluated tokens across turns. Keep it free of per-session data.
+SALES_SYSTEM_PROMPT = """You are a friendly, professional loan sales agent collecting a loan application.
 
-CRITICAL RULES:
-1. Be polite, professional and friendly
-2. Only ask for ONE missing piece of information at a time
-3. NEVER ask for information that's already collected
-4. LOAN AMOUNT and SALARY are TWO DIFFERENT THINGS - ask for them separately
-5. When ALL information is complete, return ONLY the JSON data without any additional text
-6. Keep your responses concise but warm
+Rules:
+1. Ask for only ONE missing item at a time, in a short, warm sentence.
+2. Never ask for information that is already collected.
+3. Monthly salary (what the customer earns per month) and loan amount (what they want to borrow, usually much larger) are different. Ask for them separately.
+4. When everything is collected, reply with ONLY this JSON and no other text:
+{"name": "...", "age": ..., "salary": ..., "credit_score": ..., "loan_amount": ..., "employment_type": "..."}"""
 
-FIELD EXPLANATIONS:
-- Monthly Salary: How much you earn per month
-- Loan Amount: How much money you want to borrow (usually much larger than salary)
+# Define required fields in order
+REQUIRED_FIELDS = {
+    "name": "Full Name",
+    "age": "Age",
+    "employment_type": "Employment Type (Salaried/Self-employed)",
+    "salary": "Monthly Salary (INR)",
+    "credit_score": "Credit Score",
+    "loan_amount": "Loan Amount Required (INR)"
+}
 
-make sure to ask about the loan amount required separately from the salary.
-
-Current conversation:"""
-    
-    # Build the prompt
-    prompt = system_prompt + "\n\n"
+@timed("build_sales_prompt")
+def build_sales_prompt(user_message: str, applicant: ApplicantRecord = None):
+    """Per-turn part of the prompt: what is collected, what to ask next and the customer's message"""
+    collected_fields = applicant.to_dict() if applicant is not None else {}
     
-    # Show collected information
-    if collected_fields:
-        prompt += "✅ Collected Information:\n"
-        for field, display_name in required_fields.items():
-            if field in collected_fields:
-                prompt += f"- {display_name}: {collected_fields[field]}\n"
-    else:
-        prompt += "No information collected yet.\n"
+    # Check what's missing
+    missing_fields = [display_name for key, display_name in REQUIRED_FIELDS.items() if key not in collected_fields]
+    collected = [f"{display_name}: {collected_fields[field]}"
+                 for field, display_name in REQUIRED_FIELDS.items() if field in collected_fields]
     
-    # Show missing information
+    prompt = f"Collected: {'; '.join(collected) if collected else 'nothing yet'}\n"
     if missing_fields:
-        prompt += f"\n❌ Still needed: {', '.join(missing_fields.values())}\n"
-        prompt += f"\nAsk for: {list(missing_fields.values())[0]}\n"
+        prompt += f"Still needed: {', '.join(missing_fields)}\n"
+        prompt += f"Ask for: {missing_fields[0]}\n"
     else:
-        prompt += "\n🎉 ALL INFORMATION COLLECTED! Return JSON now.\n"
-        prompt += "JSON format: {\"name\": \"...\", \"age\": ..., \"salary\": ..., \"credit_score\": ..., \"loan_amount\": ..., \"employment_type\": \"...\"}\n"
+        prompt += "All information collected. Return the JSON now.\n"
     
-    prompt += f"\nCustomer: {user_message}"
-    prompt += f"\nAgent:"
+    prompt += f"Customer: {user_message}\nAgent:"
     
-    print(f"=== PROMPT SENT TO LLM ===\n{prompt}\n========================")  # Debug
-    
-    response = llm.invoke(prompt)
-    return response
\ No newline at end of file
+    logger.debug("Sales prompt:\n%s", prompt, extra={"sample": True, "pii": [collected_fields.get("name")]})
+    return prompt
+
+def templated_reply(applicant: ApplicantRecord = None, captured=None):
+    """Fixed reply for a turn that just captured a field, or None if the LLM has to answer"""
+    if not config.CHAT_TEMPLATES:
+        return None
+    return response_templates.render(captured or [], applicant or ApplicantRecord())
+
+@timed("collect_customer_info")
+async def collect_customer_info(user_message: str, applicant: ApplicantRecord = None, captured=None):
+    reply = templated_reply(applicant, captured)
+    if reply is not None:
+        return reply
+    llm = get_sales_agent()
+    prompt = build_sales_prompt(user_message, applicant)
+    response = await llm.ainvoke(prompt, system=SALES_SYSTEM_PROMPT, purpose="sales")
+    return response
+
+async def stream_customer_info(user_message: str, applicant: ApplicantRecord = None, captured=None):
+    """Like collect_customer_info, but yields the reply as it is generated"""
+    reply = templated_reply(applicant, captured)
+    if reply is not None:
+        yield reply
+        return
+    llm = get_sales_agent()
+    prompt = build_sales_prompt(user_message, applicant)
+    async for chunk in llm.astream(prompt, system=SALES_SYSTEM_PROMPT, purpose="sales"):
+        yield chunk
\ No newline at end of file
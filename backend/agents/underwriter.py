@@ -1,11 +1,22 @@
 from ..models.ollama_model import LocalLLM
+from ..models.records import ApplicantRecord
+from . import rules
+from .rules import rule_engine
+from .decision_cache import decision_cache
+from .batch_reader import read_batches
+from .. import config
+from ..metrics import timed
+from typing import Literal
+from pydantic import BaseModel, Field, ValidationError
+import hashlib
 import json
-import re
+import logging
+import threading
+import numpy as np
 
-def get_underwriter_agent():
-    llm = LocalLLM(model_name="llama3.2:3b").get_llm()
-
-    system_prompt = """You are a Loan Underwriter AI. Analyze customer loan applications and return ONLY JSON.
+# Static instructions, sent as the system prompt so the model can reuse its
+# evaluated tokens across calls. Application data goes in the prompt.
+UNDERWRITER_SYSTEM_PROMPT = """You are a Loan Underwriter AI. Analyze the customer loan application and return ONLY JSON.
 
 CRITERIA:
 - Minimum age: 21
@@ -16,122 +27,141 @@ CRITERIA:
 - Must be employed (Salaried or Self-employed)
 
 RETURN ONLY THIS JSON FORMAT:
-{
-  "eligible": true/false,
-  "reason": "Clear explanation based on criteria",
-  "risk_score": "Low/Medium/High",
-  "next_step": "proceed_to_documents" or "rejected"
-}
+{"eligible": true/false, "risk_score": "Low/Medium/High", "reason": "Short explanation based on criteria"}
 
 Examples:
-GOOD: {"eligible": true, "reason": "Meets all criteria: age 28, salary ₹75,000, credit score 780, loan amount reasonable", "risk_score": "Low", "next_step": "proceed_to_documents"}
-GOOD: {"eligible": false, "reason": "Credit score 600 below minimum 650", "risk_score": "High", "next_step": "rejected"}
+{"eligible": true, "risk_score": "Low", "reason": "Meets all criteria: age 28, salary ₹75,000, credit score 780, loan amount reasonable"}
+{"eligible": false, "risk_score": "High", "reason": "Credit score 600 below minimum 650"}"""
+
+EXPLAIN_SYSTEM_PROMPT = """You are a Loan Underwriter. Explain an underwriting decision that has already been made to the customer in one or two sentences. Do not change the decision."""
+
+class UnderwritingDecision(BaseModel):
+    """What the model must return; next_step is derived from eligible"""
+    eligible: bool
+    risk_score: Literal["Low", "Medium", "High"]
+    # Last, so the decision fields are generated before the free text
+    reason: str = Field(max_length=300)
+
+# Sent as Ollama's "format" so decoding can only produce a matching object
+DECISION_SCHEMA = UnderwritingDecision.model_json_schema()
+
+logger = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+decision_stats = {"llm_decisions": 0, "parse_failures": 0, "completion_tokens_total": 0}
+
+def underwriting_stats():
+    with _stats_lock:
+        stats = dict(decision_stats)
+    decisions = stats["llm_decisions"]
+    stats["parse_failure_rate"] = round(stats["parse_failures"] / decisions, 4) if decisions else None
+    stats["completion_tokens_avg"] = round(stats["completion_tokens_total"] / decisions, 1) if decisions else None
+    stats["cache"] = decision_cache.stats()
+    return stats
+
+def get_underwriter_agent():
+    llm = LocalLLM().get_llm()
+    return llm, UNDERWRITER_SYSTEM_PROMPT
+
+def policy_version():
+    """Hash of everything besides the applicant that a decision depends on.
 
-Do not add any other text. Return only JSON."""
+    Part of every decision cache key, so editing the prompts, the decision
+    schema, the rule tables behind manual_underwriting or the model settings
+    retires all previously cached decisions.
+    """
+    policy = [
+        UNDERWRITER_SYSTEM_PROMPT, EXPLAIN_SYSTEM_PROMPT, DECISION_SCHEMA,
+        rules.ELIGIBILITY_RULES, rules.ELIGIBLE_REASON, rules.RISK_TIERS,
+        rules.LOAN_TERM_YEARS, rules.MAX_LOAN_TO_SALARY, rules.EMPLOYMENT_TYPES,
+        config.OLLAMA_MODEL, config.UNDERWRITING_MODE, config.UNDERWRITING_LLM_REASON,
+        config.UNDERWRITING_MAX_TOKENS,
+    ]
+    return hashlib.sha256(json.dumps(policy, default=repr, ensure_ascii=False).encode()).hexdigest()[:16]
 
-    return llm, system_prompt
+POLICY_VERSION = policy_version()
 
-def underwrite(customer_data: dict):
+@timed("underwrite")
+async def underwrite(applicant: ApplicantRecord):
+    """Decide an application, reusing the decision for an identical one made within the TTL"""
+    customer_data = applicant.to_dict()
+    key = decision_cache.key(customer_data, POLICY_VERSION)
+    result, cached = await decision_cache.get_or_compute(key, lambda: _decide(customer_data))
+    result["cached"] = cached
+    return result
+
+async def _decide(customer_data: dict):
+    """Returns (result, cacheable); LLM replies that fell back to the rules are not cached"""
+    mode = config.UNDERWRITING_MODE
+    decision = None if mode == "llm" else rule_engine.evaluate(customer_data)
+    if decision is None or mode == "hybrid" and decision.borderline:
+        # LLM mode, or close to a threshold in hybrid mode - let the model weigh the whole application
+        result, parsed = await _llm_decision(customer_data)
+        # A reply that didn't parse fell back to the rules
+        result["decided_by"] = "llm" if parsed else "rules"
+        return result, parsed
+
+    result = decision.as_result()
+    result["decided_by"] = "rules"
+    if mode == "hybrid" and config.UNDERWRITING_LLM_REASON:
+        result["reason"] = await explain_decision(customer_data, result)
+    return result, True
+
+async def explain_decision(customer_data: dict, result: dict):
+    """Ask the LLM to phrase an already-made rule decision for the customer"""
+    llm = LocalLLM().get_llm()
+    outcome = "approved for document verification" if result["eligible"] else "rejected"
+    prompt = f"""Decision: {outcome}
+Rule findings: {result['reason']}
+Application: {json.dumps(customer_data, separators=(",", ":"))}"""
+    try:
+        reason = (await llm.ainvoke(prompt, system=EXPLAIN_SYSTEM_PROMPT, purpose="explain")).strip()
+    except Exception as e:
+        logger.warning("Reason generation failed: %s", e)
+        return result["reason"]
+    return reason or result["reason"]
+
+async def llm_underwriting(customer_data: dict):
+    return (await _llm_decision(customer_data))[0]
+
+async def _llm_decision(customer_data: dict):
     llm, system_prompt = get_underwriter_agent()
 
-    # Format customer data for better readability
-    formatted_data = json.dumps(customer_data, indent=2)
+    # Compact JSON: every character here is evaluated on every call
+    formatted_data = json.dumps(customer_data, separators=(",", ":"), ensure_ascii=False)
     
-    prompt = f"""{system_prompt}
+    prompt = f"""CUSTOMER APPLICATION DATA: {formatted_data}
+UNDERWRITER DECISION:"""
 
-CUSTOMER APPLICATION DATA:
-{formatted_data}
+    logger.debug("Underwriter prompt:\n%s", prompt, extra={"sample": True})
 
-UNDERWRITER DECISION:"""
+    # Constrained to DECISION_SCHEMA and capped, so the reply is one small object
+    response, tokens = await llm.agenerate_json(prompt, DECISION_SCHEMA, system=system_prompt,
+                                                purpose="underwriting", num_predict=config.UNDERWRITING_MAX_TOKENS)
+    logger.debug("Underwriter raw response: %s", response, extra={"sample": True})
 
-    print("=== UNDERWRITER PROMPT ===")
-    print(prompt)
-    print("==========================")
-    
-    response = llm.invoke(prompt)
-    
-    print(f"=== UNDERWRITER RAW RESPONSE ===")
-    print(response)
-    print("===============================")
-    
-    # Robust JSON extraction
     try:
-        # Method 1: Try direct JSON parse
-        result = json.loads(response.strip())
-    except json.JSONDecodeError:
-        try:
-            # Method 2: Extract JSON from text
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-            else:
-                # Method 3: Fallback - analyze data manually
-                result = manual_underwriting(customer_data)
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing failed: {e}")
-            # Method 4: Ultimate fallback
-            result = {
-                "eligible": False,
-                "reason": "System error in underwriting process",
-                "risk_score": "High",
-                "next_step": "rejected"
-            }
-    
-    # Validate the result structure
-    return validate_underwriting_result(result, customer_data)
+        decision = UnderwritingDecision.model_validate_json(response)
+    except ValidationError as e:
+        logger.warning("Underwriting decision did not match the schema: %s", e)
+        decision = None
+
+    with _stats_lock:
+        decision_stats["llm_decisions"] += 1
+        decision_stats["completion_tokens_total"] += tokens
+        if decision is None:
+            decision_stats["parse_failures"] += 1
+
+    if decision is None:
+        return manual_underwriting(customer_data), False
+    result = decision.model_dump()
+    result["next_step"] = "proceed_to_documents" if decision.eligible else "rejected"
+    return result, True
 
 def manual_underwriting(customer_data: dict):
     """Fallback manual underwriting when LLM fails"""
     try:
-        age = customer_data.get('age', 0)
-        salary = customer_data.get('salary', 0)
-        credit_score = customer_data.get('credit_score', 0)
-        loan_amount = customer_data.get('loan_amount', 0)
-        employment_type = customer_data.get('employment_type', '')
-        
-        # Basic criteria check
-        eligible = True
-        reasons = []
-        
-        if age < 21:
-            eligible = False
-            reasons.append(f"Age {age} below minimum 21")
-        
-        if salary < 20000:
-            eligible = False
-            reasons.append(f"Salary ₹{salary:,} below minimum ₹20,000")
-        
-        if credit_score < 650:
-            eligible = False
-            reasons.append(f"Credit score {credit_score} below minimum 650")
-        
-        # Loan amount check (should not exceed 24x monthly salary)
-        max_loan_amount = salary * 24
-        if loan_amount > max_loan_amount:
-            eligible = False
-            reasons.append(f"Loan amount ₹{loan_amount:,} exceeds maximum ₹{max_loan_amount:,} (24x salary)")
-        
-        # Age at maturity check (assuming 5-year loan)
-        if age + 5 > 60:
-            eligible = False
-            reasons.append(f"Age at loan maturity would be {age + 5}, exceeding maximum 60")
-        
-        reason_text = "Meets all criteria" if eligible else "; ".join(reasons)
-        
-        # Determine risk score
-        risk_score = "Low"
-        if credit_score < 700:
-            risk_score = "Medium"
-        if credit_score < 650 or salary < 30000:
-            risk_score = "High"
-        
-        return {
-            "eligible": eligible,
-            "reason": reason_text,
-            "risk_score": risk_score,
-            "next_step": "proceed_to_documents" if eligible else "rejected"
-        }
-        
+        return rule_engine.evaluate(customer_data).as_result()
     except Exception as e:
         return {
             "eligible": False,
@@ -140,37 +170,62 @@ def manual_underwriting(customer_data: dict):
             "next_step": "rejected"
         }
 
-def validate_underwriting_result(result: dict, customer_data: dict):
-    """Validate and ensure the underwriting result has correct structure"""
-    
-    # Ensure all required fields exist
-    required_fields = ["eligible", "reason", "risk_score", "next_step"]
-    for field in required_fields:
-        if field not in result:
-            # Create a fallback result
-            return manual_underwriting(customer_data)
-    
-    # Ensure boolean type for eligible
-    if not isinstance(result['eligible'], bool):
-        result['eligible'] = str(result['eligible']).lower() in ['true', 'yes', '1', 'eligible']
-    
-    # Ensure next_step is valid
-    if result['eligible'] and result['next_step'] != 'proceed_to_documents':
-        result['next_step'] = 'proceed_to_documents'
-    elif not result['eligible'] and result['next_step'] != 'rejected':
-        result['next_step'] = 'rejected'
-    
-    # Ensure risk_score is valid
-    valid_risk_scores = ['Low', 'Medium', 'High']
-    if result['risk_score'] not in valid_risk_scores:
-        # Determine risk score based on data
-        credit_score = customer_data.get('credit_score', 0)
-        if credit_score >= 750:
-            result['risk_score'] = 'Low'
-        elif credit_score >= 650:
-            result['risk_score'] = 'Medium'
-        else:
-            result['risk_score'] = 'High'
-    
-    return result
+def _display_column(column, invalid):
+    # Show whole numbers without a trailing ".0", as the single-application path does
+    if column.dtype.kind == "f":
+        valid = column[~invalid]
+        if np.all(np.mod(valid, 1) == 0):
+            return np.where(invalid, 0, column).astype(np.int64).tolist()
+    return column.tolist()
+
+def underwrite_batch(source, fmt: str, chunk_size: int = None):
+    """Score a file of applications with the rule engine, yielding one result per row.
+
+    The input is read chunk by chunk and every rule runs as a NumPy column
+    operation over the chunk, so memory stays bounded and the LLM is never called.
+    Eligible rows get the short "Meets all criteria" reason; rejected rows list
+    every failed rule, as manual_underwriting does.
+    """
+    chunk_size = chunk_size or config.BATCH_CHUNK_SIZE
+    messages = [rule[5] for rule in rule_engine.rules]
+    row_offset = 0
+
+    for columns, size in read_batches(source, fmt, chunk_size):
+        eligible, borderline, risk_scores, failed, metrics = rule_engine.evaluate_columns(columns, size)
+        invalid = metrics.pop("_invalid")
+        display = {name: _display_column(column, invalid) for name, column in metrics.items()}
+        any_failed = np.logical_or.reduce(failed)
+        failed = [mask.tolist() for mask in failed]
+        names = list(display)
+        values = list(zip(*display.values()))
+
+        ids = columns.get("id") or columns.get("name")
+        eligible = eligible.tolist()
+        borderline = borderline.tolist()
+        invalid = invalid.tolist()
+        any_failed = any_failed.tolist()
+        risk_scores = risk_scores.tolist()
+
+        for i in range(size):
+            result = {"row": row_offset + i}
+            if ids is not None:
+                result["id"] = ids[i]
+            if invalid[i]:
+                result.update({"eligible": False, "reason": "Invalid numeric value in application",
+                               "risk_score": "High", "next_step": "rejected", "borderline": False})
+                yield result
+                continue
+
+            if any_failed[i]:
+                row = dict(zip(names, values[i]))
+                reason = "; ".join(message.format_map(row) for message, mask in zip(messages, failed) if mask[i])
+            else:
+                reason = "Meets all criteria"
+            result["eligible"] = eligible[i]
+            result["reason"] = reason
+            result["risk_score"] = risk_scores[i]
+            result["next_step"] = "proceed_to_documents" if eligible[i] else "rejected"
+            result["borderline"] = borderline[i]
+            yield result
 
+        row_offset += size
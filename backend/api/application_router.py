@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from ..agents.decision import pipeline
+
+router = APIRouter()
+
+@router.get("/stats")
+def pipeline_stats():
+    """Concurrency, queue depth and throughput of every pipeline stage"""
+    return pipeline.stats()
+
+@router.get("/{session_id}")
+def application_status(session_id: str):
+    """Stage, underwriting result, document verdicts and final decision of one application"""
+    status = pipeline.status(session_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired application")
+    return status
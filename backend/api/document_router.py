@@ -1,10 +1,133 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from ..agents.doc_verify import DocumentVerifier
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from ..agents.decision import pipeline, StageSaturated, UnknownApplication
+from ..agents.doc_verify import reader_pool
+from ..agents.ocr_cache import ocr_cache
+from ..agents.ocr_executor import ocr_executor, ocr_jobs, ExecutorSaturated, ExecutorUnavailable
+from .uploads import spool_upload, discard
+from .. import config
 
 router = APIRouter()
 
+def _busy(e: Exception):
+    if isinstance(e, (ExecutorSaturated, StageSaturated)):
+        return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "2"})
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+async def _record(session_id: str, verdicts: dict):
+    """Add the verdicts to the application and return its status with the new final decision.
+
+    None if there is no such application (not started, rejected or expired):
+    the document is still verified, it just doesn't count towards anything.
+    """
+    try:
+        return await pipeline.record_documents(session_id, verdicts)
+    except UnknownApplication:
+        return None
+    except StageSaturated as e:
+        raise _busy(e)
+
 @router.post("/verify")
-async def verify_document(doc_type: str = Form(...), file: UploadFile = File(...)):
-    file_bytes = await file.read()
-    result = DocumentVerifier.verify_document(doc_type, file_bytes)
-    return {"document_type": doc_type, "result": result}
\ No newline at end of file
+async def verify_document(doc_type: str = Form(...), file: UploadFile = File(...),
+                          session_id: Optional[str] = Form(None)):
+    """Verify one document; with session_id the verdict also counts towards that application"""
+    upload = await spool_upload(file)
+    try:
+        result = await pipeline.run("ocr", ocr_executor.verify, doc_type, upload.path, wait=True, key=upload.key)
+    except (ExecutorSaturated, ExecutorUnavailable, StageSaturated) as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        discard(upload)
+    response = {"document_type": doc_type, "result": result}
+    if session_id:
+        response["application"] = await _record(session_id, {doc_type: result})
+    return response
+
+@router.post("/verify_batch")
+async def verify_documents(doc_types: List[str] = Form(...), files: List[UploadFile] = File(...),
+                           session_id: Optional[str] = Form(None)):
+    """Verify several documents (images or multi-page PDFs) in one request.
+
+    Send one doc_types field per file, in the same order, or a single
+    comma-separated doc_types value. With session_id the verdicts also
+    count towards that application.
+    """
+    if len(doc_types) == 1 and "," in doc_types[0]:
+        doc_types = [doc_type.strip() for doc_type in doc_types[0].split(",")]
+    if len(doc_types) != len(files):
+        raise HTTPException(status_code=400, detail=f"Got {len(files)} files but {len(doc_types)} doc_types")
+    if len(files) > config.OCR_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {config.OCR_BATCH_MAX_FILES} files per batch")
+
+    uploads = []
+    try:
+        for file in files:
+            uploads.append(await spool_upload(file))
+        documents = [(doc_type, upload.filename, upload.path, upload.key)
+                     for doc_type, upload in zip(doc_types, uploads)]
+        # Every document is its own job of the OCR stage
+        report = await ocr_executor.verify_batch(documents, slot=pipeline.stages["ocr"].slot)
+    except (ExecutorSaturated, ExecutorUnavailable, StageSaturated) as e:
+        raise _busy(e)
+    finally:
+        discard(*uploads)
+    if session_id:
+        report["application"] = await _record(
+            session_id, {doc["document_type"]: doc["result"] for doc in report["documents"]})
+    return report
+
+@router.post("/jobs", status_code=202)
+async def submit_verification_job(doc_type: str = Form(...), file: UploadFile = File(...),
+                                  session_id: Optional[str] = Form(None)):
+    """Verify one document in the background; with session_id the verdict also counts towards that application"""
+    upload = await spool_upload(file)
+    record = (lambda result: _record(session_id, {doc_type: result})) if session_id else None
+    try:
+        # The job is a job of the OCR stage, like a /verify request
+        job = ocr_jobs.submit(doc_type, upload.path, key=upload.key, cleanup=lambda: discard(upload),
+                              slot=pipeline.stages["ocr"].slot, record=record, session_id=session_id)
+    except (ExecutorSaturated, ExecutorUnavailable) as e:
+        discard(upload)
+        raise _busy(e)
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+@router.get("/jobs/{job_id}")
+def get_verification_job(job_id: str):
+    job = ocr_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_verification_job(job_id: str):
+    if ocr_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+
+    async def events():
+        # Server-sent events: a status heartbeat until the job finishes, then the job itself
+        while True:
+            try:
+                job = await ocr_jobs.wait(job_id, timeout=5)
+            except asyncio.TimeoutError:
+                job = ocr_jobs.get(job_id)
+                if job is not None:
+                    yield f"event: status\ndata: {json.dumps({'status': job['status']})}\n\n"
+                    continue
+            if job is None:
+                # The job expired while the client was still listening
+                yield f"event: error\ndata: {json.dumps({'detail': 'Unknown or expired job'})}\n\n"
+                break
+            yield f"event: result\ndata: {json.dumps(job)}\n\n"
+            break
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.get("/stats")
+def ocr_stats():
+    return {"executor": ocr_executor.stats(), "reader_pool": reader_pool.stats(), "cache": ocr_cache.stats(),
+            "stage": pipeline.stages["ocr"].stats()}
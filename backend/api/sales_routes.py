@@ -1,10 +1,19 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from ..agents.sales_agent import collect_customer_info
+from fastapi.responses import StreamingResponse
+from ..agents.sales_agent import collect_customer_info, stream_customer_info
 from ..memory import memory
 from ..agents.underwriter import underwrite
+from ..agents.field_extractor import extract_fields
+from ..agents.decision import pipeline, StageSaturated
+from ..models.records import ApplicantRecord, Stage, FIELDS
+from .. import config
+from ..metrics import timed
+import asyncio
 import json
-import re
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -12,86 +21,26 @@ class Message(BaseModel):
     session_id: str
     user_message: str
 
-def extract_user_data(user_message: str, current_session: dict):
-    """Extract all possible data from user message and update session"""
-    message_lower = user_message.lower()
-    updated = False
-    
-    # Extract name (more robust)
-    if "name" not in current_session:
-        name_patterns = [
-            r"my name is (\w+ \w+)",
-            r"i am (\w+ \w+)", 
-            r"name is (\w+ \w+)",
-            r"call me (\w+ \w+)",
-            r"i'm (\w+ \w+)"
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                current_session["name"] = match.group(1).title()
-                updated = True
-                break
-    
-    # Extract age
-    if "age" not in current_session:
-        age_match = re.search(r'(\d{2})\s*(?:years|yrs|year|yo)', message_lower)
-        if not age_match:
-            age_match = re.search(r'\b(\d{2})\b', user_message)
-        if age_match and 18 <= int(age_match.group(1)) <= 70:
-            current_session["age"] = int(age_match.group(1))
-            updated = True
-    
-    # Extract salary
-    if "salary" not in current_session:
-        salary_match = re.search(r'(\d{4,6})\s*(?:inr|rs|rupees|salary)', message_lower)
-        if not salary_match:
-            salary_match = re.search(r'salary.*?(\d{4,6})', message_lower)
-        if not salary_match:
-            salary_match = re.search(r'(\d{4,6})', user_message)
-        if salary_match:
-            salary = int(salary_match.group(1))
-            if 10000 <= salary <= 500000:
-                current_session["salary"] = salary
-                updated = True
-    
-    # Extract credit score
-    if "credit_score" not in current_session:
-        credit_match = re.search(r'credit.*?(\d{3})', message_lower)
-        if not credit_match:
-            credit_match = re.search(r'(\d{3})\s*(?:score|credit)', message_lower)
-        if not credit_match:
-            credit_match = re.search(r'\b(\d{3})\b', user_message)
-        if credit_match:
-            score = int(credit_match.group(1))
-            if 300 <= score <= 900:
-                current_session["credit_score"] = score
-                updated = True
-    
-    # Extract loan amount
-    if "loan_amount" not in current_session:
-        loan_match = re.search(r'loan.*?(\d{4,7})', message_lower)
-        if not loan_match:
-            loan_match = re.search(r'(\d{4,7})\s*(?:loan|amount)', message_lower)
-        if not loan_match:
-            loan_match = re.search(r'(\d{4,7})', user_message)
-        if loan_match:
-            loan_amt = int(loan_match.group(1))
-            if 10000 <= loan_amt <= 10000000:
-                current_session["loan_amount"] = loan_amt
-                updated = True
-    
-    # Extract employment type
-    if "employment_type" not in current_session:
-        if any(word in message_lower for word in ["salaried", "salary job", "employed", "working in"]):
-            current_session["employment_type"] = "Salaried"
-            updated = True
-        elif any(word in message_lower for word in ["self-employed", "self employed", "business", "entrepreneur"]):
-            current_session["employment_type"] = "Self-employed"
-            updated = True
-    
-    return updated
+@timed("extract_user_data")
+def extract_user_data(user_message: str, applicant: ApplicantRecord):
+    """Extract all possible data from user message into the applicant record.
+
+    Returns the fields captured from this message, in collection order.
+    """
+    missing = applicant.missing()
+    if not missing:
+        return []
+
+    # The agent asks for missing fields in order, so the first one is what the user is most likely answering
+    matches = extract_fields(user_message, missing=missing, expected=missing[0])
+    captured = []
+    for field, match in matches.items():
+        logger.debug("extracted %s=%r (confidence %s)", field, match.value, match.confidence)
+        if match.confidence >= config.EXTRACTION_MIN_CONFIDENCE:
+            applicant.set(field, match.value)
+            captured.append(field)
+    
+    return sorted(captured, key=FIELDS.index)
 
 def is_valid_json_response(text):
     """Check if the response is valid JSON with all required fields"""
@@ -122,122 +71,138 @@ def options_message():
     response.headers["Access-Control-Allow-Headers"] = "Content-Type, Accept"
     return response
 
-@router.post("/message")
-def chat(message: Message):
-    # Get current session data
-    session_data = memory.get(message.session_id)
-    
-    print(f"BEFORE - Session {message.session_id} data: {session_data}")
-    
-    # Extract data from user message
-    extract_user_data(message.user_message, session_data)
-    
-    print(f"AFTER EXTRACTION - Session {message.session_id} data: {session_data}")
-    
-    # Update memory with potentially new data
-    memory.update(message.session_id, session_data)
-    
-    # Get updated session data
-    updated_session_data = memory.get(message.session_id)
-    
-    # Check if all fields are already collected in session data
-    required_fields = ["name", "age", "salary", "credit_score", "loan_amount", "employment_type"]
-    if all(field in updated_session_data for field in required_fields):
-        print("ALL FIELDS COLLECTED IN SESSION DATA - Generating JSON")
-        # Manually create JSON since LLM might not be doing it
-        final_json = {
-            "name": updated_session_data["name"],
-            "age": updated_session_data["age"],
-            "salary": updated_session_data["salary"],
-            "credit_score": updated_session_data["credit_score"],
-            "loan_amount": updated_session_data["loan_amount"],
-            "employment_type": updated_session_data["employment_type"]
-        }
-        
-        # Send to underwriter
-        print("=== SENDING TO UNDERWRITER ===")
-        decision = underwrite(final_json)
-        
-        print(f"=== UNDERWRITER RESULT ===")
-        print(json.dumps(decision, indent=2))
-        print("===========================")
+def prepare_session(message: Message):
+    """Run field extraction for this turn and return the updated session state and the captured fields"""
+    captured = []
+
+    def extract(state):
+        # May run again if another worker changed the session meanwhile
+        captured[:] = extract_user_data(message.user_message, state.applicant)
+        return state
+
+    state = memory.atomic_update(message.session_id, extract)
+    logger.debug("Session %s captured %s: %s", message.session_id, captured, state)
+    return state, captured
+
+async def extract_turn(message: Message):
+    """prepare_session as a job of the pipeline's extraction stage; 429 if its queue is full"""
+    try:
+        return await pipeline.run("extraction", prepare_session, message)
+    except StageSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+async def underwriting_reply(session_id: str, applicant: ApplicantRecord):
+    """Underwrite a complete application and build the chat response for the decision"""
+    # Send to underwriter
+    decision = await pipeline.run("underwriting", underwrite, applicant)
+    logger.info("Underwriting decision for session %s", session_id,
+                extra={"eligible": decision.get("eligible"), "risk_score": decision.get("risk_score"),
+                       "decided_by": decision.get("decided_by"), "cached": decision.get("cached")})
+    
+    # Handle underwriter decision
+    if decision.get('eligible', False) and decision.get('next_step') == 'proceed_to_documents':
+        # Eligible - keep session for document verification
+        def advance(state):
+            state.applicant = applicant
+            state.stage = Stage.DOCUMENT_VERIFICATION
+            state.underwriting_result = decision
+            return state
+        # Session backends may do network or disk I/O; keep it off the event loop
+        await asyncio.to_thread(memory.atomic_update, session_id, advance)
         
-        # Handle underwriter decision
-        if decision.get('eligible', False) and decision.get('next_step') == 'proceed_to_documents':
-            # Eligible - keep session for document verification
-            updated_session_data['_stage'] = 'document_verification'
-            updated_session_data['_underwriting_result'] = decision
-            memory.update(message.session_id, updated_session_data)
-            
-            return {
-                "agent_reply": f"🎉 Great news! {decision.get('reason', 'You are eligible for further processing.')} Please proceed with document verification.",
-                "underwriter_result": decision,
-                "status": "eligible_for_documents",
-                "collected_data": final_json,
-                "next_step": "proceed_to_document_upload"
-            }
-        else:
-            # Not eligible - end conversation
-            memory.clear(message.session_id)
-            return {
-                "agent_reply": f"❌ Thank you for your application. {decision.get('reason', 'Unfortunately, you are not eligible at this time.')}",
-                "underwriter_result": decision,
-                "status": "rejected",
-                "collected_data": final_json,
-                "next_step": "end"
-            }
-    
-    # Get agent response
-    agent_reply = collect_customer_info(
-        user_message=message.user_message,
-        session_data=updated_session_data
-    )
-    
-    print(f"AGENT REPLY: {agent_reply}")
+        return {
+            "agent_reply": f"🎉 Great news! {decision.get('reason', 'You are eligible for further processing.')} Please proceed with document verification.",
+            "underwriter_result": decision,
+            "status": "eligible_for_documents",
+            "collected_data": applicant.to_dict(),
+            "next_step": "proceed_to_document_upload"
+        }
+    else:
+        # Not eligible - end conversation
+        await asyncio.to_thread(memory.clear, session_id)
+        return {
+            "agent_reply": f"❌ Thank you for your application. {decision.get('reason', 'Unfortunately, you are not eligible at this time.')}",
+            "underwriter_result": decision,
+            "status": "rejected",
+            "collected_data": applicant.to_dict(),
+            "next_step": "end"
+        }
+
+async def underwrite_if_complete(session_id: str, state):
+    """Underwrite once every field is collected; None while some are still missing"""
+    if not state.applicant.complete:
+        return None
+    logger.debug("All fields collected for session %s", session_id)
+    return await underwriting_reply(session_id, state.applicant)
+
+async def finish_turn(session_id: str, state, agent_reply: str):
+    """Turn the agent's reply into the chat response, underwriting if it returned the final JSON"""
+    logger.debug("Agent reply: %s", agent_reply, extra={"sample": True, "pii": [state.applicant.name]})
     
     # Check if agent returned valid JSON
     if is_valid_json_response(agent_reply):
         try:
-            json_data = json.loads(agent_reply.strip())
-            
-            # Send to underwriter
-            print("=== SENDING TO UNDERWRITER (JSON RESPONSE) ===")
-            decision = underwrite(json_data)
-            
-            print(f"=== UNDERWRITER RESULT ===")
-            print(json.dumps(decision, indent=2))
-            print("===========================")
-            
-            # Handle underwriter decision
-            if decision.get('eligible', False) and decision.get('next_step') == 'proceed_to_documents':
-                # Eligible - keep session for document verification
-                session_data['_stage'] = 'document_verification'
-                session_data['_underwriting_result'] = decision
-                memory.update(message.session_id, session_data)
-                
-                return {
-                    "agent_reply": f"🎉 Great news! {decision.get('reason', 'You are eligible for further processing.')} Please proceed with document verification.",
-                    "underwriter_result": decision,
-                    "status": "eligible_for_documents",
-                    "collected_data": json_data,
-                    "next_step": "proceed_to_document_upload"
-                }
-            else:
-                # Not eligible - end conversation
-                memory.clear(message.session_id)
-                return {
-                    "agent_reply": f"❌ Thank you for your application. {decision.get('reason', 'Unfortunately, you are not eligible at this time.')}",
-                    "underwriter_result": decision,
-                    "status": "rejected",
-                    "collected_data": json_data,
-                    "next_step": "end"
-                }
+            applicant = ApplicantRecord.from_dict(json.loads(agent_reply.strip()))
+            return await underwriting_reply(session_id, applicant)
         except Exception as e:
-            print(f"JSON parsing error: {e}")
+            logger.warning("JSON parsing error: %s", e)
     
     # Return the agent's response for continuing conversation
     return {
         "agent_reply": agent_reply,
         "status": "in_progress",
-        "collected_so_far": updated_session_data
-    }
\ No newline at end of file
+        "collected_so_far": state.applicant.to_dict()
+    }
+
+@router.post("/message")
+async def chat(message: Message):
+    state, captured = await extract_turn(message)
+    
+    # Check if all fields are already collected in session data
+    response = await underwrite_if_complete(message.session_id, state)
+    if response is not None:
+        return response
+    
+    # Get agent response
+    agent_reply = await collect_customer_info(
+        user_message=message.user_message,
+        applicant=state.applicant,
+        captured=captured
+    )
+    return await finish_turn(message.session_id, state, agent_reply)
+
+@router.post("/message/stream")
+async def chat_stream(message: Message):
+    """Streaming variant of /message.
+
+    Responds with NDJSON: {"type": "token", "text": ...} events while the agent
+    is generating, then one {"type": "final", ...} event carrying the same
+    fields /message returns (status, collected_so_far, underwriter_result, ...).
+    """
+    state, captured = await extract_turn(message)
+
+    async def events():
+        try:
+            response = await underwrite_if_complete(message.session_id, state)
+            if response is not None:
+                yield {"type": "final", **response}
+                return
+
+            parts = []
+            async for chunk in stream_customer_info(message.user_message, state.applicant, captured):
+                parts.append(chunk)
+                yield {"type": "token", "text": chunk}
+            yield {"type": "final", **await finish_turn(message.session_id, state, "".join(parts))}
+        except Exception as e:
+            logger.exception("Streaming chat error: %s", e)
+            yield {"type": "error", "detail": "Agent response failed, please try again."}
+
+    async def ndjson():
+        async for event in events():
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
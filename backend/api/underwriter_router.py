@@ -1,10 +1,46 @@
-from fastapi import APIRouter
-from ..agents.underwriter import underwrite
+import json
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
+from ..agents.underwriter import underwrite, underwrite_batch
+from ..agents.batch_reader import detect_format
+from ..agents.decision import pipeline, StageSaturated
+from ..models.records import Applicant
 
 router = APIRouter()
 
+STREAM_BLOCK_ROWS = 1000
+
 @router.post("/analyze")
-def analyze_customer(customer_data: dict):
+async def analyze_customer(applicant: Applicant):
+
+    try:
+        result = await pipeline.run("underwriting", underwrite, applicant.to_record())
+    except StageSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    return{"decision": result}
+
+@router.post("/analyze_batch")
+def analyze_batch(file: UploadFile = File(...), format: str = None, chunk_size: int = None):
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def rows():
+        # NDJSON, one decision per input row, streamed as each chunk is scored.
+        # Starlette runs a sync iterator one item per threadpool hop, so send
+        # lines in blocks rather than one at a time.
+        lines = []
+        try:
+            for result in underwrite_batch(file.file, fmt, chunk_size):
+                lines.append(json.dumps(result, ensure_ascii=False))
+                if len(lines) >= STREAM_BLOCK_ROWS:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+        except ValueError as e:
+            # Headers are already sent, so report a malformed input as a final line
+            lines.append(json.dumps({"error": str(e)}))
+        if lines:
+            yield "\n".join(lines) + "\n"
 
-    result = underwrite(customer_data)
-    return{"decision": result}
\ No newline at end of file
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
@@ -0,0 +1,136 @@
+import os
+import tempfile
+from collections import namedtuple
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from ..agents.ocr_cache import ocr_cache
+from .. import config
+
+SpooledUpload = namedtuple("SpooledUpload", ["path", "filename", "size", "key"])
+
+CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of the file formats the verifier can read
+MAGIC_NUMBERS = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+    (b"GIF8", "image/gif"),
+)
+
+# Browsers send these for files they can't classify
+GENERIC_CONTENT_TYPES = {"", "application/octet-stream"}
+
+# Room for multipart boundaries, part headers and the other form fields around the files
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def sniff(head: bytes):
+    """Return the real type of a file from its first bytes, or None if we can't verify it"""
+    for magic, kind in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if b"%PDF-" in head[:1024]:
+        return "application/pdf"
+    return None
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware turning away upload bodies over their limit before the form is parsed.
+
+    Starlette receives and spools the whole multipart body before a route
+    runs, so the checks in spool_upload only come after the upload. A
+    request whose Content-Length is over the limit for its path gets a 413
+    without its body being read; a body sent without a length stops being
+    read as soon as it passes the limit. limits maps a path to the largest
+    body in bytes it accepts.
+    """
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse({"detail": f"Upload larger than {limit} bytes"}, status_code=413,
+                                    headers={"Connection": "close"})
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the form parser; FastAPI passes HTTPExceptions through
+                    raise HTTPException(status_code=413, detail=f"Upload larger than {limit} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def upload_limits(prefix=""):
+    """Body limits for the upload routes: one file, or a full batch"""
+    single = config.UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD
+    batch = config.UPLOAD_MAX_BYTES * config.OCR_BATCH_MAX_FILES + MULTIPART_OVERHEAD
+    return {f"{prefix}/verify": single, f"{prefix}/jobs": single, f"{prefix}/verify_batch": batch}
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = None):
+    """Copy an upload that Starlette has already received to a temp file in chunks.
+
+    UploadLimitMiddleware bounds the request body before it is parsed; this
+    checks each file. The declared content type and size are checked before
+    copying, the magic bytes on the first chunk, and the size limit on every
+    chunk. The cache key is hashed on the way through, so the file is read
+    only once. Callers must discard() the returned upload when done.
+    """
+    max_bytes = max_bytes or config.UPLOAD_MAX_BYTES
+    content_type = (file.content_type or "").split(";")[0].strip().lower()
+    if not (content_type in GENERIC_CONTENT_TYPES or content_type.startswith("image/")
+            or content_type == "application/pdf"):
+        raise HTTPException(status_code=415, detail=f"Unsupported content type '{content_type}'")
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File larger than {max_bytes} bytes")
+
+    digest = ocr_cache.hasher()
+    fd, path = tempfile.mkstemp(prefix="upload_", dir=config.UPLOAD_DIR or None)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if size == 0 and sniff(chunk) is None:
+                    raise HTTPException(status_code=415, detail="File is not a supported image or PDF")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File larger than {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty file")
+    except BaseException:
+        os.remove(path)
+        raise
+    return SpooledUpload(path, file.filename, size, digest.hexdigest())
+
+
+def discard(*uploads):
+    for upload in uploads:
+        try:
+            os.remove(upload.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,120 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _float(name, default):
+    return float(os.getenv(name, default))
+
+
+def _bool(name, default):
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Logging: LOG_LEVELS overrides LOG_LEVEL per module, e.g. "backend.memory=DEBUG".
+# Prompt and response bodies are logged at DEBUG for LOG_BODY_SAMPLE_RATE of calls.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_BODY_SAMPLE_RATE = _float("LOG_BODY_SAMPLE_RATE", 0.0)
+
+# Per-request trace IDs: echoed in TRACE_HEADER with a Server-Timing breakdown, and added to log lines
+TRACE_REQUESTS = _bool("TRACE_REQUESTS", True)
+TRACE_HEADER = os.getenv("TRACE_HEADER", "X-Trace-Id")
+
+# Which subsystems this worker serves: "all", "chat" (sales agent and underwriting) or "ocr" (documents)
+WORKER_ROLE = os.getenv("WORKER_ROLE", "all")
+# Ask Ollama for a one-token reply at startup so the model is loaded before the first chat turn
+LLM_WARM_ON_STARTUP = _bool("LLM_WARM_ON_STARTUP", True)
+LLM_WARM_RETRY_SECONDS = _float("LLM_WARM_RETRY_SECONDS", 5)
+
+# Session store: "memory", "sqlite" (any SQLAlchemy DATABASE_URL) or "redis"
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_TTL_SECONDS = _int("SESSION_TTL_SECONDS", 3600)
+SESSION_MAX_ENTRIES = _int("SESSION_MAX_ENTRIES", 10000)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sessions.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# OCR reader pool
+OCR_LANGUAGES = [lang.strip() for lang in os.getenv("OCR_LANGUAGES", "en").split(",") if lang.strip()]
+OCR_POOL_SIZE = _int("OCR_POOL_SIZE", min(2, os.cpu_count() or 1))
+OCR_USE_GPU = _bool("OCR_USE_GPU", False)
+OCR_ACQUIRE_TIMEOUT = _float("OCR_ACQUIRE_TIMEOUT", 120)
+OCR_WARM_ON_STARTUP = _bool("OCR_WARM_ON_STARTUP", True)
+
+# Image preprocessing before OCR (downscale, grayscale, crop to document, deskew)
+OCR_PREPROCESS = _bool("OCR_PREPROCESS", True)
+OCR_MAX_SIDE = _int("OCR_MAX_SIDE", 1600)
+# Try OCR on the zone where the document's key field sits before reading the whole page
+OCR_ROI = _bool("OCR_ROI", False)
+# Images with more pixels than this are refused before decoding
+OCR_MAX_PIXELS = _int("OCR_MAX_PIXELS", 50_000_000)
+
+# Document uploads are spooled to temp files in UPLOAD_DIR (system temp dir when empty)
+UPLOAD_MAX_BYTES = _int("UPLOAD_MAX_BYTES", 20 * 1024 * 1024)
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "")
+
+# OCR executor ("process" runs OCR in worker processes, "thread" in a thread pool)
+OCR_EXECUTOR = os.getenv("OCR_EXECUTOR", "process")
+OCR_WORKERS = _int("OCR_WORKERS", OCR_POOL_SIZE)
+OCR_MAX_IN_FLIGHT = _int("OCR_MAX_IN_FLIGHT", OCR_WORKERS * 2)
+OCR_MAX_PENDING_JOBS = _int("OCR_MAX_PENDING_JOBS", 100)
+OCR_JOB_TTL = _int("OCR_JOB_TTL", 600)
+OCR_BATCH_MAX_FILES = _int("OCR_BATCH_MAX_FILES", 10)
+OCR_MAX_PDF_PAGES = _int("OCR_MAX_PDF_PAGES", 20)
+
+# OCR result cache keyed by upload content; set OCR_CACHE_DIR to also keep results on disk
+OCR_CACHE_ENTRIES = _int("OCR_CACHE_ENTRIES", 1024)
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "")
+OCR_CACHE_MAX_BYTES = _int("OCR_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+# Ollama client shared by the sales agent and the underwriter
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_TIMEOUT = _float("OLLAMA_TIMEOUT", 120)
+OLLAMA_CONNECT_TIMEOUT = _float("OLLAMA_CONNECT_TIMEOUT", 5)
+OLLAMA_MAX_CONCURRENCY = _int("OLLAMA_MAX_CONCURRENCY", 4)
+OLLAMA_RETRIES = _int("OLLAMA_RETRIES", 2)
+# LLM scheduler: identical concurrent calls share one generation, chat turns get
+# free slots before underwriting, and underwriting calls arriving within the
+# window are sent together. Set OLLAMA_MAX_CONCURRENCY to the server's
+# OLLAMA_NUM_PARALLEL so calls queue in the scheduler rather than in Ollama.
+LLM_SCHEDULER = _bool("LLM_SCHEDULER", True)
+LLM_BATCH_WINDOW_MS = _float("LLM_BATCH_WINDOW_MS", 20)
+LLM_BATCH_MAX = _int("LLM_BATCH_MAX", OLLAMA_MAX_CONCURRENCY)
+
+# Chat field extraction: matches below this confidence are left for the agent to ask about
+EXTRACTION_MIN_CONFIDENCE = _float("EXTRACTION_MIN_CONFIDENCE", 0.5)
+# Answer on-script chat turns from response templates instead of the LLM
+CHAT_TEMPLATES = _bool("CHAT_TEMPLATES", True)
+
+# Underwriting: "rules" decides with the rule engine only, "llm" always asks the
+# model, "hybrid" uses the rules and only asks the model about borderline cases
+UNDERWRITING_MODE = os.getenv("UNDERWRITING_MODE", "hybrid")
+UNDERWRITING_LLM_REASON = _bool("UNDERWRITING_LLM_REASON", False)
+# Hard cap on tokens generated for one LLM underwriting decision
+UNDERWRITING_MAX_TOKENS = _int("UNDERWRITING_MAX_TOKENS", 160)
+# Identical applications within the TTL reuse the earlier decision (0 disables the cache)
+DECISION_CACHE_TTL_SECONDS = _int("DECISION_CACHE_TTL_SECONDS", 600)
+DECISION_CACHE_ENTRIES = _int("DECISION_CACHE_ENTRIES", 4096)
+BATCH_CHUNK_SIZE = _int("BATCH_CHUNK_SIZE", 50000)
+
+# Application pipeline: each stage has its own concurrency limit, so a backlog
+# in one stage (usually OCR) never holds up another. Jobs beyond the limit wait
+# in a per-stage queue of at most PIPELINE_MAX_QUEUE before being refused (429).
+PIPELINE_EXTRACTION_CONCURRENCY = _int("PIPELINE_EXTRACTION_CONCURRENCY", 8)
+# Above OLLAMA_MAX_CONCURRENCY: the LLM scheduler orders and batches the calls that reach the model
+PIPELINE_UNDERWRITING_CONCURRENCY = _int("PIPELINE_UNDERWRITING_CONCURRENCY", 32)
+PIPELINE_OCR_CONCURRENCY = _int("PIPELINE_OCR_CONCURRENCY", OCR_MAX_IN_FLIGHT)
+PIPELINE_DECISION_CONCURRENCY = _int("PIPELINE_DECISION_CONCURRENCY", 4)
+PIPELINE_MAX_QUEUE = _int("PIPELINE_MAX_QUEUE", 100)
+
+# Largest relative gap between the net salary on the salary slip and the monthly
+# salary the customer declared; the default leaves room for customers quoting gross
+SALARY_MATCH_TOLERANCE = _float("SALARY_MATCH_TOLERANCE", 0.25)
@@ -0,0 +1,25 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+from .. import config
+
+Base = declarative_base()
+
+engine = create_engine(
+    config.DATABASE_URL,
+    connect_args={"check_same_thread": False} if config.DATABASE_URL.startswith("sqlite") else {},
+)
+
+if engine.dialect.name == "sqlite":
+    # pysqlite defers BEGIN until the first write, so a read-modify-write would
+    # not be atomic across workers. Take the write lock when the transaction starts,
+    # unless it is marked with execution_options(read_only=True).
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(connection):
+        read_only = connection.get_execution_options().get("read_only")
+        connection.exec_driver_sql("BEGIN" if read_only else "BEGIN IMMEDIATE")
+
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
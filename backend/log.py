@@ -0,0 +1,168 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+from . import config
+from .metrics import current_trace
+
+# Identity numbers, and a person's name wherever it follows a "name" key or label
+# ('name': 'Asha', "name":"Asha", name='Asha', Full Name: Asha Rao; my name is Asha)
+PII_PATTERNS = [
+    (re.compile(r"\b[A-Z]{5}\d{4}[A-Z]\b"), "[PAN]"),
+    (re.compile(r"\b\d{4}[ -]?\d{4}[ -]?\d{4}\b"), "[AADHAAR]"),
+    (re.compile(r"""(?i)(\bname(?:['"]?\s*[:=]|\s+is)\s*)(?:'[^']*'|"[^"]*"|[^;,\n'"}]+)"""), r"\1[NAME]"),
+]
+
+# Keys of structured log fields whose values are always replaced
+PII_KEYS = {"name", "first_name", "customer_name"}
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sample", "pii"}
+
+
+def redact(value, known=()):
+    """Copy of value with PAN and Aadhaar numbers and names masked.
+
+    known lists literal values (e.g. the customer's name from the session) to
+    mask wherever they appear, such as inside free-text LLM replies.
+    """
+    if isinstance(value, str):
+        for pattern, replacement in PII_PATTERNS:
+            value = pattern.sub(replacement, value)
+        for text in known:
+            value = value.replace(text, "[NAME]")
+        return value
+    if isinstance(value, dict):
+        return {key: "[NAME]" if key in PII_KEYS and value[key] else redact(value[key], known) for key in value}
+    if isinstance(value, (list, tuple)):
+        return [redact(item, known) for item in value]
+    return value
+
+
+def _known_values(pii):
+    """Full names and each of their words, longest first, from extra={"pii": [...]}"""
+    values = set()
+    for text in pii or ():
+        if isinstance(text, str) and text.strip():
+            values.add(text.strip())
+            values.update(word for word in text.split() if len(word) > 1)
+    return sorted(values, key=len, reverse=True)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records logged with extra={"sample": True}.
+
+    Used for full prompt and response bodies, which are large and mostly
+    repetitive; everything else passes untouched.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, "sample", False):
+            return self.rate > 0 and (self.rate >= 1 or random.random() < self.rate)
+        return True
+
+
+class TraceFilter(logging.Filter):
+    """Tag records with the trace ID of the request that logged them"""
+
+    def filter(self, record):
+        trace = current_trace.get()
+        if trace is not None:
+            record.trace_id = trace["id"]
+        return True
+
+
+class RedactingFilter(logging.Filter):
+    def filter(self, record):
+        known = _known_values(getattr(record, "pii", None))
+        record.msg = redact(record.getMessage(), known)
+        record.args = None
+        for key, value in list(vars(record).items()):
+            if key not in _RECORD_ATTRIBUTES:
+                setattr(record, key, "[NAME]" if key in PII_KEYS and value else redact(value, known))
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _module_levels(spec):
+    """"backend.memory=WARNING,backend.agents.underwriter=DEBUG" -> {logger name: level}"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener = None
+_handler = None
+
+
+def setup_logging():
+    """Route all logging through a queue to a single writer thread.
+
+    Request handlers only put records on an in-memory queue; formatting,
+    redaction and the write to stdout happen on the listener thread. Safe to
+    call more than once.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if config.LOG_FORMAT == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    output.addFilter(RedactingFilter())
+
+    log_queue = queue.SimpleQueue()
+    _handler = logging.handlers.QueueHandler(log_queue)
+    # Dropped here, so unsampled bodies never reach the queue
+    _handler.addFilter(SamplingFilter(config.LOG_BODY_SAMPLE_RATE))
+    _handler.addFilter(TraceFilter())
+
+    root = logging.getLogger()
+    root.setLevel(config.LOG_LEVEL.upper())
+    root.addHandler(_handler)
+    for name, level in _module_levels(config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_handler)
+        _listener.stop()
+        _listener = _handler = None
@@ -1,11 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .api.sales_routes import router as sales_router
-from .api.underwriter_router import router as underwriter_router
-from .api.document_router import router as document_router
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from .models.ollama_model import close_clients
+from .log import setup_logging, stop_logging
+from .metrics import MetricsMiddleware, registry
+from .startup import subsystems, warm_up, warm_ocr, prime_llm
+from .api.application_router import router as application_router
+from . import config
 
-app = FastAPI()
+setup_logging()
+
+# Only the routers this worker serves are imported, so a chat-only worker
+# never loads OpenCV, EasyOCR or torch
+SUBSYSTEMS = subsystems()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    steps = {}
+    if "ocr" in SUBSYSTEMS:
+        from .agents.ocr_executor import ocr_executor
+        ocr_executor.start()
+        if config.OCR_WARM_ON_STARTUP:
+            steps["ocr"] = warm_ocr
+    if "chat" in SUBSYSTEMS and config.LLM_WARM_ON_STARTUP:
+        steps["llm"] = prime_llm
+    # In the background: liveness answers at once, readiness once the models are loaded
+    warm_up.start(steps)
+    yield
+    await warm_up.stop()
+    if "ocr" in SUBSYSTEMS:
+        ocr_executor.shutdown()
+    await close_clients()
+    stop_logging()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,28 +43,78 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[config.TRACE_HEADER, "Server-Timing"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Both roles record into and read the same per-application state
+app.include_router(application_router, prefix="/applications")
+endpoints = {"application": "/applications/{session_id}", "pipeline_stats": "/applications/stats"}
+
+if "chat" in SUBSYSTEMS:
+    from .api.sales_routes import router as sales_router
+    from .api.underwriter_router import router as underwriter_router
+    from .agents.response_templates import response_templates
+    from .agents.underwriter import underwriting_stats
+    from .models.ollama_model import all_stats as llm_stats
+    from .models.llm_scheduler import all_stats as scheduler_stats
+
+    app.include_router(sales_router, prefix="/sales_agent")
+    app.include_router(underwriter_router, prefix="/underwriter")
+    endpoints.update({"chat": "/sales_agent/message", "underwriting": "/underwriter/analyze",
+                      "llm_stats": "/llm/stats"})
 
-# Include all routers
-app.include_router(sales_router, prefix="/sales_agent")
-app.include_router(underwriter_router, prefix="/underwriter")
-app.include_router(document_router, prefix="/documents")
+    @app.get("/llm/stats")
+    def llm_statistics():
+        return {"clients": llm_stats(), "scheduler": scheduler_stats(), "sales_agent": response_templates.stats(),
+                "underwriter": underwriting_stats()}
+
+if "ocr" in SUBSYSTEMS:
+    from .api.document_router import router as document_router
+    from .api.uploads import UploadLimitMiddleware, upload_limits
+    from .agents.doc_verify import reader_pool
+    from .agents.ocr_executor import ocr_executor
+
+    app.include_router(document_router, prefix="/documents")
+    # Oversized uploads are refused before their body is read
+    app.add_middleware(UploadLimitMiddleware, limits=upload_limits("/documents"))
+    endpoints.update({"documents": "/documents/verify", "document_jobs": "/documents/jobs",
+                      "ocr_stats": "/documents/stats"})
+
+    registry.gauge("loan_ocr_in_flight", "Documents being processed by OCR workers",
+                   lambda: ocr_executor.stats()["in_flight"])
+    registry.gauge("loan_ocr_queue_depth", "Documents waiting for an OCR worker slot",
+                   lambda: ocr_executor.stats()["queue_depth"])
+    registry.gauge("loan_ocr_readers_in_use", "EasyOCR readers busy in this process",
+                   lambda: reader_pool.stats()["readers_in_use"])
+
+endpoints.update({"metrics": "/metrics", "liveness": "/health/live", "readiness": "/health/ready"})
 
 @app.get("/")
 def read_root():
     return {
         "message": "Loan Application System API",
         "status": "running",
-        "endpoints": {
-            "chat": "/sales_agent/message",
-            "underwriting": "/underwriter/analyze",
-            "documents": "/documents/verify"
-        }
+        "role": config.WORKER_ROLE,
+        "endpoints": endpoints
     }
 
 @app.get("/health")
+@app.get("/health/live")
 def health_check():
+    """Liveness: the process is up and serving requests"""
     return {"status": "healthy"}
 
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: every warm-up step (OCR models, LLM priming) has finished"""
+    status = warm_up.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage, request and LLM latency histograms in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Serve static files
 app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
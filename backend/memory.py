@@ -1,21 +1,270 @@
-class ConversationMemory:
-    def __init__(self):
-        self.sessions = {}
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from . import config
+from .models.records import SessionState
+
+logger = logging.getLogger(__name__)
+
+
+class SessionBackend(ABC):
+    """Storage interface behind ConversationMemory.
 
+    Sessions are SessionState records, stored in their compact binary
+    encoding. Every backend expires sessions that have been idle for longer
+    than ttl seconds and supports atomic_update, which applies a
+    read-modify-write to one session without racing other workers.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = config.SESSION_TTL_SECONDS if ttl is None else ttl
+
+    @abstractmethod
     def get(self, session_id):
-        print(f"MEMORY GET: {session_id} -> {self.sessions.get(session_id, {})}")  # Debug
-        return self.sessions.get(session_id, {})
+        """The session's SessionState; an empty one if there is none"""
+
+    @abstractmethod
+    def atomic_update(self, session_id, fn):
+        """Replace the session with fn(current_state) atomically and return the new state"""
 
-    def update(self, session_id, data):
-        print(f"MEMORY UPDATE: {session_id} with {data}")  # Debug
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {}
-        self.sessions[session_id].update(data)
-        print(f"MEMORY AFTER UPDATE: {session_id} -> {self.sessions[session_id]}")  # Debug
+    def save(self, session_id, state):
+        return self.atomic_update(session_id, lambda current: state)
 
+    @abstractmethod
     def clear(self, session_id):
-        if session_id in self.sessions:
+        """Delete the session; True if there was one"""
+
+    def purge_expired(self):
+        return 0
+
+
+class InMemoryBackend(SessionBackend):
+    """Process-local store with idle expiry and least-recently-used eviction"""
+
+    def __init__(self, ttl=None, max_entries=None):
+        super().__init__(ttl)
+        self.max_entries = max_entries or config.SESSION_MAX_ENTRIES
+        self.sessions = OrderedDict()  # session_id -> (last_access, encoded state)
+        self._lock = threading.Lock()
+
+    def _live(self, session_id, now):
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            return None
+        if self.ttl and now - entry[0] > self.ttl:
             del self.sessions[session_id]
-            print(f"MEMORY CLEARED: {session_id}")  # Debug
+            return None
+        return entry[1]
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            data = self._live(session_id, now)
+            if data is None:
+                return SessionState()
+            self.sessions[session_id] = (now, data)
+            self.sessions.move_to_end(session_id)
+        return SessionState.from_bytes(data)
+
+    def atomic_update(self, session_id, fn):
+        now = time.time()
+        with self._lock:
+            # Decoding gives fn a private copy, so nothing it does leaks into the store
+            data = self._live(session_id, now)
+            state = fn(SessionState.from_bytes(data) if data else SessionState())
+            self.sessions[session_id] = (now, state.to_bytes())
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_entries:
+                self.sessions.popitem(last=False)
+            return state
+
+    def clear(self, session_id):
+        with self._lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def purge_expired(self):
+        if not self.ttl:
+            return 0
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [sid for sid, (last_access, _) in self.sessions.items() if last_access < cutoff]
+            for sid in expired:
+                del self.sessions[sid]
+        return len(expired)
+
+
+class SQLBackend(SessionBackend):
+    """Sessions stored in the conversation_states table via SQLAlchemy.
+
+    Shared by every worker that points at the same DATABASE_URL and survives
+    restarts. Expired rows read as empty sessions until purge_expired drops
+    them. Updates reset a session's idle timer; reads only do once half of
+    it has gone, so most reads write nothing.
+    Rows written before the binary encoding are read from their JSON data
+    column and rewritten in the state column on their next update.
+    """
+
+    PURGE_INTERVAL = 60
+
+    def __init__(self, ttl=None, session_factory=None):
+        super().__init__(ttl)
+        from .database.db import Base, SessionLocal
+        from .models.conversation_state import ConversationState
+        self.model = ConversationState
+        self.session_factory = session_factory or SessionLocal
+        engine = self.session_factory.kw["bind"]
+        Base.metadata.create_all(bind=engine)
+        self._add_state_column(engine)
+        self._last_purge = 0
+
+    def _add_state_column(self, engine):
+        # create_all doesn't alter tables created before the state column existed
+        from sqlalchemy import inspect, text
+        table = self.model.__table__
+        if "state" not in {column["name"] for column in inspect(engine).get_columns(table.name)}:
+            column_type = table.c.state.type.compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN state {column_type}"))
+
+    def _expired(self, row, now):
+        return self.ttl and row.updated_at is not None and now - row.updated_at > self.ttl
+
+    def _stale(self, row, now):
+        return self.ttl and row.updated_at is not None and now - row.updated_at > self.ttl / 2
+
+    def get(self, session_id):
+        now = time.time()
+        with self.session_factory() as db:
+            # A plain read: no write lock, and nothing written unless the idle timer needs refreshing
+            db.connection(execution_options={"read_only": True})
+            row = db.query(self.model).filter_by(session_id=session_id).one_or_none()
+            if row is None or self._expired(row, now):
+                return SessionState()
+            state = self._decode(row)
+        if self._stale(row, now):
+            with self.session_factory.begin() as db:
+                # Skipped if an update refreshed it meanwhile
+                (db.query(self.model).filter_by(session_id=session_id, updated_at=row.updated_at)
+                 .update({"updated_at": now}))
+        return state
+
+    @staticmethod
+    def _decode(row):
+        return SessionState.decode(row.state if row.state is not None else row.data)
+
+    def atomic_update(self, session_id, fn):
+        now = time.time()
+        with self.session_factory.begin() as db:
+            row = (db.query(self.model).filter_by(session_id=session_id)
+                   .with_for_update().one_or_none())
+            if row is None:
+                row = self.model(session_id=session_id)
+                db.add(row)
+            state = fn(SessionState() if self._expired(row, now) else self._decode(row))
+            row.state = state.to_bytes()
+            row.data = None
+            row.updated_at = now
+        if now - self._last_purge > self.PURGE_INTERVAL:
+            self.purge_expired()
+        return state
+
+    def clear(self, session_id):
+        with self.session_factory.begin() as db:
+            return db.query(self.model).filter_by(session_id=session_id).delete() > 0
+
+    def purge_expired(self):
+        self._last_purge = time.time()
+        if not self.ttl:
+            return 0
+        cutoff = time.time() - self.ttl
+        with self.session_factory.begin() as db:
+            return db.query(self.model).filter(self.model.updated_at < cutoff).delete()
+
+
+class RedisBackend(SessionBackend):
+    """Sessions stored as binary strings in any server speaking the Redis protocol.
+
+    Pass a ready client (for example a local fakeredis instance) or let it
+    connect to REDIS_URL. Idle expiry uses the key TTL, refreshed on access.
+    """
+
+    def __init__(self, ttl=None, client=None, url=None, prefix="session:"):
+        super().__init__(ttl)
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package")
+            client = redis.Redis.from_url(url or config.REDIS_URL)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, session_id):
+        return f"{self.prefix}{session_id}"
+
+    def get(self, session_id):
+        key = self._key(session_id)
+        pipe = self.client.pipeline()
+        pipe.get(key)
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+        return SessionState.decode(pipe.execute()[0])
+
+    def atomic_update(self, session_id, fn):
+        from redis.exceptions import WatchError
+        key = self._key(session_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    state = fn(SessionState.decode(pipe.get(key)))
+                    pipe.multi()
+                    if self.ttl:
+                        pipe.set(key, state.to_bytes(), ex=self.ttl)
+                    else:
+                        pipe.set(key, state.to_bytes())
+                    pipe.execute()
+                    return state
+                except WatchError:
+                    # Another worker changed the session first; retry on fresh data
+                    continue
+
+    def clear(self, session_id):
+        return self.client.delete(self._key(session_id)) > 0
+
+
+def create_backend(name=None):
+    name = (name or config.SESSION_BACKEND).lower()
+    if name == "memory":
+        return InMemoryBackend()
+    if name in ("sqlite", "sql"):
+        return SQLBackend()
+    if name == "redis":
+        return RedisBackend()
+    raise ValueError(f"Unknown SESSION_BACKEND '{name}'")
+
+
+class ConversationMemory:
+    def __init__(self, backend=None):
+        self.backend = backend or create_backend()
+
+    def get(self, session_id):
+        state = self.backend.get(session_id)
+        logger.debug("get %s -> %s", session_id, state)
+        return state
+
+    def save(self, session_id, state):
+        saved = self.backend.save(session_id, state)
+        logger.debug("save %s -> %s", session_id, saved)
+        return saved
+
+    def atomic_update(self, session_id, fn):
+        return self.backend.atomic_update(session_id, fn)
+
+    def clear(self, session_id):
+        if self.backend.clear(session_id):
+            logger.debug("cleared %s", session_id)
 
-memory = ConversationMemory()
\ No newline at end of file
+memory = ConversationMemory()
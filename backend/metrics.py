@@ -0,0 +1,240 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from . import config
+
+# Seconds, from a regex pass (sub-millisecond) up to a cold LLM call or a multi-page OCR
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKENS_PER_SECOND_BUCKETS = (1, 2.5, 5, 10, 15, 20, 30, 50, 75, 100, 150, 250)
+
+# The current request's {"id": ..., "spans": [(stage, seconds), ...]}, set by MetricsMiddleware
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{str(value)}"'.replace("\n", " ") for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, rendered in Prometheus text format"""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {values[-1]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {values[-2]}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time, e.g. a queue depth from an existing stats() dict"""
+
+    def __init__(self, name, help, read):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self):
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.metrics.get(name) or self.register(Histogram(name, help, labels, buckets))
+
+    def counter(self, name, help, labels=()):
+        return self.metrics.get(name) or self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, read):
+        return self.register(Gauge(name, help, read))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    "loan_stage_seconds", "Time spent in one pipeline stage", labels=("stage",))
+http_request_seconds = registry.histogram(
+    "loan_http_request_seconds", "HTTP request latency until the response starts", labels=("method", "route", "status"))
+llm_request_seconds = registry.histogram(
+    "loan_llm_request_seconds", "Ollama call latency", labels=("purpose",))
+llm_tokens_per_second = registry.histogram(
+    "loan_llm_tokens_per_second", "Completion tokens generated per second of eval time", labels=("purpose",),
+    buckets=TOKENS_PER_SECOND_BUCKETS)
+llm_tokens = registry.counter(
+    "loan_llm_tokens_total", "Tokens evaluated (prompt) and generated (completion)", labels=("purpose", "kind"))
+
+
+def record_stage(stage, seconds):
+    stage_seconds.observe(seconds, stage=stage)
+    trace = current_trace.get()
+    if trace is not None:
+        trace["spans"].append((stage, seconds))
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block as one observation of loan_stage_seconds{stage=...}"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def timed(stage):
+    """Decorator version of span() for plain and async functions"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_call(purpose, latency, prompt_tokens, completion_tokens, eval_seconds):
+    purpose = purpose or "other"
+    llm_request_seconds.observe(latency, purpose=purpose)
+    llm_tokens.inc(prompt_tokens, purpose=purpose, kind="prompt")
+    llm_tokens.inc(completion_tokens, purpose=purpose, kind="completion")
+    # Ollama reports eval time when the reply finishes; replies cut short fall back to wall time
+    seconds = eval_seconds or latency
+    if completion_tokens and seconds > 0:
+        llm_tokens_per_second.observe(completion_tokens / seconds, purpose=purpose)
+
+
+def _route_template(scope):
+    """Request path with path parameters put back as {name}, so IDs don't become label values"""
+    if "endpoint" not in scope:
+        return "unmatched"
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request and, if enabled, tagging it with a trace ID.
+
+    The trace ID is taken from the incoming TRACE_HEADER or generated, and is
+    returned in the same header together with a Server-Timing header listing
+    the stages that finished before the response started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        trace = None
+        if config.TRACE_REQUESTS:
+            incoming = dict(scope["headers"]).get(config.TRACE_HEADER.lower().encode(), b"").decode("latin-1")
+            trace = {"id": incoming[:64] or uuid.uuid4().hex, "spans": []}
+        token = current_trace.set(trace)
+        started = time.perf_counter()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                http_request_seconds.observe(time.perf_counter() - started, method=scope["method"],
+                                             route="unmatched" if message["status"] == 404 else _route_template(scope),
+                                             status=message["status"])
+                if trace is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((config.TRACE_HEADER.encode(), trace["id"].encode("latin-1")))
+                    if trace["spans"]:
+                        timing = ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in trace["spans"])
+                        headers.append((b"server-timing", timing.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_trace.reset(token)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String
-from database.db import Base
+from sqlalchemy import Column, Float, Integer, LargeBinary, String, Text
+from ..database.db import Base
 
 class ConversationState(Base):
     __tablename__ = "conversation_states"
@@ -7,4 +7,7 @@ class ConversationState(Base):
     id = Column(Integer, primary_key=True, index=True)
     step = Column(Integer, default=0)
     application_id = Column(Integer)
-    session_id = Column(String, default="default")  # Add session tracking
\ No newline at end of file
+    session_id = Column(String, default="default", unique=True, index=True)  # Add session tracking
+    data = Column(Text)  # JSON-encoded session, from before the state column
+    state = Column(LargeBinary)  # SessionState.to_bytes()
+    updated_at = Column(Float, index=True)  # Last access, for idle expiry
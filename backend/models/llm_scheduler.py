@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from .. import config
+from ..metrics import registry
+from ..single_flight import SingleFlight
+from .ollama_model import LLMBusyError, get_client
+
+# Lower runs first. Chat turns have a user waiting on them; underwriting and
+# explanations are bulk work that can wait a little.
+INTERACTIVE, BULK = 0, 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+PRIORITIES = {"sales": INTERACTIVE, "warmup": INTERACTIVE}
+
+queue_seconds = registry.histogram(
+    "loan_llm_queue_seconds", "Time an LLM call waited in the scheduler for a generation slot", labels=("priority",))
+coalesced_calls = registry.counter(
+    "loan_llm_coalesced_total", "LLM calls answered by an identical call already in flight", labels=("purpose",))
+
+
+class PrioritySlots:
+    """Semaphore that hands each freed slot to the waiter with the highest priority, FIFO within a priority"""
+
+    def __init__(self, size):
+        self.size = size
+        self._free = size
+        self._waiters = []  # heap of (priority, arrival, future); cancelled waiters are skipped on release
+        self._arrivals = itertools.count()
+
+    @property
+    def free(self):
+        return self._free
+
+    def waiting(self, priority):
+        return sum(1 for p, _, future in self._waiters if p == priority and not future.done())
+
+    async def acquire(self, priority):
+        if self._free > 0:
+            self._free -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the waiter gave up; pass it on
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._free += 1
+
+
+class MicroBatcher:
+    """Holds bulk calls for up to ``window`` seconds and releases them together.
+
+    Ollama has no batched generate endpoint, but it decodes the requests in
+    its parallel slots (OLLAMA_NUM_PARALLEL) as one batch. Releasing calls
+    that arrive a few milliseconds apart at once fills those slots together
+    instead of letting them trickle in one by one.
+    """
+
+    def __init__(self, window, max_size):
+        self.window = window
+        self.max_size = max(1, max_size)
+        self._batch = None
+        self._timer = None
+        self._size = 0
+        self.batches = 0
+        self.batched = 0
+
+    async def join(self):
+        if self.window <= 0:
+            return
+        if self._batch is None:
+            loop = asyncio.get_running_loop()
+            self._batch = loop.create_future()
+            self._size = 0
+            self._timer = loop.call_later(self.window, self._release)
+        batch = self._batch
+        self._size += 1
+        if self._size >= self.max_size:
+            self._release()
+        await asyncio.shield(batch)
+
+    def _release(self):
+        if self._batch is None:
+            return
+        self._timer.cancel()
+        self.batches += 1
+        self.batched += self._size
+        self._batch.set_result(None)
+        self._batch = None
+
+
+class LLMScheduler:
+    """Decides when each async call of an OllamaClient reaches the model.
+
+    Identical concurrent non-streaming calls share one generation
+    (single-flight), chat turns take free slots before bulk calls, and bulk
+    calls are micro-batched. The scheduler holds as many slots as the
+    client allows in flight, so calls queue here, in priority order, rather
+    than in the client or in Ollama. Everything else is passed through to
+    the client.
+    """
+
+    def __init__(self, client, window=None, batch_max=None):
+        self.client = client
+        self.window = config.LLM_BATCH_WINDOW_MS / 1000 if window is None else window
+        self.batch_max = batch_max or config.LLM_BATCH_MAX or client.max_concurrency
+        self._loop = None
+        self._slots = None
+        self._batcher = None
+        self._flights = SingleFlight()  # request key -> the generation already running for it
+        self._lock = threading.Lock()
+        self._stats = {"interactive_calls": 0, "bulk_calls": 0, "coalesced": 0}
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _state(self):
+        # Futures and timers belong to one event loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._slots = PrioritySlots(self.client.max_concurrency)
+            self._batcher = MicroBatcher(self.window, self.batch_max)
+            self._flights = SingleFlight()
+            self._loop = loop
+        return self._slots, self._batcher
+
+    @asynccontextmanager
+    async def _turn(self, purpose):
+        """Wait for this call's turn and hold a generation slot for the enclosed block"""
+        priority = PRIORITIES.get(purpose, BULK)
+        slots, batcher = self._state()
+        with self._lock:
+            self._stats[f"{PRIORITY_NAMES[priority]}_calls"] += 1
+        started = time.perf_counter()
+        # With every slot busy the call queues anyway, so holding it back gains nothing
+        if priority == BULK and slots.free:
+            await batcher.join()
+        try:
+            await asyncio.wait_for(slots.acquire(priority), self.client.timeout[1])
+        except asyncio.TimeoutError:
+            raise LLMBusyError(f"All {slots.size} LLM slots busy")
+        queue_seconds.observe(time.perf_counter() - started, priority=PRIORITY_NAMES[priority])
+        try:
+            yield
+        finally:
+            slots.release()
+
+    @staticmethod
+    def _key(*parts):
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    async def _single_flight(self, key, purpose, call):
+        """Run call(), or share the result of the identical call already running"""
+        self._state()
+        result, shared = await self._flights.run(key, call)
+        if shared:
+            with self._lock:
+                self._stats["coalesced"] += 1
+            coalesced_calls.inc(purpose=purpose or "other")
+        return result
+
+    async def agenerate(self, prompt: str, system: str = None, purpose: str = None, **options):
+        """OllamaClient.agenerate, scheduled. Coalesced callers share the returned body: don't modify it"""
+        async def call():
+            async with self._turn(purpose):
+                return await self.client.agenerate(prompt, system=system, purpose=purpose, **options)
+        return await self._single_flight(self._key("generate", prompt, system, purpose, options), purpose, call)
+
+    async def ainvoke(self, prompt: str, system: str = None, purpose: str = None, **options):
+        return (await self.agenerate(prompt, system=system, purpose=purpose, **options))["response"]
+
+    async def agenerate_json(self, prompt: str, schema: dict, system: str = None, purpose: str = None, **options):
+        async def call():
+            async with self._turn(purpose):
+                return await self.client.agenerate_json(prompt, schema, system=system, purpose=purpose, **options)
+        return await self._single_flight(self._key("json", prompt, schema, system, purpose, options), purpose, call)
+
+    async def astream(self, prompt: str, system: str = None, purpose: str = None, **options):
+        # Streams are never shared: each caller consumes its own tokens
+        async with self._turn(purpose):
+            async for chunk in self.client.astream(prompt, system=system, purpose=purpose, **options):
+                yield chunk
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["batches"] = self._batcher.batches if self._batcher is not None else 0
+        stats["batched_calls"] = self._batcher.batched if self._batcher is not None else 0
+        stats["batch_size_avg"] = round(stats["batched_calls"] / stats["batches"], 2) if stats["batches"] else None
+        stats["batch_window_ms"] = round(self.window * 1000, 1)
+        stats["slots"] = self.client.max_concurrency
+        if self._slots is not None:
+            stats["waiting"] = {name: self._slots.waiting(priority) for priority, name in PRIORITY_NAMES.items()}
+        stats["model"] = self.client.model_name
+        return stats
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model_name: str = None):
+    """Return the shared scheduler in front of get_client(model_name)"""
+    client = get_client(model_name)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(client.model_name)
+        if scheduler is None:
+            scheduler = _schedulers[client.model_name] = LLMScheduler(client)
+        return scheduler
+
+
+def all_stats():
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return [scheduler.stats() for scheduler in schedulers]
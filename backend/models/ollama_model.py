@@ -1,12 +1,304 @@
-from langchain_community.llms import Ollama 
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+import httpx
+from .. import config
+from ..metrics import record_llm_call
 
-class LocalLLM:
-    def __init__(self, model_name: str = "llama3.2:3b"):
-        self.model_name = model_name
 
-    def get_llm(self):
-        return Ollama(model = self.model_name)
+class LLMBusyError(Exception):
+    """Raised when no generation slot frees up within the configured timeout"""
+
+
+class OllamaClient:
+    """Process-wide client for the Ollama HTTP API.
+
+    One instance per model is shared by every request: it keeps a pooled
+    keep-alive httpx.AsyncClient per event loop, caps concurrent generations,
+    retries connection failures and asks Ollama to keep the model resident
+    between calls. Request handlers wait on the model without holding a thread.
+    """
+
+    RECENT_CALLS = 50
+
+    def __init__(self, model_name: str = None, base_url: str = None, keep_alive: str = None,
+                 timeout: float = None, max_concurrency: int = None, retries: int = None):
+        self.model_name = model_name or config.OLLAMA_MODEL
+        self.base_url = (base_url or config.OLLAMA_BASE_URL).rstrip("/")
+        self.keep_alive = keep_alive or config.OLLAMA_KEEP_ALIVE
+        self.timeout = (config.OLLAMA_CONNECT_TIMEOUT, timeout or config.OLLAMA_TIMEOUT)
+        self.max_concurrency = max_concurrency or config.OLLAMA_MAX_CONCURRENCY
+        self.retries = config.OLLAMA_RETRIES if retries is None else retries
+        self._async_client = None
+        self._async_slots = None
+        self._async_loop = None
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "latency_seconds_total": 0.0,
+            "prompt_tokens_total": 0,
+            "completion_tokens_total": 0,
+            "prompt_eval_seconds_total": 0.0,
+            "eval_seconds_total": 0.0,
+        }
+        self.last_call = None
+        self.recent_calls = deque(maxlen=self.RECENT_CALLS)
+
+    def _payload(self, prompt: str, stream: bool, options: dict, system: str = None):
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+        }
+        if system:
+            # Sent separately so the model's template puts it first, byte-identical on
+            # every call; Ollama then reuses the cached KV state for it instead of
+            # re-evaluating those tokens
+            payload["system"] = system
+        if options:
+            payload["options"] = options
+        return payload
+
+    def _async_state(self):
+        # httpx clients and asyncio primitives belong to one event loop
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            limits = httpx.Limits(max_connections=self.max_concurrency,
+                                  max_keepalive_connections=self.max_concurrency)
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                transport=httpx.AsyncHTTPTransport(retries=self.retries, limits=limits),
+            )
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+            self._async_loop = loop
+        return self._async_client, self._async_slots
+
+    async def _acquire_async_slot(self, slots):
+        try:
+            await asyncio.wait_for(slots.acquire(), self.timeout[1])
+        except asyncio.TimeoutError:
+            raise LLMBusyError(f"All {self.max_concurrency} LLM slots busy")
+        with self._lock:
+            self._stats["in_flight"] += 1
+
+    def _release_async_slot(self, slots):
+        with self._lock:
+            self._stats["in_flight"] -= 1
+        slots.release()
+
+    async def agenerate(self, prompt: str, system: str = None, purpose: str = None, **options):
+        client, slots = self._async_state()
+        payload = self._payload(prompt, False, options, system)
+        await self._acquire_async_slot(slots)
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                response = await client.post("/api/generate", json=payload)
+                if response.status_code in (502, 503, 504) and attempt < self.retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+                break
+            response.raise_for_status()
+            body = response.json()
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            self._release_async_slot(slots)
+
+        body["latency"] = time.perf_counter() - started
+        self._record(body, purpose)
+        return body
+
+    async def ainvoke(self, prompt: str, system: str = None, purpose: str = None, **options):
+        return (await self.agenerate(prompt, system=system, purpose=purpose, **options))["response"]
+
+    async def astream(self, prompt: str, system: str = None, purpose: str = None, **options):
+        client, slots = self._async_state()
+        payload = self._payload(prompt, True, options, system)
+        await self._acquire_async_slot(slots)
+        started = time.perf_counter()
+        first_token = None
+        try:
+            async with client.stream("POST", "/api/generate", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        chunk["latency"] = time.perf_counter() - started
+                        chunk["time_to_first_token"] = first_token
+                        self._record(chunk, purpose)
+                        break
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            self._release_async_slot(slots)
+
+    async def agenerate_json(self, prompt: str, schema: dict, system: str = None, purpose: str = None, **options):
+        """Generate one JSON object constrained to schema with Ollama's structured outputs.
 
+        The reply is read as a stream and the request is dropped as soon as
+        the top-level object closes, so nothing after it is ever generated.
+        Cap the length with num_predict. Returns (text, completion_tokens).
+        """
+        client, slots = self._async_state()
+        payload = self._payload(prompt, True, options, system)
+        payload["format"] = schema
+        await self._acquire_async_slot(slots)
+        started = time.perf_counter()
+        parts, tokens, final = [], 0, None
+        depth, in_string, escaped, closed = 0, False, False, False
+        try:
+            async with client.stream("POST", "/api/generate", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    piece = chunk.get("response", "")
+                    if piece:
+                        tokens += 1
+                    for index, char in enumerate(piece):
+                        if in_string:
+                            if escaped:
+                                escaped = False
+                            elif char == "\\":
+                                escaped = True
+                            elif char == '"':
+                                in_string = False
+                        elif char == '"':
+                            in_string = True
+                        elif char == "{":
+                            depth += 1
+                        elif char == "}":
+                            depth -= 1
+                            if depth == 0:
+                                piece, closed = piece[:index + 1], True
+                                break
+                    parts.append(piece)
+                    if chunk.get("done"):
+                        final = chunk
+                    if closed or final:
+                        break
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            self._release_async_slot(slots)
 
-    
-    
\ No newline at end of file
+        # Stopping early means Ollama never sends its final counters; count chunks instead
+        body = final or {"eval_count": tokens}
+        body["latency"] = time.perf_counter() - started
+        self._record(body, purpose)
+        return "".join(parts), body.get("eval_count", tokens)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+
+    def _record(self, body, purpose=None):
+        call = {
+            "purpose": purpose,
+            "latency_seconds": round(body["latency"], 4),
+            "prompt_tokens": body.get("prompt_eval_count", 0),
+            "completion_tokens": body.get("eval_count", 0),
+            "prompt_eval_seconds": body.get("prompt_eval_duration", 0) / 1e9,
+            "eval_seconds": body.get("eval_duration", 0) / 1e9,
+        }
+        if body.get("time_to_first_token") is not None:
+            call["time_to_first_token_seconds"] = round(body["time_to_first_token"], 4)
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["latency_seconds_total"] += body["latency"]
+            self._stats["prompt_tokens_total"] += call["prompt_tokens"]
+            self._stats["completion_tokens_total"] += call["completion_tokens"]
+            self._stats["prompt_eval_seconds_total"] += call["prompt_eval_seconds"]
+            self._stats["eval_seconds_total"] += call["eval_seconds"]
+            self.last_call = call
+            self.recent_calls.append(call)
+        record_llm_call(purpose, body["latency"], call["prompt_tokens"], call["completion_tokens"], call["eval_seconds"])
+
+    def _by_purpose(self, calls):
+        grouped = {}
+        for call in calls:
+            grouped.setdefault(call["purpose"] or "other", []).append(call)
+        return {
+            purpose: {
+                "calls": len(group),
+                "prompt_tokens_avg": round(sum(c["prompt_tokens"] for c in group) / len(group), 1),
+                "prompt_eval_seconds_avg": round(sum(c["prompt_eval_seconds"] for c in group) / len(group), 4),
+                "completion_tokens_avg": round(sum(c["completion_tokens"] for c in group) / len(group), 1),
+                "eval_seconds_avg": round(sum(c["eval_seconds"] for c in group) / len(group), 4),
+            }
+            for purpose, group in grouped.items()
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["last_call"] = self.last_call
+            recent = list(self.recent_calls)
+        # Averages over the last RECENT_CALLS calls, to compare prompt-eval cost per call site
+        stats["recent_by_purpose"] = self._by_purpose(recent)
+        stats["model"] = self.model_name
+        stats["max_concurrency"] = self.max_concurrency
+        stats["latency_seconds_avg"] = round(stats["latency_seconds_total"] / stats["calls"], 4) if stats["calls"] else None
+        return stats
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(model_name: str = None):
+    """Return the shared client for model_name, creating it on first use"""
+    model_name = model_name or config.OLLAMA_MODEL
+    with _clients_lock:
+        client = _clients.get(model_name)
+        if client is None:
+            client = _clients[model_name] = OllamaClient(model_name)
+        return client
+
+
+async def close_clients():
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        await client.aclose()
+
+
+def all_stats():
+    with _clients_lock:
+        clients = list(_clients.values())
+    return [client.stats() for client in clients]
+
+
+class LocalLLM:
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or config.OLLAMA_MODEL
+
+    def get_llm(self):
+        """The model's shared client, behind the LLM scheduler unless LLM_SCHEDULER is off"""
+        if config.LLM_SCHEDULER:
+            from .llm_scheduler import get_scheduler
+            return get_scheduler(self.model_name)
+        return get_client(self.model_name)
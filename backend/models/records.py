@@ -0,0 +1,227 @@
+import json
+import struct
+from enum import IntEnum
+from typing import Optional, Union
+from pydantic import BaseModel, field_validator
+
+# Applicant fields, in the order the sales agent collects them
+FIELDS = ("name", "age", "employment_type", "salary", "credit_score", "loan_amount")
+NUMERIC_FIELDS = ("age", "salary", "credit_score", "loan_amount")
+# Longest name kept; names are cut to this when captured, which also keeps
+# the encoded name well within the session encoding's 16-bit length field
+NAME_MAX_CHARS = 100
+
+
+def parse_number(value):
+    """'50,000' -> 50000, 7.5 -> 7.5, '' or None -> None; raises ValueError for anything else"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Not a number: {value!r}")
+    if isinstance(value, str):
+        value = value.replace(",", "").strip()
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+class EmploymentType(IntEnum):
+    OTHER = 0
+    SALARIED = 1
+    SELF_EMPLOYED = 2
+
+    @property
+    def label(self):
+        return EMPLOYMENT_LABELS[self]
+
+    @classmethod
+    def parse(cls, value):
+        """Enum for a label in any case ('salaried', 'Self employed') or its code; None if empty"""
+        if value is None or value == "":
+            return None
+        if isinstance(value, int):
+            return cls(value)
+        key = str(value).strip().lower().replace(" ", "-").replace("_", "-")
+        return _EMPLOYMENT_BY_KEY.get(key, cls.OTHER)
+
+
+EMPLOYMENT_LABELS = {
+    EmploymentType.OTHER: "Other",
+    EmploymentType.SALARIED: "Salaried",
+    EmploymentType.SELF_EMPLOYED: "Self-employed",
+}
+_EMPLOYMENT_BY_KEY = {label.lower(): employment for employment, label in EMPLOYMENT_LABELS.items()}
+
+
+class Stage(IntEnum):
+    COLLECTING = 0
+    DOCUMENT_VERIFICATION = 1
+    APPROVED = 2
+
+    @property
+    def label(self):
+        return STAGE_LABELS[self]
+
+
+STAGE_LABELS = {
+    Stage.COLLECTING: "collecting_details",
+    Stage.DOCUMENT_VERIFICATION: "document_verification",
+    Stage.APPROVED: "approved",
+}
+_STAGE_BY_LABEL = {label: stage for stage, label in STAGE_LABELS.items()}
+
+
+class ApplicantRecord:
+    """The six application fields; None until collected"""
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        for field in FIELDS:
+            object.__setattr__(self, field, None)
+        for field, value in fields.items():
+            self.set(field, value)
+
+    def __setattr__(self, field, value):
+        self.set(field, value)
+
+    def set(self, field, value):
+        """Store value coerced to the field's type; raises ValueError for a number that doesn't parse"""
+        if field == "name":
+            value = None if value is None else " ".join(str(value).split())[:NAME_MAX_CHARS].rstrip() or None
+        elif field == "employment_type":
+            value = EmploymentType.parse(value)
+        elif field in NUMERIC_FIELDS:
+            value = parse_number(value)
+        else:
+            raise AttributeError(f"ApplicantRecord has no field '{field}'")
+        object.__setattr__(self, field, value)
+
+    def get(self, field):
+        return getattr(self, field)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**{field: data[field] for field in FIELDS if field in data})
+
+    def to_dict(self):
+        """Collected fields only, in collection order, with the employment type as its label"""
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value.label if field == "employment_type" else value
+        return data
+
+    def missing(self):
+        return [field for field in FIELDS if getattr(self, field) is None]
+
+    @property
+    def complete(self):
+        return all(getattr(self, field) is not None for field in FIELDS)
+
+    def __eq__(self, other):
+        return isinstance(other, ApplicantRecord) and all(
+            getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    def __repr__(self):
+        return f"ApplicantRecord({', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())})"
+
+
+# Session encoding: version, stage, employment (0xFF = unset), bitmask of the
+# numeric fields that are set, the four numbers, then the UTF-8 name and an
+# optional compact JSON tail with the underwriting and document results.
+_VERSION = 1
+_HEADER = struct.Struct("<BBBB4dH")
+_UNSET = 0xFF
+
+
+class SessionState:
+    """Everything the session store keeps for one conversation"""
+    __slots__ = ("applicant", "stage", "underwriting_result", "documents", "final_decision")
+
+    def __init__(self, applicant=None, stage=Stage.COLLECTING, underwriting_result=None,
+                 documents=None, final_decision=None):
+        self.applicant = applicant or ApplicantRecord()
+        self.stage = Stage(stage)
+        self.underwriting_result = underwriting_result
+        self.documents = documents or {}
+        self.final_decision = final_decision
+
+    @property
+    def empty(self):
+        return (self.stage == Stage.COLLECTING and not self.applicant.to_dict()
+                and self.underwriting_result is None and not self.documents)
+
+    def __repr__(self):
+        return (f"SessionState(stage={self.stage.label}, {self.applicant!r}, "
+                f"underwriting_result={self.underwriting_result!r}, documents={sorted(self.documents)})")
+
+    def to_bytes(self):
+        applicant = self.applicant
+        mask = 0
+        numbers = []
+        for bit, field in enumerate(NUMERIC_FIELDS):
+            value = getattr(applicant, field)
+            if value is not None:
+                mask |= 1 << bit
+            numbers.append(value or 0)
+        name = (applicant.name or "").encode()
+        employment = _UNSET if applicant.employment_type is None else applicant.employment_type
+        data = _HEADER.pack(_VERSION, self.stage, employment, mask, *numbers, len(name)) + name
+        if self.underwriting_result is not None or self.documents or self.final_decision is not None:
+            tail = [self.underwriting_result, self.documents, self.final_decision]
+            data += json.dumps(tail, separators=(",", ":"), ensure_ascii=False).encode()
+        return data
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        version, stage, employment, mask, *numbers, name_length = _HEADER.unpack_from(data)
+        if version != _VERSION:
+            raise ValueError(f"Unknown session encoding version {version}")
+        applicant = ApplicantRecord()
+        for bit, (field, value) in enumerate(zip(NUMERIC_FIELDS, numbers)):
+            if mask & 1 << bit:
+                applicant.set(field, value)
+        if employment != _UNSET:
+            applicant.employment_type = employment
+        start = _HEADER.size
+        applicant.name = data[start:start + name_length].decode() or None
+        state = cls(applicant, stage)
+        tail = data[start + name_length:]
+        if tail:
+            state.underwriting_result, state.documents, state.final_decision = json.loads(tail)
+        return state
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Sessions stored as JSON dicts before the binary encoding"""
+        return cls(ApplicantRecord.from_dict(data), _STAGE_BY_LABEL.get(data.get("_stage"), Stage.COLLECTING),
+                   data.get("_underwriting_result"), data.get("_documents"), data.get("_final_decision"))
+
+    @classmethod
+    def decode(cls, raw):
+        """State from a stored value: binary, a legacy JSON string, or nothing"""
+        if not raw:
+            return cls()
+        if isinstance(raw, str):
+            return cls.from_dict(json.loads(raw))
+        if raw[:1] == b"{":
+            return cls.from_dict(json.loads(raw))
+        return cls.from_bytes(raw)
+
+
+class Applicant(BaseModel):
+    """An ApplicantRecord at the API boundary: numbers may be strings like '50,000'"""
+    name: Optional[str] = None
+    age: Optional[Union[int, float]] = None
+    employment_type: Optional[str] = None
+    salary: Optional[Union[int, float]] = None
+    credit_score: Optional[Union[int, float]] = None
+    loan_amount: Optional[Union[int, float]] = None
+
+    @field_validator(*NUMERIC_FIELDS, mode="before")
+    @classmethod
+    def _number(cls, value):
+        return parse_number(value)
+
+    def to_record(self):
+        return ApplicantRecord(**self.model_dump(exclude_none=True))
@@ -0,0 +1,36 @@
+import asyncio
+from functools import partial
+
+
+class SingleFlight:
+    """Runs at most one computation per key; concurrent callers with the same key share its result.
+
+    The computation runs as a task of its own and every caller, including
+    the one that started it, awaits it through asyncio.shield. A caller that
+    is cancelled (e.g. its client disconnected) stops waiting, but the work
+    finishes for everyone else still waiting on it. An exception reaches
+    every caller.
+    """
+
+    def __init__(self):
+        self._tasks = {}  # key -> task of the computation in flight
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def run(self, key, compute):
+        """Return (result, shared). compute() is called at once, and only if nothing is in flight
+        for key; shared is True if this caller joined a computation started by another one."""
+        task = self._tasks.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._tasks[key] = task
+            task.add_done_callback(partial(self._finished, key))
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # every caller may have gone; don't log it as unretrieved
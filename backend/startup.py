@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Which subsystems a worker serves. "chat" workers never import the OCR stack
+# (OpenCV, EasyOCR, torch); "ocr" workers never talk to the model.
+ROLES = {"all": ("chat", "ocr"), "chat": ("chat",), "ocr": ("ocr",)}
+
+
+def subsystems(role=None):
+    role = (role or config.WORKER_ROLE).strip().lower()
+    if role not in ROLES:
+        raise ValueError(f"Unknown WORKER_ROLE '{role}', expected one of {', '.join(ROLES)}")
+    return ROLES[role]
+
+
+async def warm_ocr():
+    """Start the OCR workers and load their readers"""
+    from .agents.ocr_executor import ocr_executor
+    await asyncio.to_thread(ocr_executor.warm_up)
+
+
+async def prime_llm():
+    """Have Ollama load the model and evaluate the sales system prompt before the first chat turn.
+
+    Retries until the model server answers, so a worker started before
+    Ollama becomes ready once it is up.
+    """
+    from .agents.sales_agent import SALES_SYSTEM_PROMPT
+    from .models.ollama_model import get_client
+
+    client = get_client()
+    while True:
+        try:
+            await client.agenerate("Hello", system=SALES_SYSTEM_PROMPT, purpose="warmup", num_predict=1)
+            return
+        except Exception as e:
+            logger.warning("LLM warm-up failed, retrying in %ss: %s", config.LLM_WARM_RETRY_SECONDS, e)
+            await asyncio.sleep(config.LLM_WARM_RETRY_SECONDS)
+
+
+class WarmUp:
+    """Runs the startup warm-up steps in the background and tracks readiness.
+
+    The server accepts connections (and answers liveness checks) at once;
+    readiness turns true when every step has finished.
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self._task = None
+
+    @property
+    def ready(self):
+        return all(step["status"] == "ready" for step in self.steps.values())
+
+    def start(self, steps):
+        """steps maps a name to a coroutine function"""
+        for name in steps:
+            self.steps[name] = {"status": "pending", "seconds": None}
+        self._task = asyncio.ensure_future(asyncio.gather(*(self._run(name, step) for name, step in steps.items())))
+
+    async def _run(self, name, step):
+        started = time.perf_counter()
+        try:
+            await step()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Warm-up step %s failed: %s", name, e)
+            self.steps[name].update(status="failed", error=str(e))
+            return
+        seconds = round(time.perf_counter() - started, 3)
+        self.steps[name].update(status="ready", seconds=seconds)
+        logger.info("Warm-up step %s ready in %.2fs", name, seconds)
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self):
+        return {"ready": self.ready, "steps": self.steps}
+
+
+warm_up = WarmUp()
@@ -1,2 +1,3 @@
+import asyncio
 from agents.sales_agent import collect_customer_info
-print(collect_customer_info("1 lakh in indian rupees"))
\ No newline at end of file
+print(asyncio.run(collect_customer_info("1 lakh in indian rupees")))
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""Synthetic burst of underwriting calls with chat turns arriving in the middle of it.
+
+    python -m benchmarks.llm_burst --underwriting 64 --duplicates 0.25 --chats 16
+
+Fires --underwriting LLM underwriting requests at /underwriter/analyze at
+once (a --duplicates share of them repeat an earlier applicant), then
+--chats chat turns at /sales_agent/message --chat-delay seconds later, and
+measures it twice: with LLM_SCHEDULER off and on. The mock model serves
+--parallel requests at a time with batched decoding (--batch-cost), like
+Ollama with OLLAMA_NUM_PARALLEL, and the API may keep as many in flight.
+
+The decision cache is off and every request goes to the LLM, so the
+scheduler alone accounts for the difference. The report lists generations
+the model actually ran, aggregate completion tokens per second, and
+latency of both kinds of request.
+"""
+import argparse
+import asyncio
+import random
+import time
+import httpx
+from .load_test import start_server, percentile
+
+
+def applicants(count, duplicates, seed):
+    rng = random.Random(seed)
+    unique = []
+    for i in range(count):
+        if unique and rng.random() < duplicates:
+            yield rng.choice(unique)
+            continue
+        applicant = {
+            "name": f"Burst Applicant {i}",
+            "age": rng.randint(22, 60),
+            "employment_type": rng.choice(["Salaried", "Self-employed"]),
+            "salary": rng.randrange(20000, 200000, 1000),
+            "credit_score": rng.randint(550, 850),
+            "loan_amount": rng.randrange(50000, 2000000, 10000),
+        }
+        unique.append(applicant)
+        yield applicant
+
+
+async def burst(args):
+    underwriting, chats, errors = [], [], 0
+
+    async def timed(latencies, method, *a, **kw):
+        nonlocal errors
+        started = time.perf_counter()
+        response = await method(*a, **kw)
+        if response.status_code != 200:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    async def chat_turns(client):
+        await asyncio.sleep(args.chat_delay)
+        await asyncio.gather(*(timed(chats, client.post, "/sales_agent/message",
+                                     json={"session_id": f"burst_{i}", "user_message": f"hi, I am user {i}"})
+                               for i in range(args.chats)))
+
+    limits = httpx.Limits(max_connections=args.underwriting + args.chats)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=600) as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(timed(underwriting, client.post, "/underwriter/analyze", json=applicant)
+              for applicant in applicants(args.underwriting, args.duplicates, args.seed)),
+            chat_turns(client),
+        )
+        elapsed = time.perf_counter() - started
+        stats = (await client.get("/llm/stats")).json()
+    return underwriting, chats, errors, elapsed, stats
+
+
+def run_once(args, scheduler):
+    mock = start_server("benchmarks.mock_ollama:app", args.mock_port, {
+        "MOCK_OLLAMA_LATENCY": str(args.llm_latency),
+        "MOCK_OLLAMA_TOKENS_PER_SEC": str(args.tokens_per_sec),
+        "MOCK_OLLAMA_PARALLEL": str(args.parallel),
+        "MOCK_OLLAMA_BATCH_COST": str(args.batch_cost),
+    })
+    api = start_server("backend.main:app", args.port, {
+        "WORKER_ROLE": "chat",
+        "LLM_WARM_ON_STARTUP": "false",
+        "LOG_LEVEL": "WARNING",
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{args.mock_port}",
+        "OLLAMA_MAX_CONCURRENCY": str(args.parallel),
+        "LLM_SCHEDULER": "true" if scheduler else "false",
+        "LLM_BATCH_WINDOW_MS": str(args.window_ms),
+        "UNDERWRITING_MODE": "llm",
+        "DECISION_CACHE_TTL_SECONDS": "0",
+        "CHAT_TEMPLATES": "false",
+    })
+    try:
+        underwriting, chats, errors, elapsed, stats = asyncio.run(burst(args))
+        mock_stats = httpx.get(f"http://127.0.0.1:{args.mock_port}/mock/stats").json()
+    finally:
+        api.terminate()
+        mock.terminate()
+        api.wait()
+        mock.wait()
+    return {
+        "scheduler": "on" if scheduler else "off",
+        "generations": mock_stats["requests"],
+        "completion_tokens": mock_stats["completion_tokens"],
+        "tokens_per_sec": mock_stats["completion_tokens"] / elapsed,
+        "requests_per_sec": (len(underwriting) + len(chats)) / elapsed,
+        "wall_seconds": elapsed,
+        "underwriting_p50": percentile(underwriting, 50) if underwriting else None,
+        "underwriting_p95": percentile(underwriting, 95) if underwriting else None,
+        "chat_p50": percentile(chats, 50) if chats else None,
+        "chat_p95": percentile(chats, 95) if chats else None,
+        "errors": errors,
+        "scheduler_stats": stats.get("scheduler"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--underwriting", type=int, default=64, help="underwriting requests sent at once")
+    parser.add_argument("--duplicates", type=float, default=0.25, help="share of them repeating an earlier applicant")
+    parser.add_argument("--chats", type=int, default=16, help="chat turns sent during the burst")
+    parser.add_argument("--chat-delay", type=float, default=0.1, help="seconds after the burst the chat turns arrive")
+    parser.add_argument("--parallel", type=int, default=4, help="requests the mock model serves at once")
+    parser.add_argument("--batch-cost", type=float, default=0.25, help="per-token slowdown per extra reply in a batch")
+    parser.add_argument("--window-ms", type=float, default=20, help="LLM_BATCH_WINDOW_MS")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="mock model seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--mock-port", type=int, default=11500)
+    args = parser.parse_args()
+
+    results = [run_once(args, scheduler=False), run_once(args, scheduler=True)]
+
+    print(f"underwriting={args.underwriting} duplicates={args.duplicates} chats={args.chats} "
+          f"parallel={args.parallel} batch_cost={args.batch_cost} window={args.window_ms}ms")
+    print(f"{'scheduler':<10}{'generations':>12}{'tok/s':>9}{'req/s':>8}{'wall s':>8}"
+          f"{'uw p50':>8}{'uw p95':>8}{'chat p50':>10}{'chat p95':>10}{'errors':>8}")
+    for r in results:
+        print(f"{r['scheduler']:<10}{r['generations']:>12}{r['tokens_per_sec']:>9.1f}{r['requests_per_sec']:>8.1f}"
+              f"{r['wall_seconds']:>8.2f}{r['underwriting_p50']:>8.2f}{r['underwriting_p95']:>8.2f}"
+              f"{r['chat_p50']:>10.2f}{r['chat_p95']:>10.2f}{r['errors']:>8}")
+    if results[1]["scheduler_stats"]:
+        print("scheduler:", results[1]["scheduler_stats"][0])
+
+
+if __name__ == "__main__":
+    main()
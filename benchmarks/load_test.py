@@ -0,0 +1,109 @@
+"""Concurrent chat load test against a live API process and the mock Ollama server.
+
+    python -m benchmarks.load_test --sessions 200 --turns 3
+
+Starts benchmarks.mock_ollama and backend.main with uvicorn, then drives
+--sessions conversations at once through /sales_agent/message. The report
+includes the peak number of generations the mock saw in flight: with the
+old sync handlers that number could never exceed FastAPI's threadpool (40),
+while the async path lets it approach --sessions.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TURNS = [
+    "my name is Asha Rao",
+    "I am 32 years old and salaried",
+    "what documents will I need later?",
+    "can you repeat the question?",
+]
+
+
+def start_server(module: str, port: int, env: dict):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, **env},
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{module} did not start on port {port}")
+
+
+async def conversation(client: httpx.AsyncClient, session: int, turns: int, latencies: list):
+    for turn in range(turns):
+        started = time.perf_counter()
+        response = await client.post("/sales_agent/message", json={
+            "session_id": f"load_{session}",
+            "user_message": TURNS[turn % len(TURNS)],
+        })
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(args):
+    latencies = []
+    limits = httpx.Limits(max_connections=args.sessions)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=300) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(conversation(client, i, args.turns, latencies) for i in range(args.sessions)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def percentile(values: list, pct: float):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=1.0, help="mock model latency in seconds")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--mock-port", type=int, default=11500)
+    args = parser.parse_args()
+
+    mock = start_server("benchmarks.mock_ollama:app", args.mock_port, {
+        "MOCK_OLLAMA_LATENCY": str(args.latency),
+    })
+    api = start_server("backend.main:app", args.port, {
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{args.mock_port}",
+        "OLLAMA_MAX_CONCURRENCY": str(args.sessions),
+        "OCR_WARM_ON_STARTUP": "false",
+        "OCR_EXECUTOR": "thread",
+    })
+    try:
+        latencies, elapsed = asyncio.run(run(args))
+        mock_stats = httpx.get(f"http://127.0.0.1:{args.mock_port}/mock/stats").json()
+    finally:
+        api.terminate()
+        mock.terminate()
+
+    requests_done = len(latencies)
+    print(f"sessions={args.sessions} turns={args.turns} mock_latency={args.latency}s")
+    print(f"requests:          {requests_done}")
+    print(f"wall time:         {elapsed:.2f}s")
+    print(f"throughput:        {requests_done / elapsed:.1f} req/s")
+    print(f"latency p50/p95:   {percentile(latencies, 50):.3f}s / {percentile(latencies, 95):.3f}s")
+    print(f"latency mean:      {statistics.mean(latencies):.3f}s")
+    print(f"peak LLM in-flight: {mock_stats['peak_in_flight']} (sync handlers cap this at 40)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Deterministic stand-in for EasyOCR, used by benchmarks.suite.
+
+benchmarks.suite puts this directory first on the API process's PYTHONPATH
+so `import easyocr` finds it. Reading costs MOCK_OCR_MS_PER_MEGAPIXEL of
+sleep per megapixel of the image (or of the boxes, for recognize), so
+smaller preprocessed images are cheaper, as with the real model. Every
+page "contains" a PAN, an Aadhaar number and salary-slip keywords, so all
+verifications pass.
+"""
+import os
+import time
+
+MS_PER_MEGAPIXEL = float(os.getenv("MOCK_OCR_MS_PER_MEGAPIXEL", "400"))
+LOAD_SECONDS = float(os.getenv("MOCK_OCR_LOAD_SECONDS", "0.2"))
+
+LINES = ["INCOME TAX DEPARTMENT", "ABCDE1234F", "2345 6789 0124", "Basic Pay 40000", "HRA 12000", "Net Salary 52000"]
+
+
+class Reader:
+    def __init__(self, lang_list, gpu=False, **kwargs):
+        time.sleep(LOAD_SECONDS)
+
+    def readtext(self, image, **kwargs):
+        time.sleep(image.shape[0] * image.shape[1] / 1e6 * MS_PER_MEGAPIXEL / 1000)
+        return [(None, line, 0.99) for line in LINES]
+
+    def recognize(self, image, horizontal_list=None, free_list=None, **kwargs):
+        boxes = horizontal_list or []
+        pixels = sum((x_max - x_min) * (y_max - y_min) for x_min, x_max, y_min, y_max in boxes)
+        time.sleep(pixels / 1e6 * MS_PER_MEGAPIXEL / 1000)
+        return [(None, LINES[i % len(LINES)], 0.99) for i in range(len(boxes))]
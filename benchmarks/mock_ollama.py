@@ -0,0 +1,151 @@
+"""Deterministic stand-in for the Ollama HTTP API used by the load tests.
+
+Run standalone with:
+    uvicorn benchmarks.mock_ollama:app --port 11500
+
+MOCK_OLLAMA_LATENCY (seconds before the first token) and MOCK_OLLAMA_TOKENS_PER_SEC
+control how slow the fake model is. Like Ollama, a request whose "system" text
+matches the previous request's is only charged prompt-eval for its prompt.
+Requests with a "format" schema get a decision object that matches it, and
+options.num_predict cuts the reply short.
+
+MOCK_OLLAMA_PARALLEL caps the requests served at once like OLLAMA_NUM_PARALLEL
+(0, the default, serves every request at once); the rest wait in arrival
+order. MOCK_OLLAMA_BATCH_COST models batched decoding: with n replies being
+generated together each token takes (1 + BATCH_COST * (n - 1)) times as
+long, so 0 (the default) means every reply gets the full token rate.
+"""
+import asyncio
+import json
+import os
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+LATENCY = float(os.getenv("MOCK_OLLAMA_LATENCY", "0.5"))
+TOKENS_PER_SEC = float(os.getenv("MOCK_OLLAMA_TOKENS_PER_SEC", "50"))
+PARALLEL = int(os.getenv("MOCK_OLLAMA_PARALLEL", "0"))
+BATCH_COST = float(os.getenv("MOCK_OLLAMA_BATCH_COST", "0"))
+
+app = FastAPI()
+state = {"requests": 0, "in_flight": 0, "peak_in_flight": 0, "decoding": 0, "completion_tokens": 0}
+slots = {"semaphore": None}
+cached_prefix = {"system": None}
+
+REPLY = "Thanks! Could you please tell me your monthly salary in rupees?"
+DECISION = ('{"eligible": true, "reason": "Meets all criteria", '
+            '"risk_score": "Low", "next_step": "proceed_to_documents"}')
+# What a schema-constrained model emits: the object, then whitespace until stopped
+STRUCTURED_DECISION = '{"eligible": true, "risk_score": "Low", "reason": "Meets all criteria"}' + " \n" * 20
+
+
+def _reply_for(system: str, prompt: str, schema=None):
+    if schema:
+        return STRUCTURED_DECISION
+    return DECISION if "UNDERWRITER" in (system + prompt).upper() else REPLY
+
+
+def _prompt_tokens(system: str, prompt: str):
+    # Roughly four characters per token; a repeated system prefix comes from the KV cache
+    evaluated = prompt if system and system == cached_prefix["system"] else system + prompt
+    cached_prefix["system"] = system
+    return max(1, len(evaluated) // 4)
+
+
+def _tokens(text: str):
+    words = text.split(" ")
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+def _done(prompt_tokens: int, tokens: list, started: float):
+    elapsed = time.perf_counter() - started
+    return {
+        "done": True,
+        "prompt_eval_count": prompt_tokens,
+        "prompt_eval_duration": int(LATENCY * 1e9),
+        "eval_count": len(tokens),
+        "eval_duration": int(max(elapsed - LATENCY, 0) * 1e9),
+        "total_duration": int(elapsed * 1e9),
+    }
+
+
+async def _acquire():
+    if PARALLEL <= 0:
+        return None
+    if slots["semaphore"] is None:
+        slots["semaphore"] = asyncio.Semaphore(PARALLEL)
+    await slots["semaphore"].acquire()
+    return slots["semaphore"]
+
+
+async def _next_token():
+    """Wait as long as one token takes while state["decoding"] replies are generated together"""
+    await asyncio.sleep((1 + BATCH_COST * (state["decoding"] - 1)) / TOKENS_PER_SEC)
+    state["completion_tokens"] += 1
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    body = await request.json()
+    prompt = body.get("prompt", "")
+    system = body.get("system", "")
+    text = _reply_for(system, prompt, body.get("format"))
+    prompt_tokens = _prompt_tokens(system, prompt)
+    tokens = _tokens(text)
+    num_predict = body.get("options", {}).get("num_predict")
+    if num_predict:
+        tokens = tokens[:num_predict]
+        text = "".join(tokens)
+    started = time.perf_counter()
+
+    state["requests"] += 1
+    state["in_flight"] += 1
+    state["peak_in_flight"] = max(state["peak_in_flight"], state["in_flight"])
+
+    if not body.get("stream", True):
+        slot, decoding = None, False
+        try:
+            slot = await _acquire()
+            await asyncio.sleep(LATENCY)
+            state["decoding"] += 1
+            decoding = True
+            for _ in tokens:
+                await _next_token()
+        finally:
+            if decoding:
+                state["decoding"] -= 1
+            state["in_flight"] -= 1
+            if slot is not None:
+                slot.release()
+        return {"model": body.get("model"), "response": text, **_done(prompt_tokens, tokens, started)}
+
+    async def chunks():
+        slot, decoding = None, False
+        try:
+            slot = await _acquire()
+            await asyncio.sleep(LATENCY)
+            state["decoding"] += 1
+            decoding = True
+            for token in tokens:
+                await _next_token()
+                yield json.dumps({"response": token, "done": False}) + "\n"
+            yield json.dumps({"response": "", **_done(prompt_tokens, tokens, started)}) + "\n"
+        finally:
+            if decoding:
+                state["decoding"] -= 1
+            state["in_flight"] -= 1
+            if slot is not None:
+                slot.release()
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+@app.get("/mock/stats")
+def stats():
+    return state
+
+
+@app.post("/mock/reset")
+def reset():
+    state.update({"requests": 0, "in_flight": 0, "peak_in_flight": 0, "decoding": 0, "completion_tokens": 0})
+    return state
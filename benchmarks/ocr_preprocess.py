@@ -0,0 +1,164 @@
+"""Before/after latency and accuracy of the OCR preprocessing stage.
+
+    python -m benchmarks.ocr_preprocess --per-type 5
+
+Renders synthetic phone photos (12 MP, tilted, on a textured background)
+of PAN cards, Aadhaar cards and salary slips, plus look-alikes that must be
+rejected, and verifies each one three ways:
+
+    raw         full-resolution image straight into EasyOCR (the old path)
+    preprocess  downscale + grayscale + crop to document + deskew
+    roi         preprocess, then OCR only the zone holding the key field
+
+Reports per-mode accuracy, latency percentiles and pixels sent to OCR.
+Without easyocr installed only the preprocessing cost and pixel counts
+are measured.
+"""
+import argparse
+import io
+import random
+import statistics
+import time
+import cv2
+import numpy as np
+from PIL import Image
+from backend.agents.doc_scanner import passed, verhoeff_valid
+
+PHOTO_SIZE = (4032, 3024)
+
+
+def _pan_number(rng, valid):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    if not valid:
+        return "".join(rng.choice(letters) for _ in range(4)) + str(rng.randint(100000, 999999))
+    return ("".join(rng.choice(letters) for _ in range(5)) + str(rng.randint(1000, 9999))
+            + rng.choice(letters))
+
+
+def _aadhaar_number(rng, valid):
+    if not valid:
+        return f"{rng.randint(100, 999)} {rng.randint(10000, 99999)} {rng.randint(1000, 9999)}"
+    # Eleven random digits plus the Verhoeff check digit that makes them valid
+    digits = str(rng.randint(2, 9)) + "".join(str(rng.randint(0, 9)) for _ in range(10))
+    digits += next(d for d in "0123456789" if verhoeff_valid(digits + d))
+    return f"{digits[:4]} {digits[4:8]} {digits[8:]}"
+
+
+def _document(doc_type, rng, valid):
+    """Draw a flat document: (image, lines) with lines as (text, y fraction, scale)"""
+    if doc_type == "salary_slip":
+        width, height = 1700, 2200
+        keywords = ["Basic Pay", "HRA", "Gross Salary", "Net Salary"] if valid else ["Invoice", "Total Due"]
+        lines = [("ACME TECHNOLOGIES PVT LTD", 0.08, 2.2), ("Payslip for the month of June", 0.14, 1.6)]
+        lines += [(f"{word}   {rng.randint(5000, 90000)}", 0.3 + 0.07 * i, 1.8) for i, word in enumerate(keywords)]
+        lines.append(("This is a computer generated document", 0.92, 1.1))
+    elif doc_type == "pan":
+        width, height = 1710, 1080
+        lines = [("INCOME TAX DEPARTMENT", 0.1, 2.0), ("GOVT. OF INDIA", 0.18, 1.6),
+                 ("Permanent Account Number", 0.45, 1.5), (_pan_number(rng, valid), 0.56, 2.6),
+                 ("ASHA RAO", 0.7, 1.8), ("01/01/1990", 0.8, 1.6)]
+    else:
+        width, height = 1710, 1080
+        lines = [("GOVERNMENT OF INDIA", 0.1, 2.0), ("Asha Rao", 0.3, 1.8), ("DOB: 01/01/1990", 0.4, 1.6),
+                 ("FEMALE", 0.5, 1.6), (_aadhaar_number(rng, valid), 0.8, 3.0)]
+
+    image = np.full((height, width, 3), 245, np.uint8)
+    for text, y, scale in lines:
+        cv2.putText(image, text, (int(width * 0.08), int(height * y)), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, (20, 20, 20), max(2, int(scale * 2)), cv2.LINE_AA)
+    return image
+
+
+def make_photo(doc_type, rng, valid):
+    """Place a document on a noisy background at a slight tilt and encode it as a JPEG"""
+    document = _document(doc_type, rng, valid)
+    photo_w, photo_h = PHOTO_SIZE
+    background = rng.randint(90, 150)
+    photo = np.clip(np.random.default_rng(rng.randint(0, 2 ** 32)).normal(background, 12, (photo_h, photo_w, 3)),
+                    0, 255).astype(np.uint8)
+
+    height, width = document.shape[:2]
+    scale = 0.7 * min(photo_w / width, photo_h / height)
+    angle = rng.uniform(-8, 8)
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, scale)
+    matrix[0, 2] += photo_w / 2 - width / 2
+    matrix[1, 2] += photo_h / 2 - height / 2
+    warped = cv2.warpAffine(document, matrix, (photo_w, photo_h))
+    mask = cv2.warpAffine(np.full((height, width), 255, np.uint8), matrix, (photo_w, photo_h))
+    photo[mask > 0] = warped[mask > 0]
+
+    ok, encoded = cv2.imencode(".jpg", photo, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def fixtures(per_type, seed):
+    rng = random.Random(seed)
+    for doc_type in ("pan", "aadhaar", "salary_slip"):
+        for i in range(per_type):
+            valid = i % 4 != 3  # every fourth fixture is a look-alike that must fail
+            yield doc_type, valid, make_photo(doc_type, rng, valid)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-type", type=int, default=4, help="fixtures per document type")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from backend.agents import image_preprocess
+
+    try:
+        from backend.agents.doc_verify import DocumentVerifier, reader_pool
+        reader_pool.warm_up()
+        have_ocr = True
+    except ImportError:
+        have_ocr = False
+        print("easyocr is not installed: measuring preprocessing only\n")
+
+    def raw(doc_type, data):
+        image = np.array(Image.open(io.BytesIO(data)))
+        if not have_ocr:
+            return None, image.shape[0] * image.shape[1]
+        text = " ".join(result[1] for result in reader_pool.readtext(image))
+        return DocumentVerifier.verdict(doc_type, text), image.shape[0] * image.shape[1]
+
+    def preprocess(doc_type, data):
+        image = image_preprocess.prepare(data)
+        if not have_ocr:
+            return None, image.shape[0] * image.shape[1]
+        text = " ".join(result[1] for result in reader_pool.readtext(image))
+        return DocumentVerifier.verdict(doc_type, text), image.shape[0] * image.shape[1]
+
+    def roi(doc_type, data):
+        if not have_ocr:
+            image = image_preprocess.prepare(data)
+            boxes = image_preprocess.roi_boxes(image, doc_type)
+            return None, sum((x1 - x0) * (y1 - y0) for x0, x1, y0, y1 in boxes)
+        verdict, full_text = DocumentVerifier.verify_region_first(doc_type, data)
+        return verdict, None
+
+    items = list(fixtures(args.per_type, args.seed))
+    print(f"{len(items)} fixtures, {PHOTO_SIZE[0]}x{PHOTO_SIZE[1]} JPEG photos\n")
+    print(f"{'mode':<11} {'accuracy':>9} {'p50 ms':>8} {'p95 ms':>8} {'mean px sent to OCR':>20}")
+    for name, run in (("raw", raw), ("preprocess", preprocess), ("roi", roi)):
+        latencies, pixels, correct = [], [], 0
+        for doc_type, valid, data in items:
+            started = time.perf_counter()
+            verdict, px = run(doc_type, data)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if px is not None:
+                pixels.append(px)
+            if verdict is not None and passed(verdict) == valid:
+                correct += 1
+        accuracy = f"{correct / len(items):.0%}" if have_ocr else "n/a"
+        mean_px = f"{statistics.mean(pixels):,.0f}" if pixels else "n/a"
+        print(f"{name:<11} {accuracy:>9} {percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} {mean_px:>20}")
+
+
+if __name__ == "__main__":
+    main()
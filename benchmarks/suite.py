@@ -0,0 +1,335 @@
+"""Reproducible benchmark suite: chat sessions, batch underwriting and document verification.
+
+    python -m benchmarks.suite                    # run, compare with benchmarks/baseline.json
+    python -m benchmarks.suite --save-baseline    # run and store the results as the new baseline
+    python -m benchmarks.suite --only chat,docs
+
+Everything runs locally and deterministically. benchmarks.mock_ollama
+stands in for the model (--llm-latency, --tokens-per-sec), the mock EasyOCR
+in benchmarks/mock_ocr charges --ocr-ms-per-mp of sleep per megapixel read,
+and document photos are rendered by benchmarks.ocr_preprocess. The API runs
+in one uvicorn process with the thread OCR executor, so its peak RSS covers
+all the work.
+
+For every endpoint the suite reports p50/p95/p99 latency, throughput and
+the API process's peak RSS while that scenario ran. With a baseline it
+exits with status 1 when p95 latency or peak RSS grow, or throughput drops,
+by more than --tolerance.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import httpx
+from .load_test import ROOT, start_server, percentile
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+MOCK_OCR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_ocr")
+
+# Settings that change the numbers; results are only compared when these match the baseline's
+COMPARED_SETTINGS = ("sessions", "batch_rows", "batch_requests", "docs", "doc_concurrency",
+                     "llm_latency", "tokens_per_sec", "ocr", "ocr_ms_per_mp")
+
+
+class PeakRSS:
+    """Samples a process's resident memory in the background and keeps the peak since reset()"""
+
+    def __init__(self, pid, interval=0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def read(self):
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        try:
+            import psutil
+            return psutil.Process(self.pid).memory_info().rss
+        except Exception:
+            return 0
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.read())
+            time.sleep(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def reset(self):
+        self.peak = self.read()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def summarize(endpoint, latencies, errors, elapsed, peak_rss, **extra):
+    result = {
+        "endpoint": endpoint,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1) if peak_rss else None,
+    }
+    result.update(extra)
+    return result
+
+
+def chat_script(session, rng):
+    """Six turns that complete one application; amounts vary so decisions aren't all cache hits"""
+    salary = rng.randrange(25000, 150000, 500)
+    return [
+        f"Hi, my name is Customer {session}",
+        f"I am {rng.randint(22, 55)} years old",
+        rng.choice(["I'm salaried", "I am self-employed"]),
+        f"I earn {salary} per month",
+        f"my credit score is {rng.randint(600, 850)}",
+        f"I need a loan of {salary * rng.randint(5, 30)}",
+    ]
+
+
+async def run_chat(client, args, rss):
+    rng = random.Random(args.seed)
+    scripts = [chat_script(i, rng) for i in range(args.sessions)]
+    latencies, errors = [], 0
+
+    async def session(i):
+        nonlocal errors
+        for message in scripts[i]:
+            started = time.perf_counter()
+            response = await client.post("/sales_agent/message",
+                                         json={"session_id": f"bench_{args.seed}_{i}", "user_message": message})
+            if response.status_code != 200:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    rss.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    return summarize("POST /sales_agent/message", latencies, errors, elapsed, rss.peak, sessions=args.sessions)
+
+
+def batch_csv(rows, seed):
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["id", "age", "salary", "employment_type", "credit_score", "loan_amount"])
+    for i in range(rows):
+        salary = rng.randrange(10000, 200000, 500)
+        writer.writerow([i, rng.randint(18, 65), salary, rng.choice(["Salaried", "Self-employed", "Unemployed"]),
+                         rng.randint(300, 900), salary * rng.randint(1, 40)])
+    return out.getvalue().encode()
+
+
+async def run_batch(client, args, rss):
+    data = batch_csv(args.batch_rows, args.seed)
+    latencies, errors = [], 0
+    rss.reset()
+    started = time.perf_counter()
+    for _ in range(args.batch_requests):
+        request_started = time.perf_counter()
+        response = await client.post("/underwriter/analyze_batch", files={"file": ("bench.csv", data, "text/csv")})
+        rows = response.content.count(b"\n")
+        if response.status_code != 200 or rows != args.batch_rows:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+    rows_per_second = round(len(latencies) * args.batch_rows / elapsed) if elapsed else None
+    return summarize("POST /underwriter/analyze_batch", latencies, errors, elapsed, rss.peak,
+                     rows_per_request=args.batch_rows, rows_per_second=rows_per_second)
+
+
+async def run_docs(client, args, rss):
+    from .ocr_preprocess import make_photo
+
+    rng = random.Random(args.seed)
+    doc_types = ("pan", "aadhaar", "salary_slip")
+    # Distinct photos, so the OCR cache never answers
+    photos = [(doc_types[i % 3], make_photo(doc_types[i % 3], rng, True)) for i in range(args.docs)]
+    latencies, errors = [], 0
+    slots = asyncio.Semaphore(args.doc_concurrency)
+
+    async def verify(i, doc_type, photo):
+        nonlocal errors
+        async with slots:
+            started = time.perf_counter()
+            while True:
+                response = await client.post("/documents/verify", data={"doc_type": doc_type},
+                                             files={"file": (f"doc_{i}.jpg", photo, "image/jpeg")})
+                if response.status_code != 429:
+                    break
+                # Executor saturated: back off as a client would, the wait counts toward latency
+                await asyncio.sleep(0.05)
+            if response.status_code != 200:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    rss.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(verify(i, doc_type, photo) for i, (doc_type, photo) in enumerate(photos)))
+    elapsed = time.perf_counter() - started
+    return summarize("POST /documents/verify", latencies, errors, elapsed, rss.peak,
+                     concurrency=args.doc_concurrency)
+
+
+SCENARIOS = {"chat": run_chat, "batch": run_batch, "docs": run_docs}
+
+
+async def run(args, only, rss):
+    results = {}
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=600,
+                                 limits=httpx.Limits(max_connections=max(args.sessions, 10))) as client:
+        for name in only:
+            results[name] = await SCENARIOS[name](client, args, rss)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """List of regressions of results against baseline["results"]"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        checks = (("p95_ms", 1), ("peak_rss_mb", 1), ("throughput_rps", -1))
+        for metric, direction in checks:
+            old, new = before.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change * direction > tolerance:
+                regressions.append(f"{name}: {metric} {old} -> {new} ({change:+.0%})")
+        if current["errors"] > before.get("errors", 0):
+            regressions.append(f"{name}: errors {before.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def print_report(results, baseline):
+    header = f"{'scenario':<8} {'requests':>8} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'peak RSS MB':>12}"
+    print(header)
+    for name, r in results.items():
+        print(f"{name:<8} {r['requests']:>8} {r['errors']:>6} {r['p50_ms']!s:>9} {r['p95_ms']!s:>9} "
+              f"{r['p99_ms']!s:>9} {r['throughput_rps']!s:>8} {r['peak_rss_mb']!s:>12}")
+        before = (baseline or {}).get("results", {}).get(name)
+        if before:
+            print(f"{'  base':<8} {before['requests']:>8} {before['errors']:>6} {before['p50_ms']!s:>9} "
+                  f"{before['p95_ms']!s:>9} {before['p99_ms']!s:>9} {before['throughput_rps']!s:>8} "
+                  f"{before['peak_rss_mb']!s:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="chat,batch,docs", help="comma-separated scenarios to run")
+    parser.add_argument("--sessions", type=int, default=50, help="concurrent chat sessions (6 turns each)")
+    parser.add_argument("--batch-rows", type=int, default=20000)
+    parser.add_argument("--batch-requests", type=int, default=5)
+    parser.add_argument("--docs", type=int, default=12, help="synthetic 12 MP document photos to verify")
+    parser.add_argument("--doc-concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="mock model seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=50)
+    parser.add_argument("--ocr", choices=("mock", "easyocr"), default="mock")
+    parser.add_argument("--ocr-ms-per-mp", type=float, default=400, help="mock OCR cost per megapixel")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--mock-port", type=int, default=11500)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    only = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(only) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    mock = start_server("benchmarks.mock_ollama:app", args.mock_port, {
+        "MOCK_OLLAMA_LATENCY": str(args.llm_latency),
+        "MOCK_OLLAMA_TOKENS_PER_SEC": str(args.tokens_per_sec),
+    })
+    api_env = {
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{args.mock_port}",
+        "OLLAMA_MAX_CONCURRENCY": str(max(args.sessions, 4)),
+        "OCR_EXECUTOR": "thread",
+        "OCR_MAX_IN_FLIGHT": str(args.doc_concurrency),
+        "LOG_LEVEL": "WARNING",
+    }
+    if args.ocr == "mock":
+        api_env.update({
+            "PYTHONPATH": os.pathsep.join(filter(None, [MOCK_OCR_PATH, ROOT, os.environ.get("PYTHONPATH")])),
+            "MOCK_OCR_MS_PER_MEGAPIXEL": str(args.ocr_ms_per_mp),
+            # The mock has no torch to configure
+            "OCR_USE_GPU": "true",
+        })
+    api = start_server("backend.main:app", args.port, api_env)
+    rss = PeakRSS(api.pid).start()
+    try:
+        results = asyncio.run(run(args, only, rss))
+    finally:
+        rss.stop()
+        api.terminate()
+        mock.terminate()
+
+    settings = {name: getattr(args, name) for name in COMPARED_SETTINGS}
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(results, baseline)
+    output = {"settings": settings, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                stored = json.load(f)
+            # Keep scenarios that weren't re-run
+            if stored.get("settings") == settings:
+                output["results"] = {**stored["results"], **results}
+        with open(args.baseline, "w") as f:
+            json.dump(output, f, indent=2)
+            f.write("\n")
+        print(f"\nbaseline written to {args.baseline}")
+        return
+
+    if baseline is None:
+        print("\nno baseline to compare with (run with --save-baseline to record one)")
+        return
+    if baseline.get("settings") != settings:
+        print("\nsettings differ from the baseline's, not comparing:", baseline.get("settings"))
+        return
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSIONS (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+    print(f"\nno regressions against the baseline (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
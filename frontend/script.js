@@ -1,5 +1,7 @@
 const API_BASE = "";
 let currentSessionId = "user_" + Math.random().toString(36).substr(2, 9);
+// Set once underwriting passes; only then do uploads count towards the application
+let applicationOpen = false;
 let uploadedDocuments = {
     aadhaar: false,
     pan: false,
@@ -65,11 +67,11 @@ async function sendMessage() {
     try {
         console.log("Sending message to backend...");
         
-        const response = await fetch(`${API_BASE}/sales_agent/message`, {
+        const response = await fetch(`${API_BASE}/sales_agent/message/stream`, {
             method: "POST",
             headers: { 
                 "Content-Type": "application/json",
-                "Accept": "application/json"
+                "Accept": "application/x-ndjson"
             },
             body: JSON.stringify({ 
                 session_id: currentSessionId,
@@ -83,11 +85,53 @@ async function sendMessage() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
+        // Render tokens as they arrive, then apply the closing "final" event
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let bubble = null;
+        let streamedText = "";
+        let data = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let newline;
+            while ((newline = buffer.indexOf("\n")) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (!line) continue;
+
+                const event = JSON.parse(line);
+                if (event.type === "token") {
+                    if (!bubble) {
+                        bubble = addChatMessage("", "bot").querySelector(".message-bubble");
+                    }
+                    streamedText += event.text;
+                    bubble.textContent = streamedText;
+                    scrollChatToBottom();
+                } else if (event.type === "final") {
+                    data = event;
+                } else if (event.type === "error") {
+                    throw new Error(event.detail);
+                }
+            }
+        }
+
         console.log("Backend response:", data);
+        if (!data) {
+            throw new Error("Stream ended without a final event");
+        }
         
         // Display agent response
-        if (data.agent_reply) {
+        if (bubble && data.status === "in_progress") {
+            bubble.textContent = data.agent_reply || streamedText;
+        } else if (data.agent_reply) {
+            if (bubble) {
+                bubble.parentElement.remove();
+            }
             addChatMessage(data.agent_reply, "bot");
         } else {
             addChatMessage("I didn't get a response. Please try again.", "bot");
@@ -115,12 +159,14 @@ function handleApplicationStatus(data) {
     
     switch(status) {
         case 'eligible_for_documents':
+            applicationOpen = true;
             showUnderwritingResults(data.underwriter_result || data.underwriting_result, true);
             showDocumentPanel();
             updateProgress(3);
             break;
             
         case 'rejected':
+            applicationOpen = false;
             showUnderwritingResults(data.underwriter_result || data.underwriting_result, false);
             showRejectionPanel();
             updateProgress(4);
@@ -128,6 +174,7 @@ function handleApplicationStatus(data) {
             
         case 'complete':
             if (data.underwriter_result && data.underwriter_result.eligible) {
+                applicationOpen = true;
                 showUnderwritingResults(data.underwriter_result, true);
                 showDocumentPanel();
                 updateProgress(3);
@@ -142,10 +189,12 @@ function handleApplicationStatus(data) {
             // If no specific status, check if we have underwriting result
             if (data.underwriter_result) {
                 if (data.underwriter_result.eligible) {
+                    applicationOpen = true;
                     showUnderwritingResults(data.underwriter_result, true);
                     showDocumentPanel();
                     updateProgress(3);
                 } else {
+                    applicationOpen = false;
                     showUnderwritingResults(data.underwriter_result, false);
                     showRejectionPanel();
                     updateProgress(4);
@@ -268,6 +317,9 @@ async function uploadDocument(docType) {
         const formData = new FormData();
         formData.append("doc_type", docType);
         formData.append("file", fileInput.files[0]);
+        if (applicationOpen) {
+            formData.append("session_id", currentSessionId);
+        }
 
         console.log("Uploading document:", docType);
         
@@ -283,7 +335,13 @@ async function uploadDocument(docType) {
         const result = await response.json();
         console.log("Document verification result:", result);
         
-        if (result.result && (result.result[`${docType}_valid`] || result.result.verified)) {
+        const mismatch = docType === "salary_slip" ? salaryMismatch(result.application) : null;
+        if (mismatch) {
+            statusSpan.textContent = "❌ Salary Mismatch";
+            statusSpan.className = "status failed";
+            uploadedDocuments.salary_slip = false;
+            addChatMessage(`❌ ${salaryMismatchMessage(mismatch)}`, "bot");
+        } else if (result.result && (result.result[`${docType}_valid`] || result.result.verified)) {
             statusSpan.textContent = "✅ Verified";
             statusSpan.className = "status verified";
             uploadedDocuments[docType] = true;
@@ -306,6 +364,95 @@ async function uploadDocument(docType) {
     }
 }
 
+async function uploadAllDocuments() {
+    // One request for every selected file; multi-page PDF salary slips are fine
+    const formData = new FormData();
+    const docTypes = [];
+    for (const docType of Object.keys(uploadedDocuments)) {
+        const fileInput = document.getElementById(`${docType}-file`);
+        if (fileInput.files.length) {
+            formData.append("doc_types", docType);
+            formData.append("files", fileInput.files[0]);
+            docTypes.push(docType);
+        }
+    }
+
+    if (!docTypes.length) {
+        alert("Please select at least one document first!");
+        return;
+    }
+    if (applicationOpen) {
+        formData.append("session_id", currentSessionId);
+    }
+
+    for (const docType of docTypes) {
+        const statusSpan = document.getElementById(`${docType}-status`);
+        statusSpan.textContent = "⏳ Uploading...";
+        statusSpan.className = "status pending";
+    }
+
+    try {
+        const response = await fetch(`${API_BASE}/documents/verify_batch`, {
+            method: "POST",
+            body: formData
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const report = await response.json();
+        console.log("Batch verification result:", report);
+
+        const mismatch = salaryMismatch(report.application);
+        report.documents.forEach(doc => {
+            const statusSpan = document.getElementById(`${doc.document_type}-status`);
+            if (mismatch && doc.document_type === "salary_slip") {
+                statusSpan.textContent = "❌ Salary Mismatch";
+                statusSpan.className = "status failed";
+                uploadedDocuments.salary_slip = false;
+            } else if (doc.result && doc.result[`${doc.document_type}_valid`]) {
+                statusSpan.textContent = "✅ Verified";
+                statusSpan.className = "status verified";
+                uploadedDocuments[doc.document_type] = true;
+            } else {
+                statusSpan.textContent = "❌ Verification Failed";
+                statusSpan.className = "status failed";
+            }
+        });
+
+        const verified = report.documents.filter(doc => uploadedDocuments[doc.document_type]).length;
+        addChatMessage(`📄 ${verified} of ${report.documents.length} documents verified.`, "bot");
+        if (mismatch) {
+            addChatMessage(`❌ ${salaryMismatchMessage(mismatch)}`, "bot");
+        }
+
+        updateDocumentResults(report);
+        checkAllDocumentsUploaded();
+
+    } catch (error) {
+        console.error('Batch upload error:', error);
+        for (const docType of docTypes) {
+            const statusSpan = document.getElementById(`${docType}-status`);
+            statusSpan.textContent = "❌ Upload Failed";
+            statusSpan.className = "status failed";
+        }
+        addChatMessage("❌ Document upload failed. Please try again.", "bot");
+    }
+}
+
+// The application's salary cross-check, if the salary slip contradicts the declared salary
+function salaryMismatch(application) {
+    const check = application && application.final_decision && application.final_decision.salary_check;
+    return check && check.matches === false ? check : null;
+}
+
+function salaryMismatchMessage(check) {
+    return `The net salary on your salary slip (₹${check.net_salary.toLocaleString("en-IN")}) doesn't match ` +
+        `the monthly salary you declared (₹${check.declared_salary.toLocaleString("en-IN")}). ` +
+        `Please upload your latest salary slip.`;
+}
+
 function updateDocumentResults(result) {
     const resultsDiv = document.getElementById('document-results');
     resultsDiv.innerHTML = `
@@ -333,11 +480,25 @@ function checkAllDocumentsUploaded() {
 
 async function submitAllDocuments() {
     addChatMessage("🎉 All documents submitted successfully! Your application is now under final review.", "bot");
-    
-    // Simulate final approval process
-    setTimeout(() => {
-        showFinalApproval();
-    }, 2000);
+
+    try {
+        const response = await fetch(`${API_BASE}/applications/${currentSessionId}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const application = await response.json();
+        console.log("Application status:", application);
+
+        if (application.final_decision.status === "approved") {
+            showFinalApproval();
+        } else {
+            addChatMessage(`⚠️ ${application.final_decision.reason}`, "bot");
+        }
+    } catch (error) {
+        console.error('Final decision error:', error);
+        addChatMessage("❌ Could not fetch the final decision. Please try again.", "bot");
+    }
 }
 
 function showFinalApproval() {
@@ -379,6 +540,12 @@ function addChatMessage(text, sender) {
     
     chatBox.appendChild(messageDiv);
     chatBox.scrollTop = chatBox.scrollHeight;
+    return messageDiv;
+}
+
+function scrollChatToBottom() {
+    const chatBox = document.getElementById("chat-messages");
+    chatBox.scrollTop = chatBox.scrollHeight;
 }
 
 // Debug function to check backend connection
@@ -0,0 +1,66 @@
+import io
+import json
+import pytest
+from backend.agents.batch_reader import detect_format, read_batches
+from backend.agents.rules import rule_engine
+from backend.agents.underwriter import underwrite_batch
+
+APPLICATIONS = [
+    {"id": "a1", "age": 30, "salary": 60000, "credit_score": 760, "loan_amount": 300000, "employment_type": "Salaried"},
+    {"id": "a2", "age": 45, "salary": 35000, "credit_score": 690, "loan_amount": 500000, "employment_type": "Self-employed"},
+    {"id": "a3", "age": 19, "salary": 15000, "credit_score": 600, "loan_amount": 900000, "employment_type": "Salaried"},
+    {"id": "a4", "age": 30, "salary": 60000, "credit_score": 645, "loan_amount": 300000, "employment_type": "Salaried"},
+    {"id": "a5", "age": 50, "salary": 80000, "credit_score": 720, "loan_amount": 400000, "employment_type": "Student"},
+]
+
+
+def csv_file(rows):
+    columns = list(rows[0])
+    lines = [",".join(columns)] + [",".join(str(row[column]) for column in columns) for row in rows]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def jsonl_file(rows):
+    return io.BytesIO("\n".join(json.dumps(row) for row in rows).encode())
+
+
+@pytest.mark.parametrize("filename, fmt, expected", [
+    ("apps.csv", None, "csv"),
+    ("apps.NDJSON", None, "jsonl"),
+    ("apps.parquet", None, "parquet"),
+    ("upload", "json", "jsonl"),
+])
+def test_detect_format(filename, fmt, expected):
+    assert detect_format(filename, fmt) == expected
+
+
+@pytest.mark.parametrize("filename, fmt", [("apps.xlsx", None), ("apps.csv", "xml")])
+def test_unsupported_format(filename, fmt):
+    with pytest.raises(ValueError):
+        detect_format(filename, fmt)
+
+
+def test_reads_in_bounded_chunks():
+    sizes = [size for _, size in read_batches(csv_file(APPLICATIONS), "csv", 2)]
+    assert sizes == [2, 2, 1]
+
+
+@pytest.mark.parametrize("make_file, fmt", [(csv_file, "csv"), (jsonl_file, "jsonl")])
+def test_batch_matches_single_applications(make_file, fmt):
+    results = list(underwrite_batch(make_file(APPLICATIONS), fmt, chunk_size=2))
+    assert [result["row"] for result in results] == list(range(len(APPLICATIONS)))
+    for application, result in zip(APPLICATIONS, results):
+        single = rule_engine.evaluate(application)
+        assert result["id"] == application["id"]
+        assert result["eligible"] == single.eligible
+        assert result["borderline"] == single.borderline
+        assert result["risk_score"] == single.risk_score
+        if not single.eligible:
+            assert result["reason"] == single.as_result()["reason"]
+
+
+def test_unparseable_rows_are_rejected_alone():
+    rows = [dict(APPLICATIONS[0]), {**APPLICATIONS[0], "id": "bad", "salary": "lots"}]
+    good, bad = underwrite_batch(jsonl_file(rows), "jsonl")
+    assert good["eligible"] is True
+    assert bad["eligible"] is False and bad["reason"] == "Invalid numeric value in application"
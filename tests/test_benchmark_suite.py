@@ -0,0 +1,31 @@
+from benchmarks.suite import compare, summarize
+
+BASELINE = {"results": {
+    "chat": {"errors": 0, "p95_ms": 200.0, "peak_rss_mb": 100.0, "throughput_rps": 50.0},
+    "batch": {"errors": 0, "p95_ms": 600.0, "peak_rss_mb": 150.0, "throughput_rps": 8.0},
+}}
+
+
+def test_summary_reports_percentiles_throughput_and_rss():
+    result = summarize("POST /x", [0.1, 0.2, 0.3, 0.4], 0, 2.0, 150 * 2 ** 20, sessions=2)
+    assert result == {"endpoint": "POST /x", "requests": 4, "errors": 0, "p50_ms": 300.0, "p95_ms": 400.0,
+                      "p99_ms": 400.0, "throughput_rps": 2.0, "peak_rss_mb": 150.0, "sessions": 2}
+
+
+def test_changes_within_tolerance_pass():
+    results = {"chat": {"errors": 0, "p95_ms": 240.0, "peak_rss_mb": 90.0, "throughput_rps": 45.0}}
+    assert compare(results, BASELINE, 0.25) == []
+
+
+def test_regressions_are_listed_per_metric():
+    results = {
+        "chat": {"errors": 2, "p95_ms": 300.0, "peak_rss_mb": 100.0, "throughput_rps": 30.0},
+        "batch": {"errors": 0, "p95_ms": 300.0, "peak_rss_mb": 200.0, "throughput_rps": 8.0},
+        "docs": {"errors": 5, "p95_ms": 9000.0, "peak_rss_mb": 900.0, "throughput_rps": 0.1},  # not in the baseline
+    }
+    assert compare(results, BASELINE, 0.25) == [
+        "chat: p95_ms 200.0 -> 300.0 (+50%)",
+        "chat: throughput_rps 50.0 -> 30.0 (-40%)",
+        "chat: errors 0 -> 2",
+        "batch: peak_rss_mb 150.0 -> 200.0 (+33%)",
+    ]
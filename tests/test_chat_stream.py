@@ -0,0 +1,45 @@
+import json
+import uuid
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.api import sales_routes
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(sales_routes.router, prefix="/sales_agent")
+    return TestClient(app)
+
+
+def stream(client, text):
+    response = client.post("/sales_agent/message/stream",
+                           json={"session_id": f"test-{uuid.uuid4()}", "user_message": text})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_tokens_then_one_final_event(client, monkeypatch):
+    async def agent(user_message, applicant, captured):
+        for chunk in ("Could you ", "tell me ", "your age?"):
+            yield chunk
+
+    monkeypatch.setattr(sales_routes, "stream_customer_info", agent)
+    events = stream(client, "Hi, I'm Ravi Kumar")
+    assert [event["type"] for event in events] == ["token", "token", "token", "final"]
+    final = events[-1]
+    assert final["agent_reply"] == "Could you tell me your age?"
+    assert final["status"] == "in_progress"
+
+
+def test_agent_failure_ends_the_stream_with_an_error_event(client, monkeypatch):
+    async def agent(user_message, applicant, captured):
+        yield "Could"
+        raise ConnectionError("model went away")
+
+    monkeypatch.setattr(sales_routes, "stream_customer_info", agent)
+    events = stream(client, "hello")
+    assert [event["type"] for event in events] == ["token", "error"]
+    assert "model went away" not in events[-1]["detail"]
@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from backend.agents.decision_cache import DecisionCache
+
+APPLICANT = {"name": "Ravi Kumar", "age": 30, "employment_type": "Salaried", "salary": 60000,
+             "credit_score": 760, "loan_amount": 300000}
+DECISION = {"eligible": True, "risk_score": "Low", "reason": "Meets all criteria"}
+
+
+def underwriting(calls, cacheable=True, delay=0.01):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return dict(DECISION), cacheable
+    return compute
+
+
+def test_key_ignores_formatting_but_not_policy():
+    key = DecisionCache.key(APPLICANT, "v1")
+    same = {**APPLICANT, "name": " Ravi   Kumar", "salary": "60,000", "employment_type": "salaried"}
+    assert DecisionCache.key(same, "v1") == key
+    assert DecisionCache.key(APPLICANT, "v2") != key
+    assert DecisionCache.key({**APPLICANT, "loan_amount": 300001}, "v1") != key
+    assert DecisionCache.key({**APPLICANT, "age": "thirty"}, "v1") is None
+
+
+def test_repeat_applications_are_served_from_the_cache():
+    cache, calls = DecisionCache(ttl=60, max_entries=10), []
+    key = DecisionCache.key(APPLICANT, "v1")
+
+    async def main():
+        first = await cache.get_or_compute(key, underwriting(calls))
+        second = await cache.get_or_compute(key, underwriting(calls))
+        return first, second
+
+    (first, cached_first), (second, cached_second) = asyncio.run(main())
+    assert (cached_first, cached_second) == (False, True)
+    assert first == second == DECISION and len(calls) == 1
+    second["reason"] = "changed"
+    assert cache.lookup(key)["reason"] == "Meets all criteria"
+
+
+def test_uncacheable_decisions_are_not_stored():
+    cache, calls = DecisionCache(ttl=60, max_entries=10), []
+
+    async def main():
+        for _ in range(2):
+            await cache.get_or_compute("key", underwriting(calls, cacheable=False))
+
+    asyncio.run(main())
+    assert len(calls) == 2 and cache.stats()["entries"] == 0
+
+
+def test_expiry_and_eviction(monkeypatch):
+    cache = DecisionCache(ttl=10, max_entries=2)
+    now = [1000.0]
+    monkeypatch.setattr("backend.agents.decision_cache.time.monotonic", lambda: now[0])
+    for key in ("a", "b", "c"):
+        cache.store(key, DECISION)
+    assert cache.lookup("a") is None and cache.lookup("c") == DECISION
+    now[0] += 11
+    assert cache.lookup("c") is None
+
+
+def test_identical_concurrent_applications_share_one_run():
+    cache, calls = DecisionCache(ttl=60, max_entries=10), []
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("key", underwriting(calls)) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert [cached for _, cached in results] == [False, True, True]
+    assert len(calls) == 1 and cache.stats()["shared_in_flight"] == 2
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    cache = DecisionCache(ttl=60, max_entries=10)
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model unavailable")
+
+    async def main():
+        return await asyncio.gather(cache.get_or_compute("key", failing), cache.get_or_compute("key", failing),
+                                    return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [RuntimeError, RuntimeError]
+    assert cache.lookup("key") is None
+
+
+def test_disabled_cache_always_computes():
+    cache, calls = DecisionCache(ttl=0, max_entries=10), []
+
+    async def main():
+        for _ in range(2):
+            assert (await cache.get_or_compute("key", underwriting(calls)))[1] is False
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_owner_cancelled_waiter_still_gets_the_decision():
+    # e.g. the chat stream that started underwriting was closed by its client
+    cache, calls = DecisionCache(ttl=60, max_entries=10), []
+
+    async def main():
+        owner = asyncio.ensure_future(cache.get_or_compute("key", underwriting(calls, delay=0.05)))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(cache.get_or_compute("key", underwriting(calls)))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        decision, cached = await waiter
+        assert owner.cancelled()
+        return decision, cached
+
+    assert asyncio.run(main()) == (DECISION, True)
+    assert len(calls) == 1
+    assert cache.lookup("key") == DECISION
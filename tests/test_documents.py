@@ -0,0 +1,100 @@
+import pytest
+from backend import config
+from backend.agents.decision import final_decision, salary_check
+from backend.agents.doc_scanner import passed, scan, verhoeff_valid
+from backend.models.records import ApplicantRecord, SessionState, Stage
+
+AADHAAR = "2345 6789 0124"
+
+SALARY_SLIP = """ACME TECHNOLOGIES PVT LTD
+Salary Slip for March
+Basic Pay 30,000  HRA 12,000
+Gross Salary: Rs. 60,500.00
+Net Salary (INR) 52,000
+Bank Name: HDFC"""
+
+
+@pytest.mark.parametrize("number, valid", [("2363", True), ("2364", False), (AADHAAR, True), ("2345 6789 0123", False)])
+def test_verhoeff(number, valid):
+    assert verhoeff_valid(number) is valid
+
+
+def test_pan():
+    assert scan("INCOME TAX DEPARTMENT\nPermanent Account Number\nABCDE1234F").verdict("pan") == {
+        "pan_valid": True, "pan_number": "ABCDE1234F"}
+    # Lowercase, too short and embedded in a longer word don't count
+    for text in ("abcde1234f", "ABCD1234F", "XABCDE1234F"):
+        assert not scan(text).verdict("pan")["pan_valid"]
+
+
+@pytest.mark.parametrize("text", ["Permanent Account NumberABCDE1234F", "PAN:ABCDE1234F", "ABCDE1234Fsignature"])
+def test_pan_glued_to_a_label(text):
+    assert scan(text).verdict("pan") == {"pan_valid": True, "pan_number": "ABCDE1234F"}
+
+
+def test_aadhaar_needs_a_valid_checksum():
+    assert scan(f"Government of India\n{AADHAAR}").verdict("aadhaar") == {
+        "aadhaar_valid": True, "aadhaar_last4": "0124"}
+    assert not scan("Government of India\n2345 6789 0123").verdict("aadhaar")["aadhaar_valid"]
+
+
+def test_salary_slip_fields():
+    verdict = scan(SALARY_SLIP).verdict("salary_slip")
+    assert verdict == {"salary_slip_valid": True, "net_salary": 52000, "gross_salary": 60500,
+                       "employer": "ACME TECHNOLOGIES PVT LTD"}
+    assert passed(verdict)
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("Net Salary: Rs. 56,600.00", 56600),
+    ("Net Salary (INR) 52,000", 52000),
+    ("Net Pay (Rs.) 45,000", 45000),
+    ("Net Salary (in Rs.): 61,250.50", 61250.5),
+    ("NET SALARY ₹ 1,20,000", 120000),
+    ("Net Salary\n48000", 48000),
+])
+def test_net_salary_formats(text, amount):
+    assert scan(text).net_salary == amount
+
+
+def test_labelled_employer():
+    assert scan("Employer Name: Globex Corporation\nNet Salary 45000").employer == "Globex Corporation"
+
+
+def test_pages_merge():
+    first = scan("ACME TECHNOLOGIES PVT LTD\nBasic Pay 30,000")
+    merged = first.merge(scan("Net Salary 52,000\nBank Name: HDFC"))
+    assert merged.verdict("salary_slip")["salary_slip_valid"]
+    assert merged.net_salary == 52000 and merged.employer == "ACME TECHNOLOGIES PVT LTD"
+
+
+@pytest.fixture
+def tolerance(monkeypatch):
+    monkeypatch.setattr(config, "SALARY_MATCH_TOLERANCE", 0.25)
+
+
+@pytest.mark.parametrize("net_salary, matches", [(60000, True), (45000, True), (75000, True), (44000, False),
+                                                 (76000, False)])
+def test_salary_check_tolerance(tolerance, net_salary, matches):
+    check = salary_check({"net_salary": net_salary}, 60000)
+    assert check["matches"] is matches
+    assert check["difference"] == round(abs(net_salary - 60000) / 60000, 3)
+
+
+@pytest.mark.parametrize("slip, declared", [(None, 60000), ({"net_salary": None}, 60000), ({"net_salary": 50000}, None)])
+def test_salary_check_needs_both_amounts(slip, declared):
+    assert salary_check(slip, declared) is None
+
+
+def test_salary_mismatch_rejects_documents(tolerance):
+    state = SessionState(ApplicantRecord(salary=60000, loan_amount=300000), Stage.DOCUMENT_VERIFICATION,
+                         {"eligible": True, "risk_score": "Low"},
+                         {"pan": {"pan_valid": True}, "aadhaar": {"aadhaar_valid": True},
+                          "salary_slip": {"salary_slip_valid": True, "net_salary": 30000}})
+    decision = final_decision(state)
+    assert decision["status"] == "documents_rejected"
+    assert decision["failed_documents"] == ["salary_slip"]
+    assert not decision["salary_check"]["matches"]
+
+    state.documents["salary_slip"]["net_salary"] = 58000
+    assert final_decision(state)["failed_documents"] == []
@@ -0,0 +1,70 @@
+import pytest
+from backend.agents.field_extractor import extract_fields, parse_amount
+
+
+@pytest.mark.parametrize("number, unit, expected", [
+    ("1,20,000", None, 120000),
+    ("85", "k", 85000),
+    ("85", "thousand", 85000),
+    ("2.5", "l", 250000),
+    ("3", "lakhs", 300000),
+    ("1.5", "lac", 150000),
+    ("1.2", "cr", 12000000),
+    ("2", "crores", 20000000),
+])
+def test_parse_amount_units(number, unit, expected):
+    assert parse_amount(number, unit) == expected
+
+
+@pytest.mark.parametrize("message, field, expected", [
+    ("I earn 85k a month", "salary", 85000),
+    ("my salary is 1,20,000", "salary", 120000),
+    ("need a loan of 2.5 lakh", "loan_amount", 250000),
+    ("I want to borrow 1 cr", "loan_amount", 10000000),
+    ("my credit score is 760", "credit_score", 760),
+])
+def test_extract_numbers_with_units(message, field, expected):
+    assert extract_fields(message)[field].value == expected
+
+
+def test_extract_several_fields():
+    found = extract_fields("I am Ravi Kumar, 30 years old, salaried")
+    assert found["name"].value == "Ravi Kumar"
+    assert found["age"].value == 30
+    assert found["employment_type"].value == "Salaried"
+
+
+def test_out_of_range_number_is_ignored():
+    # Twelve crore is above the largest loan the extractor accepts
+    assert "loan_amount" not in extract_fields("loan of 12 cr")
+
+
+def test_missing_limits_extraction():
+    assert extract_fields("I am 30 years old and earn 85k", missing=["salary"]).keys() == {"salary"}
+
+
+@pytest.mark.parametrize("message", ["why", "tell me more", "what is emi", "What is EMI?", "ok sure", "unemployed"])
+def test_questions_are_not_bare_names(message):
+    assert "name" not in extract_fields(message, expected="name")
+
+
+@pytest.mark.parametrize("message, name", [("Asha Rao", "Asha Rao"), ("emi sato", "Emi Sato")])
+def test_bare_name_reply(message, name):
+    assert extract_fields(message, expected="name")["name"].value == name
+
+
+@pytest.mark.parametrize("message", [
+    "no job currently", "I am not employed", "lost my job last month", "I don't have a job",
+    "not currently working", "unemployed right now", "out of work",
+])
+def test_negated_employment_is_not_an_employment_type(message):
+    assert "employment_type" not in extract_fields(message)
+
+
+@pytest.mark.parametrize("message, employment", [
+    ("I have a job at Infosys", "Salaried"),
+    ("no, I'm salaried", "Salaried"),
+    ("I'm self-employed", "Self-employed"),
+])
+def test_employment_type(message, employment):
+    assert extract_fields(message)["employment_type"].value == employment
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+from backend.agents.image_preprocess import _order_corners, crop_to_document, decode, downscale, grayscale, roi_boxes
+
+
+def test_downscale_limits_longer_side():
+    image = np.zeros((1000, 4000), np.uint8)
+    assert downscale(image, max_side=2000).shape == (500, 2000)
+
+
+def test_downscale_never_upscales():
+    image = np.zeros((300, 400), np.uint8)
+    assert downscale(image, max_side=2000) is image
+
+
+def test_grayscale_keeps_single_channel():
+    gray = np.zeros((10, 10), np.uint8)
+    assert grayscale(gray) is gray
+    assert grayscale(np.zeros((10, 10, 3), np.uint8)).shape == (10, 10)
+
+
+def test_order_corners():
+    points = np.array([[90, 95], [10, 5], [5, 90], [100, 10]])
+    assert _order_corners(points).tolist() == [[10, 5], [100, 10], [90, 95], [5, 90]]
+
+
+def photo_of_a_card():
+    """A light card with a few dark text lines on a dark table"""
+    photo = np.full((600, 800), 40, np.uint8)
+    card = np.full((300, 480), 230, np.uint8)
+    for top in (60, 130, 200):
+        card[top:top + 20, 40:420] = 20
+    photo[150:450, 160:640] = card
+    return photo
+
+
+def test_crop_to_document_cuts_the_background():
+    cropped = crop_to_document(photo_of_a_card())
+    height, width = cropped.shape
+    assert 280 <= height <= 310 and 450 <= width <= 490
+    assert crop_to_document(np.full((100, 100), 200, np.uint8)).shape == (100, 100)
+
+
+def test_decode_downscales_while_decoding():
+    ok, png = cv2.imencode(".png", np.full((1200, 1600), 255, np.uint8))
+    gray = decode(png.tobytes(), max_side=400)
+    assert gray.ndim == 2 and 400 <= max(gray.shape) < 800
+
+
+def test_roi_boxes_stay_inside_the_zone():
+    card = crop_to_document(photo_of_a_card())
+    boxes = roi_boxes(card, "aadhaar")
+    height = card.shape[0]
+    assert boxes and all(y_min >= 0.55 * height - 4 for _, _, y_min, _ in boxes)
+    assert roi_boxes(card, "passport") == []
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from backend.models.llm_scheduler import BULK, INTERACTIVE, LLMScheduler, MicroBatcher, PrioritySlots
+from backend.models.ollama_model import LLMBusyError
+
+
+class FakeClient:
+    model_name = "test-model"
+
+    def __init__(self, max_concurrency=2, timeout=1.0, fail=None):
+        self.max_concurrency = max_concurrency
+        self.timeout = (1.0, timeout)
+        self.fail = fail
+        self.calls = []
+
+    async def agenerate(self, prompt, system=None, purpose=None, **options):
+        self.calls.append((prompt, purpose))
+        await asyncio.sleep(0.02)
+        if self.fail:
+            raise self.fail
+        return {"response": f"reply to {prompt}"}
+
+
+def test_freed_slots_go_to_chat_turns_first():
+    async def main():
+        slots = PrioritySlots(1)
+        await slots.acquire(BULK)
+        order = []
+
+        async def take(name, priority):
+            await slots.acquire(priority)
+            order.append(name)
+            slots.release()
+
+        waiters = [asyncio.ensure_future(take(name, priority)) for name, priority in
+                   [("bulk 1", BULK), ("bulk 2", BULK), ("chat", INTERACTIVE)]]
+        await asyncio.sleep(0)
+        assert (slots.waiting(BULK), slots.waiting(INTERACTIVE)) == (2, 1)
+        slots.release()
+        await asyncio.gather(*waiters)
+        return order, slots.free
+
+    assert asyncio.run(main()) == (["chat", "bulk 1", "bulk 2"], 1)
+
+
+def test_cancelled_waiter_does_not_keep_the_slot():
+    async def main():
+        slots = PrioritySlots(1)
+        await slots.acquire(BULK)
+        gone = asyncio.ensure_future(slots.acquire(BULK))
+        await asyncio.sleep(0)
+        gone.cancel()
+        slots.release()
+        await asyncio.wait_for(slots.acquire(INTERACTIVE), 1)
+        slots.release()
+        return slots.free
+
+    assert asyncio.run(main()) == 1
+
+
+def test_batch_is_released_when_full_or_when_the_window_ends():
+    async def main():
+        loop = asyncio.get_running_loop()
+        full = MicroBatcher(window=10, max_size=3)
+        started = loop.time()
+        await asyncio.gather(*(full.join() for _ in range(3)))
+        assert loop.time() - started < 1
+
+        timed = MicroBatcher(window=0.02, max_size=10)
+        await asyncio.gather(timed.join(), timed.join())
+        return (full.batches, full.batched), (timed.batches, timed.batched)
+
+    assert asyncio.run(main()) == ((1, 3), (1, 2))
+
+
+def test_identical_calls_share_one_generation():
+    client = FakeClient()
+    scheduler = LLMScheduler(client, window=0)
+
+    async def main():
+        return await asyncio.gather(scheduler.ainvoke("same", purpose="explain"),
+                                    scheduler.ainvoke("same", purpose="explain"),
+                                    scheduler.ainvoke("other", purpose="explain"))
+
+    assert asyncio.run(main()) == ["reply to same", "reply to same", "reply to other"]
+    assert len(client.calls) == 2
+    assert scheduler.stats()["coalesced"] == 1
+
+
+def test_a_failed_generation_reaches_every_coalesced_caller():
+    client = FakeClient(fail=ConnectionError("Ollama is down"))
+    scheduler = LLMScheduler(client, window=0)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.ainvoke("same", purpose="explain") for _ in range(3)),
+                                    return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [ConnectionError] * 3
+    assert len(client.calls) == 1
+
+
+def test_queued_calls_give_up_when_no_slot_frees():
+    client = FakeClient(max_concurrency=1, timeout=0.005)
+    scheduler = LLMScheduler(client, window=0)
+
+    async def main():
+        first = asyncio.ensure_future(scheduler.ainvoke("first", purpose="sales"))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMBusyError):
+            await scheduler.ainvoke("second", purpose="sales")
+        return await first
+
+    assert asyncio.run(main()) == "reply to first"
@@ -0,0 +1,59 @@
+import json
+import logging
+import pytest
+from backend.log import JSONFormatter, RedactingFilter, SamplingFilter, _module_levels, redact
+
+
+def record(msg, *args, **extra):
+    record = logging.LogRecord("backend.test", logging.INFO, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("PAN ABCDE1234F verified", "PAN [PAN] verified"),
+    ("aadhaar 2345 6789 0124", "aadhaar [AADHAAR]"),
+    ("{'name': 'Asha Rao', 'age': 30}", "{'name': [NAME], 'age': 30}"),
+    ('{"name":"Asha Rao","age":30}', '{"name":[NAME],"age":30}'),
+    ("Full Name: Asha Rao; Age: 30", "Full Name: [NAME]; Age: 30"),
+    ("my name is Asha Rao", "my name is [NAME]"),
+    ("credit score 760", "credit score 760"),
+])
+def test_redact_text(text, expected):
+    assert redact(text) == expected
+
+
+def test_redact_structures_and_known_names():
+    data = {"name": "Asha Rao", "reply": "Thanks Asha, noted.", "scores": [760, "ABCDE1234F"]}
+    assert redact(data, known=["Asha"]) == {"name": "[NAME]", "reply": "Thanks [NAME], noted.",
+                                             "scores": [760, "[PAN]"]}
+
+
+def test_redacting_filter_covers_arguments_and_extra_fields():
+    entry = record("Agent reply: %s", "Hello Asha Rao", pii=["Asha Rao"], customer_name="Asha Rao",
+                   applicant={"pan": "ABCDE1234F"})
+    assert RedactingFilter().filter(entry)
+    assert entry.getMessage() == "Agent reply: Hello [NAME]"
+    assert entry.customer_name == "[NAME]"
+    assert entry.applicant == {"pan": "[PAN]"}
+
+
+def test_json_lines_carry_the_extra_fields():
+    line = json.loads(JSONFormatter().format(record("Decision for %s", "s1", eligible=True, risk_score="Low")))
+    assert line["message"] == "Decision for s1"
+    assert (line["level"], line["logger"]) == ("INFO", "backend.test")
+    assert (line["eligible"], line["risk_score"]) == (True, "Low")
+    assert line["time"].endswith("Z")
+
+
+def test_only_marked_records_are_sampled():
+    never, always = SamplingFilter(0), SamplingFilter(1)
+    assert not never.filter(record("prompt body", sample=True))
+    assert never.filter(record("decision"))
+    assert always.filter(record("prompt body", sample=True))
+
+
+def test_module_levels():
+    assert _module_levels("backend.memory=warning, backend.agents.underwriter=DEBUG,bad") == {
+        "backend.memory": "WARNING", "backend.agents.underwriter": "DEBUG"}
@@ -0,0 +1,161 @@
+import threading
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from backend import memory as memory_module
+from backend.database import db
+from backend.memory import SessionBackend, InMemoryBackend, SQLBackend, RedisBackend, create_backend
+from backend.models.records import Stage
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls time.time() as seen by the session backends"""
+    now = [1000.0]
+    monkeypatch.setattr(memory_module.time, "time", lambda: now[0])
+    return now
+
+
+def sql_backend(tmp_path, ttl):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}", connect_args={"check_same_thread": False})
+    # The same transaction setup as the application's engine
+    event.listen(engine, "connect", db._disable_pysqlite_begin)
+    event.listen(engine, "begin", db._begin_immediate)
+    return SQLBackend(ttl=ttl, session_factory=sessionmaker(bind=engine, expire_on_commit=False))
+
+
+def redis_backend(tmp_path, ttl):
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisBackend(ttl=ttl, client=fakeredis.FakeRedis())
+
+
+@pytest.fixture(params=["memory", "sql", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryBackend(ttl=60, max_entries=100)
+    if request.param == "sql":
+        return sql_backend(tmp_path, 60)
+    return redis_backend(tmp_path, 60)
+
+
+def set_name(name):
+    def update(state):
+        state.applicant.name = name
+        return state
+    return update
+
+
+def test_missing_session_is_empty(backend):
+    assert backend.get("nobody").empty
+
+
+def test_updates_are_stored_and_cleared(backend):
+    def underwritten(state):
+        state.applicant.set("age", 30)
+        state.stage = Stage.DOCUMENT_VERIFICATION
+        state.underwriting_result = {"eligible": True}
+        return state
+
+    backend.atomic_update("s1", set_name("Ravi Kumar"))
+    returned = backend.atomic_update("s1", underwritten)
+    stored = backend.get("s1")
+    assert stored.applicant.name == returned.applicant.name == "Ravi Kumar"
+    assert stored.applicant.age == 30
+    assert stored.stage == Stage.DOCUMENT_VERIFICATION
+    assert stored.underwriting_result == {"eligible": True}
+    assert backend.get("s2").empty
+
+    assert backend.clear("s1") is True
+    assert backend.clear("s1") is False
+    assert backend.get("s1").empty
+
+
+def test_read_state_is_a_copy(backend):
+    backend.atomic_update("s1", set_name("Ravi Kumar"))
+    backend.get("s1").applicant.name = "Someone Else"
+    assert backend.get("s1").applicant.name == "Ravi Kumar"
+
+
+def test_concurrent_updates_are_not_lost(backend):
+    def count(state):
+        state.applicant.set("age", (state.applicant.age or 0) + 1)
+        return state
+
+    def worker():
+        for _ in range(20):
+            backend.atomic_update("counter", count)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.get("counter").applicant.age == 80
+
+
+def test_in_memory_sessions_expire_and_are_evicted(clock):
+    backend = InMemoryBackend(ttl=60, max_entries=2)
+    backend.atomic_update("a", set_name("Anil"))
+    backend.atomic_update("b", set_name("Bina"))
+    clock[0] += 30
+    backend.get("a")  # Reading keeps a session alive and recently used
+    backend.atomic_update("c", set_name("Chitra"))
+    assert backend.get("b").empty
+    assert backend.get("a").applicant.name == "Anil"
+
+    clock[0] += 61
+    assert backend.purge_expired() == 2
+    assert backend.get("a").empty
+
+
+def test_sql_sessions_expire(tmp_path, clock):
+    backend = sql_backend(tmp_path, 60)
+    backend.atomic_update("a", set_name("Anil"))
+    clock[0] += 61
+    assert backend.get("a").empty
+    assert backend.atomic_update("a", lambda state: state).applicant.name is None
+    clock[0] += 61
+    assert backend.purge_expired() == 1
+
+
+def test_sql_reads_write_only_to_refresh_the_idle_timer(tmp_path, clock):
+    backend = sql_backend(tmp_path, 60)
+    backend.atomic_update("a", set_name("Anil"))
+    statements = []
+    event.listen(backend.session_factory.kw["bind"], "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement.split()[0]))
+
+    clock[0] += 20
+    assert backend.get("a").applicant.name == "Anil"
+    assert statements == ["BEGIN", "SELECT"]
+
+    # Past half the TTL a read refreshes it, so an active session doesn't expire
+    clock[0] += 20
+    backend.get("a")
+    assert "UPDATE" in statements
+    clock[0] += 50
+    assert backend.get("a").applicant.name == "Anil"
+
+
+def test_sql_reads_sessions_stored_as_json(tmp_path):
+    backend = sql_backend(tmp_path, 60)
+    with backend.session_factory.begin() as session:
+        session.add(backend.model(session_id="old", data='{"name": "Ravi Kumar", "_stage": "document_verification"}'))
+    state = backend.get("old")
+    assert state.applicant.name == "Ravi Kumar"
+    assert state.stage == Stage.DOCUMENT_VERIFICATION
+
+
+def test_backends_must_implement_the_interface():
+    class Incomplete(SessionBackend):
+        def get(self, session_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_create_backend_by_name():
+    assert isinstance(create_backend("memory"), InMemoryBackend)
+    with pytest.raises(ValueError):
+        create_backend("cassandra")
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend import config, metrics
+from backend.log import TraceFilter
+from backend.metrics import Histogram, MetricsMiddleware, Registry, span, timed
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("loan_test_seconds", "Test latency", labels=("stage",), buckets=(0.1, 1))
+    histogram.observe(0.05, stage="ocr")
+    histogram.observe(0.5, stage="ocr")
+    histogram.observe(5, stage="ocr")
+    assert histogram.render() == [
+        "# HELP loan_test_seconds Test latency",
+        "# TYPE loan_test_seconds histogram",
+        'loan_test_seconds_bucket{stage="ocr",le="0.1"} 1',
+        'loan_test_seconds_bucket{stage="ocr",le="1"} 2',
+        'loan_test_seconds_bucket{stage="ocr",le="+Inf"} 3',
+        'loan_test_seconds_sum{stage="ocr"} 5.55',
+        'loan_test_seconds_count{stage="ocr"} 3',
+    ]
+
+
+def test_registry_reuses_metrics_and_skips_failing_gauges():
+    registry = Registry()
+    assert registry.counter("loan_test_total", "Test") is registry.counter("loan_test_total", "Test")
+    registry.counter("loan_test_total", "Test").inc(2)
+    registry.gauge("loan_broken", "Unavailable", lambda: 1 / 0)
+    registry.gauge("loan_depth", "Queue depth", lambda: 3)
+    assert registry.render().splitlines()[-4:] == [
+        "loan_test_total 2", "# HELP loan_depth Queue depth", "# TYPE loan_depth gauge", "loan_depth 3"]
+
+
+def test_spans_join_the_current_trace():
+    @timed("async_stage")
+    async def work():
+        with span("inner"):
+            pass
+
+    trace = {"id": "t1", "spans": []}
+    token = metrics.current_trace.set(trace)
+    try:
+        asyncio.run(work())
+    finally:
+        metrics.current_trace.reset(token)
+    assert [stage for stage, _ in trace["spans"]] == ["inner", "async_stage"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config, "TRACE_REQUESTS", True)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    seen = {}
+
+    @app.get("/applications/{application_id}")
+    def read(application_id: str):
+        record = logging.LogRecord("backend.test", logging.INFO, __file__, 1, "read", None, None)
+        TraceFilter().filter(record)
+        seen["trace_id"] = record.trace_id
+        metrics.record_stage("db", 0.002)
+        return {}
+
+    return TestClient(app), seen
+
+
+def test_requests_carry_a_trace_id_and_server_timing(client):
+    client, seen = client
+    response = client.get("/applications/A-1", headers={"X-Trace-Id": "abc123"})
+    assert response.headers["x-trace-id"] == seen["trace_id"] == "abc123"
+    assert response.headers["server-timing"] == "db;dur=2.0"
+    assert client.get("/applications/A-2").headers["x-trace-id"] not in ("", "abc123")
+
+
+def test_request_latency_is_labelled_by_route_template(client):
+    client, _ = client
+    client.get("/applications/A-1")
+    client.get("/no-such-page")
+    rendered = metrics.registry.render()
+    assert 'route="/applications/{application_id}",status="200"' in rendered
+    assert 'route="/no-such-page"' not in rendered and 'route="unmatched",status="404"' in rendered
+    assert "A-1" not in rendered
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from backend import config
+from backend.agents.doc_verify import DocumentVerifier
+from backend.agents.ocr_cache import OCRCache
+from backend.agents.ocr_executor import OCRExecutor
+
+PAN_TEXT = "INCOME TAX DEPARTMENT Permanent Account Number ABCDE1234F"
+
+
+def test_key_depends_only_on_the_content(tmp_path):
+    path = tmp_path / "pan.png"
+    path.write_bytes(b"image bytes")
+    assert OCRCache.key(str(path)) == OCRCache.key(b"image bytes")
+    assert OCRCache.key(b"other bytes") != OCRCache.key(b"image bytes")
+
+
+def test_text_and_verdicts_accumulate_per_upload():
+    cache = OCRCache(max_entries=4, disk_dir="")
+    assert cache.lookup("k") is None
+    cache.store("k", PAN_TEXT, "pan", {"pan_valid": True})
+    cache.store("k", PAN_TEXT, "aadhaar", {"aadhaar_valid": False})
+    entry = cache.lookup("k")
+    assert entry == {"text": PAN_TEXT, "verdicts": {"pan": {"pan_valid": True}, "aadhaar": {"aadhaar_valid": False}}}
+    entry["verdicts"].clear()
+    assert len(cache.lookup("k")["verdicts"]) == 2
+    assert cache.stats()["hit_rate"] == round(2 / 3, 3)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = OCRCache(max_entries=2, disk_dir="")
+    cache.store("a", "text a")
+    cache.store("b", "text b")
+    cache.lookup("a")
+    cache.store("c", "text c")
+    assert cache.lookup("b") is None
+    assert cache.lookup("a")["text"] == "text a"
+
+
+def test_disk_tier_survives_a_restart_and_stays_within_its_budget(tmp_path):
+    cache = OCRCache(max_entries=4, disk_dir=str(tmp_path))
+    cache.store("a", "x" * 100, "pan", {"pan_valid": False})
+    restarted = OCRCache(max_entries=4, disk_dir=str(tmp_path))
+    assert restarted.lookup("a")["verdicts"] == {"pan": {"pan_valid": False}}
+    assert restarted.stats()["hits_disk"] == 1
+
+    small = OCRCache(max_entries=4, disk_dir=str(tmp_path), max_disk_bytes=300)
+    small.store("b", "y" * 100)
+    small.store("c", "z" * 100)
+    assert small.stats()["disk_bytes"] <= 300
+    assert not (tmp_path / "a.json").exists()
+
+
+def test_verdicts_from_another_scanner_version_are_recomputed(tmp_path):
+    OCRCache(max_entries=4, disk_dir=str(tmp_path), version="1").store("a", PAN_TEXT, "pan", {"pan_valid": False})
+    entry = OCRCache(max_entries=4, disk_dir=str(tmp_path), version="2").lookup("a")
+    assert entry == {"text": PAN_TEXT, "verdicts": {}}
+
+
+def test_identical_uploads_are_read_once(monkeypatch):
+    reads = []
+
+    def extract_text(source):
+        reads.append(source)
+        return PAN_TEXT
+
+    monkeypatch.setattr(config, "OCR_ROI", False)
+    monkeypatch.setattr(DocumentVerifier, "extract_text", staticmethod(extract_text))
+    ocr = OCRExecutor(mode="thread", workers=1, max_in_flight=2, cache=OCRCache(max_entries=4, disk_dir=""))
+    ocr.start()
+
+    async def main():
+        first = await ocr.inspect("pan", b"same image", wait=True)
+        again = await ocr.inspect("pan", b"same image", wait=True)
+        other_type = await ocr.inspect("aadhaar", b"same image", wait=True)
+        return first, again, other_type
+
+    first, again, other_type = asyncio.run(main())
+    ocr.shutdown()
+    assert first["result"]["pan_valid"] and not first["cached"]
+    assert again["cached"] and again["result"] == first["result"]
+    assert other_type["cached"] and other_type["result"]["aadhaar_valid"] is False
+    assert len(reads) == 1
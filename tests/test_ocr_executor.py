@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import pytest
+from backend.agents.ocr_executor import ExecutorSaturated, ExecutorUnavailable, OCRExecutor
+
+
+def executor(max_in_flight=1):
+    ocr = OCRExecutor(mode="thread", workers=2, max_in_flight=max_in_flight)
+    ocr.start()
+    return ocr
+
+
+def test_runs_work_on_a_worker_thread():
+    ocr = executor()
+
+    async def main():
+        return threading.get_ident(), await ocr.run(threading.get_ident)
+
+    loop_thread, worker_thread = asyncio.run(main())
+    ocr.shutdown()
+    assert worker_thread != loop_thread
+    assert ocr.stats()["completed"] == 1
+
+
+def test_full_executor_rejects_or_queues():
+    ocr = executor(max_in_flight=1)
+    release = threading.Event()
+
+    async def main():
+        busy = asyncio.ensure_future(ocr.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ExecutorSaturated):
+            await ocr.run(str, "rejected")
+        queued = asyncio.ensure_future(ocr.run(str, "queued", wait=True))
+        await asyncio.sleep(0.01)
+        assert ocr.stats()["queue_depth"] == 1
+        release.set()
+        return await busy, await queued
+
+    assert asyncio.run(main()) == (True, "queued")
+    ocr.shutdown()
+    stats = ocr.stats()
+    assert (stats["rejected"], stats["completed"], stats["in_flight"]) == (1, 2, 0)
+
+
+def test_errors_reach_the_caller_and_free_the_slot():
+    ocr = executor(max_in_flight=1)
+
+    def unreadable():
+        raise ValueError("cannot identify image file")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await ocr.run(unreadable)
+        return await ocr.run(str, "next")
+
+    assert asyncio.run(main()) == "next"
+    ocr.shutdown()
+    assert ocr.stats()["failed"] == 1
+
+
+def test_stopped_executor_is_unavailable():
+    ocr = OCRExecutor(mode="thread", workers=1, max_in_flight=1)
+    with pytest.raises(ExecutorUnavailable):
+        asyncio.run(ocr.run(str, "never"))
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import httpx
+import pytest
+from backend.models import ollama_model
+from backend.models.ollama_model import LLMBusyError, OllamaClient, get_client
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """Serves /api/generate from handle(payload) instead of a real Ollama; returns the payloads sent"""
+    sent = []
+    handlers = {}
+
+    async def handler(request):
+        payload = json.loads(request.content)
+        sent.append(payload)
+        return await handlers["handle"](payload)
+
+    def serve(handle):
+        handlers["handle"] = handle
+        return sent
+
+    monkeypatch.setattr(ollama_model.httpx, "AsyncHTTPTransport", lambda **kwargs: httpx.MockTransport(handler))
+    return serve
+
+
+async def reply(payload):
+    return httpx.Response(200, json={"response": "Hello!", "done": True, "prompt_eval_count": 12, "eval_count": 3})
+
+
+def test_one_shared_client_per_model():
+    assert get_client("model-a") is get_client("model-a")
+    assert get_client("model-a") is not get_client("model-b")
+
+
+def test_generate_keeps_the_model_loaded_and_records_usage(ollama):
+    sent = ollama(reply)
+    client = OllamaClient("test-model", base_url="http://ollama", keep_alive="10m", retries=0)
+
+    async def main():
+        text = await client.ainvoke("Hi", system="Be brief.", purpose="chat", temperature=0)
+        await client.aclose()
+        return text
+
+    assert asyncio.run(main()) == "Hello!"
+    assert sent == [{"model": "test-model", "prompt": "Hi", "stream": False, "keep_alive": "10m",
+                     "system": "Be brief.", "options": {"temperature": 0}}]
+    stats = client.stats()
+    assert (stats["calls"], stats["prompt_tokens_total"], stats["completion_tokens_total"]) == (1, 12, 3)
+    assert stats["recent_by_purpose"]["chat"]["calls"] == 1
+
+
+def test_overloaded_server_is_retried(ollama, monkeypatch):
+    statuses = [503, 200]
+
+    async def flaky(payload):
+        status = statuses.pop(0)
+        return await reply(payload) if status == 200 else httpx.Response(status)
+
+    async def no_sleep(seconds):
+        pass
+
+    sent = ollama(flaky)
+    monkeypatch.setattr(ollama_model.asyncio, "sleep", no_sleep)
+    client = OllamaClient("test-model", base_url="http://ollama", retries=1)
+    assert asyncio.run(client.ainvoke("Hi")) == "Hello!"
+    assert len(sent) == 2
+
+
+def test_calls_beyond_the_concurrency_limit_wait_then_give_up(ollama):
+    async def main():
+        release = asyncio.Event()
+
+        async def slow(payload):
+            await release.wait()
+            return await reply(payload)
+
+        ollama(slow)
+        client = OllamaClient("test-model", base_url="http://ollama", timeout=0.05, max_concurrency=1, retries=0)
+        first = asyncio.ensure_future(client.ainvoke("first"))
+        await asyncio.sleep(0.01)
+        assert client.stats()["in_flight"] == 1
+        with pytest.raises(LLMBusyError):
+            await client.ainvoke("second")
+        release.set()
+        return await first
+
+    assert asyncio.run(main()) == "Hello!"
+
+
+def test_stream_yields_tokens_as_they_arrive(ollama):
+    async def tokens(payload):
+        lines = [{"response": "Hel"}, {"response": "lo"}, {"response": "", "done": True, "eval_count": 2}]
+        return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines).encode())
+
+    sent = ollama(tokens)
+    client = OllamaClient("test-model", base_url="http://ollama", retries=0)
+
+    async def main():
+        return [chunk async for chunk in client.astream("Hi", purpose="chat")]
+
+    assert asyncio.run(main()) == ["Hel", "lo"]
+    assert sent[0]["stream"] is True
+    assert client.stats()["last_call"]["time_to_first_token_seconds"] is not None
+
+
+def test_json_generation_stops_when_the_object_closes(ollama):
+    async def rambling(payload):
+        pieces = ['{"eligible": true, ', '"reason": "a } in \\"text\\""', '}', ' and then some more', ' text']
+        lines = [{"response": piece} for piece in pieces] + [{"response": "", "done": True}]
+        return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines).encode())
+
+    sent = ollama(rambling)
+    client = OllamaClient("test-model", base_url="http://ollama", retries=0)
+    text, tokens = asyncio.run(client.agenerate_json("Decide", {"type": "object"}, num_predict=64))
+    assert json.loads(text) == {"eligible": True, "reason": 'a } in "text"'}
+    assert tokens == 3
+    assert sent[0]["format"] == {"type": "object"} and sent[0]["options"] == {"num_predict": 64}
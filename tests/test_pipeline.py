@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import pytest
+from backend.agents.decision import (ApplicationPipeline, Stage, StageSaturated, UnknownApplication,
+                                     final_decision, salary_check)
+from backend.agents.ocr_executor import OCRJobs
+from backend.memory import InMemoryBackend
+from backend.models.records import ApplicantRecord, SessionState, Stage as ApplicationStage
+
+UNDERWRITTEN = {"eligible": True, "risk_score": "Low", "next_step": "proceed_to_documents"}
+VERIFIED = {"pan": {"pan_valid": True}, "aadhaar": {"aadhaar_valid": True},
+            "salary_slip": {"salary_slip_valid": True, "net_salary": 50000}}
+
+
+def test_stage_queues_up_to_its_limit_then_refuses():
+    stage = Stage("ocr", concurrency=2, max_queue=1)
+    release = None
+
+    async def job():
+        await release.wait()
+        return "done"
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        jobs = [asyncio.ensure_future(stage.run(job)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert (stage.stats()["in_flight"], stage.stats()["queue_depth"]) == (2, 1)
+        with pytest.raises(StageSaturated):
+            await stage.run(job)
+        release.set()
+        return await asyncio.gather(*jobs)
+
+    assert asyncio.run(main()) == ["done"] * 3
+    stats = stage.stats()
+    assert (stats["completed"], stats["rejected"], stats["in_flight"]) == (3, 1, 0)
+
+
+def test_stage_counts_failures_and_frees_the_slot():
+    stage = Stage("decision", concurrency=1, max_queue=0)
+
+    def fail():
+        raise ValueError("bad input")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await stage.run(fail)
+        return await stage.run(lambda: "next")
+
+    assert asyncio.run(main()) == "next"
+    assert (stage.stats()["failed"], stage.stats()["completed"]) == (1, 1)
+
+
+def test_stage_runs_plain_functions_off_the_event_loop():
+    stage = Stage("extraction", concurrency=1, max_queue=0)
+
+    async def main():
+        return threading.get_ident(), await stage.run(threading.get_ident)
+
+    loop_thread, job_thread = asyncio.run(main())
+    assert job_thread != loop_thread
+
+
+def underwritten(salary=50000, documents=None):
+    applicant = ApplicantRecord(name="Ravi Kumar", age=30, employment_type="Salaried", salary=salary,
+                                credit_score=760, loan_amount=300000)
+    return SessionState(applicant, ApplicationStage.DOCUMENT_VERIFICATION, UNDERWRITTEN, documents)
+
+
+@pytest.mark.parametrize("state, status", [
+    (SessionState(), "not_eligible"),
+    (underwritten(), "awaiting_documents"),
+    (underwritten(documents={**VERIFIED, "pan": {"pan_valid": False}}), "documents_rejected"),
+    (underwritten(documents=VERIFIED), "approved"),
+    (underwritten(salary=80000, documents=VERIFIED), "documents_rejected"),
+])
+def test_final_decision(state, status):
+    assert final_decision(state)["status"] == status
+
+
+def test_salary_check_tolerates_small_differences():
+    assert salary_check({"net_salary": 49000}, 50000)["matches"] is True
+    assert salary_check({"net_salary": 30000}, 50000)["matches"] is False
+    assert salary_check({}, 50000) is None
+
+
+def test_documents_complete_the_application():
+    store = InMemoryBackend(ttl=60, max_entries=10)
+    pipeline = ApplicationPipeline(store)
+    store.save("s1", underwritten())
+
+    status = asyncio.run(pipeline.record_documents("s1", {"pan": VERIFIED["pan"], "passport": {"valid": True}}))
+    assert status["final_decision"]["status"] == "awaiting_documents"
+    assert list(status["documents"]) == ["pan"]
+
+    status = asyncio.run(pipeline.record_documents("s1", VERIFIED))
+    assert status["final_decision"]["status"] == "approved"
+    assert status["stage"] == pipeline.status("s1")["stage"] == ApplicationStage.APPROVED.label
+
+
+def test_documents_for_an_unknown_application_are_refused():
+    store = InMemoryBackend(ttl=60, max_entries=10)
+    pipeline = ApplicationPipeline(store)
+    with pytest.raises(UnknownApplication):
+        asyncio.run(pipeline.record_documents("nobody", VERIFIED))
+    assert store.get("nobody").empty
+    assert pipeline.status("nobody") is None
+
+
+class FakeExecutor:
+    running = True
+
+    async def verify(self, doc_type, source, wait=False, key=None):
+        await asyncio.sleep(0.01)
+        return VERIFIED[doc_type]
+
+
+def test_background_jobs_run_in_the_ocr_stage_and_count_towards_the_application():
+    store = InMemoryBackend(ttl=60, max_entries=10)
+    pipeline = ApplicationPipeline(store)
+    store.save("s1", underwritten(documents={"pan": VERIFIED["pan"], "aadhaar": VERIFIED["aadhaar"]}))
+    jobs, cleaned = OCRJobs(FakeExecutor(), max_pending=10, ttl=60), []
+
+    async def main():
+        job = jobs.submit("salary_slip", "slip.png", cleanup=lambda: cleaned.append(1),
+                          slot=pipeline.stages["ocr"].slot, session_id="s1",
+                          record=lambda result: pipeline.record_documents("s1", {"salary_slip": result}))
+        return await jobs.wait(job["job_id"], timeout=5)
+
+    job = asyncio.run(main())
+    assert job["status"] == "done" and job["session_id"] == "s1"
+    assert job["application"]["final_decision"]["status"] == "approved"
+    assert pipeline.stats()["ocr"]["completed"] == 1
+    assert cleaned == [1]
+
+
+def test_background_job_fails_when_the_ocr_stage_is_full():
+    stage = Stage("ocr", concurrency=1, max_queue=0)
+    jobs = OCRJobs(FakeExecutor(), max_pending=10, ttl=60)
+
+    async def main():
+        first = jobs.submit("pan", "pan.png", slot=stage.slot)
+        second = jobs.submit("pan", "pan-copy.png", slot=stage.slot)
+        return await jobs.wait(first["job_id"], timeout=5), await jobs.wait(second["job_id"], timeout=5)
+
+    first, second = asyncio.run(main())
+    assert first["status"] == "done"
+    assert second["status"] == "failed" and "busy" in second["error"]
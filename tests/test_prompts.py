@@ -0,0 +1,47 @@
+import asyncio
+from backend.agents import sales_agent
+from backend.agents.sales_agent import SALES_SYSTEM_PROMPT, build_sales_prompt
+from backend.models.records import ApplicantRecord
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.calls = []
+
+    async def ainvoke(self, prompt, system=None, purpose=None, **options):
+        self.calls.append((prompt, system, purpose))
+        return "What is your monthly salary in INR?"
+
+
+def test_turn_prompt_carries_only_the_session_state():
+    prompt = build_sales_prompt("I'm salaried", ApplicantRecord(name="Ravi Kumar", age=30))
+    assert prompt.splitlines() == [
+        "Collected: Full Name: Ravi Kumar; Age: 30",
+        "Still needed: Employment Type (Salaried/Self-employed), Monthly Salary (INR), Credit Score, "
+        "Loan Amount Required (INR)",
+        "Ask for: Employment Type (Salaried/Self-employed)",
+        "Customer: I'm salaried",
+        "Agent:",
+    ]
+    assert "Ravi" not in SALES_SYSTEM_PROMPT
+
+
+def test_complete_application_asks_for_the_json():
+    applicant = ApplicantRecord(name="Ravi Kumar", age=30, employment_type="Salaried", salary=60000,
+                                credit_score=760, loan_amount=300000)
+    assert "All information collected. Return the JSON now." in build_sales_prompt("that's all", applicant)
+
+
+def test_every_turn_sends_the_same_system_prefix(monkeypatch):
+    llm = RecordingLLM()
+    monkeypatch.setattr(sales_agent, "get_sales_agent", lambda: llm)
+
+    async def main():
+        await sales_agent.collect_customer_info("hello", ApplicantRecord())
+        await sales_agent.collect_customer_info("what is the interest rate?", ApplicantRecord(name="Ravi Kumar"))
+
+    asyncio.run(main())
+    (first, first_system, purpose), (second, second_system, _) = llm.calls
+    assert first_system is second_system is SALES_SYSTEM_PROMPT
+    assert purpose == "sales"
+    assert first != second and "what is the interest rate?" in second
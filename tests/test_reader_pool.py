@@ -0,0 +1,78 @@
+import threading
+import pytest
+from backend.agents.doc_verify import ReaderPool
+
+
+class FakeReader:
+    def readtext(self, image):
+        return [(None, f"text of {image}", 0.9)]
+
+
+def pool(size, created=None, fail=False):
+    pool = ReaderPool(size=size, languages=["en"])
+
+    def create_reader():
+        if fail:
+            raise RuntimeError("model download failed")
+        reader = FakeReader()
+        if created is not None:
+            created.append(reader)
+        return reader
+
+    pool._create_reader = create_reader
+    return pool
+
+
+def test_readers_are_created_on_demand_and_reused():
+    created = []
+    readers = pool(2, created)
+    with readers.reader() as first:
+        pass
+    with readers.reader() as again:
+        assert again is first
+    with readers.reader() as one, readers.reader() as two:
+        assert one is not two
+    assert len(created) == 2
+    assert readers.stats()["readers_idle"] == 2
+
+
+def test_warm_up_loads_every_reader():
+    created = []
+    readers = pool(3, created)
+    readers.warm_up()
+    readers.warm_up()
+    assert len(created) == 3
+    assert readers.stats()["readers_loaded"] == 3
+
+
+def test_callers_wait_for_a_busy_reader():
+    readers = pool(1)
+    returned = threading.Event()
+    with readers.reader() as held:
+        def use():
+            with readers.reader(timeout=5) as reader:
+                assert reader is held
+            returned.set()
+        waiter = threading.Thread(target=use)
+        waiter.start()
+        assert not returned.wait(0.05)
+    waiter.join()
+    assert returned.is_set()
+
+
+def test_waiting_for_a_reader_times_out():
+    readers = pool(1)
+    with readers.reader():
+        with pytest.raises(TimeoutError):
+            with readers.reader(timeout=0.01):
+                pass
+    assert readers.stats()["queue_depth"] == 0
+
+
+def test_failed_reader_load_frees_its_slot():
+    readers = pool(1, fail=True)
+    with pytest.raises(RuntimeError):
+        readers.warm_up()
+    assert readers.stats()["readers_loaded"] == 0
+    readers._create_reader = FakeReader
+    assert readers.readtext("page") == [(None, "text of page", 0.9)]
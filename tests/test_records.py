@@ -0,0 +1,70 @@
+import json
+import pytest
+from backend.models.records import (NAME_MAX_CHARS, ApplicantRecord, EmploymentType, SessionState, Stage,
+                                    parse_number)
+
+
+@pytest.mark.parametrize("value, expected", [("50,000", 50000), (7.5, 7.5), ("30", 30), ("", None), (None, None)])
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize("value", ["abc", True])
+def test_parse_number_rejects(value):
+    with pytest.raises(ValueError):
+        parse_number(value)
+
+
+def test_applicant_record_coerces_fields():
+    record = ApplicantRecord(name="  Ravi   Kumar ", employment_type="self employed", salary="60,000")
+    assert record.name == "Ravi Kumar"
+    assert record.employment_type is EmploymentType.SELF_EMPLOYED
+    assert record.to_dict() == {"name": "Ravi Kumar", "employment_type": "Self-employed", "salary": 60000}
+    assert record.missing() == ["age", "credit_score", "loan_amount"]
+
+
+def test_long_names_are_cut():
+    assert len(ApplicantRecord(name="x" * 70000).name) == NAME_MAX_CHARS
+
+
+def test_session_round_trip():
+    applicant = ApplicantRecord(name="Ravi Kumar", age=30, employment_type="Salaried", salary=60000,
+                                credit_score=760, loan_amount=2.5e5)
+    state = SessionState(applicant, Stage.DOCUMENT_VERIFICATION, {"eligible": True, "risk_score": "Low"},
+                         {"pan": {"pan_valid": True}}, {"status": "awaiting_documents"})
+    decoded = SessionState.decode(state.to_bytes())
+    assert decoded.applicant == applicant
+    assert decoded.stage is Stage.DOCUMENT_VERIFICATION
+    assert decoded.underwriting_result == state.underwriting_result
+    assert decoded.documents == state.documents
+    assert decoded.final_decision == state.final_decision
+
+
+def test_partial_session_round_trip():
+    # Unset numbers and employment type stay unset; zero is a value
+    state = SessionState(ApplicantRecord(name="Åsa Ñúñez", age=0))
+    decoded = SessionState.from_bytes(state.to_bytes())
+    assert decoded.applicant == state.applicant
+    assert decoded.applicant.salary is None and decoded.applicant.employment_type is None
+    assert decoded.underwriting_result is None and decoded.documents == {}
+
+
+def test_long_name_round_trip():
+    state = SessionState(ApplicantRecord(name="ब" * 70000))
+    assert SessionState.from_bytes(state.to_bytes()).applicant.name == "ब" * NAME_MAX_CHARS
+
+
+def test_decode_legacy_json_and_empty():
+    legacy = json.dumps({"name": "Ravi", "age": 30, "_stage": "document_verification",
+                         "_underwriting_result": {"eligible": True}})
+    state = SessionState.decode(legacy.encode())
+    assert state.applicant.name == "Ravi" and state.stage is Stage.DOCUMENT_VERIFICATION
+    assert state.underwriting_result == {"eligible": True}
+    assert SessionState.decode(None).empty
+
+
+def test_unknown_encoding_version():
+    data = bytearray(SessionState().to_bytes())
+    data[0] = 99
+    with pytest.raises(ValueError):
+        SessionState.from_bytes(bytes(data))
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from backend import config
+from backend.agents import sales_agent
+from backend.agents.response_templates import QUESTIONS, ResponseTemplates
+from backend.models.records import ApplicantRecord
+
+
+def test_captured_field_gets_the_next_question():
+    templates = ResponseTemplates()
+    applicant = ApplicantRecord(name="Ravi Kumar")
+    assert templates.render(["name"], applicant) == "Nice to meet you, Ravi! How old are you?"
+
+    applicant.set("age", 30)
+    assert templates.render(["age"], applicant) == (
+        "Thanks, I've noted your age as 30. Are you salaried or self-employed?")
+
+
+def test_several_fields_in_one_message():
+    applicant = ApplicantRecord(name="Ravi Kumar", age=30, employment_type="Salaried", salary=60000)
+    reply = ResponseTemplates().render(["employment_type", "salary"], applicant)
+    assert reply == f"Thanks, I've noted your employment type and monthly salary. {QUESTIONS['credit_score']}"
+
+
+@pytest.mark.parametrize("captured, applicant", [
+    ([], ApplicantRecord(name="Ravi Kumar")),  # nothing captured: a question or small talk
+    (["loan_amount"], ApplicantRecord(name="Ravi Kumar", age=30, employment_type="Salaried", salary=60000,
+                                      credit_score=760, loan_amount=300000)),  # nothing left to ask
+])
+def test_off_script_turns_go_to_the_llm(captured, applicant):
+    templates = ResponseTemplates()
+    assert templates.render(captured, applicant) is None
+    assert templates.stats()["llm_replies"] == 1
+
+
+def test_hit_rate():
+    templates = ResponseTemplates()
+    templates.render(["name"], ApplicantRecord(name="Ravi"))
+    templates.render([], ApplicantRecord(name="Ravi"))
+    assert templates.stats() == {"template_replies": 1, "llm_replies": 1, "template_hit_rate": 0.5}
+
+
+def test_templated_turns_skip_the_model(monkeypatch):
+    def no_model():
+        raise AssertionError("the LLM was called")
+
+    monkeypatch.setattr(sales_agent, "get_sales_agent", no_model)
+    reply = asyncio.run(sales_agent.collect_customer_info("I'm Ravi Kumar", ApplicantRecord(name="Ravi Kumar"), ["name"]))
+    assert reply == "Nice to meet you, Ravi! How old are you?"
+
+    monkeypatch.setattr(config, "CHAT_TEMPLATES", False)
+    with pytest.raises(AssertionError):
+        asyncio.run(sales_agent.collect_customer_info("I'm Ravi Kumar", ApplicantRecord(name="Ravi Kumar"), ["name"]))
@@ -0,0 +1,68 @@
+import asyncio
+import uuid
+import threading
+import pytest
+from backend.api import sales_routes
+from backend.memory import memory
+from backend.models.records import ApplicantRecord, Stage
+
+APPLICANT = dict(name="Ravi Kumar", age=30, employment_type="Salaried", salary=60000,
+                 credit_score=760, loan_amount=300000)
+
+
+@pytest.fixture
+def decide(monkeypatch):
+    """Make the underwriter return the given decision without calling the LLM"""
+    def set_decision(decision):
+        async def underwrite(applicant):
+            return dict(decision)
+        monkeypatch.setattr(sales_routes, "underwrite", underwrite)
+    return set_decision
+
+
+def new_session():
+    session_id = f"test-{uuid.uuid4()}"
+    memory.atomic_update(session_id, lambda state: state)
+    return session_id
+
+
+def test_eligible_application_moves_on_to_documents(decide):
+    decide({"eligible": True, "next_step": "proceed_to_documents", "reason": "Meets all criteria"})
+    session_id = new_session()
+    reply = asyncio.run(sales_routes.underwriting_reply(session_id, ApplicantRecord(**APPLICANT)))
+    assert reply["status"] == "eligible_for_documents"
+    assert reply["collected_data"]["name"] == "Ravi Kumar"
+    state = memory.get(session_id)
+    assert state.stage == Stage.DOCUMENT_VERIFICATION
+    assert state.underwriting_result["eligible"] is True
+    memory.clear(session_id)
+
+
+def test_rejected_application_ends_the_session(decide):
+    decide({"eligible": False, "next_step": "end", "reason": "Credit score too low"})
+    session_id = new_session()
+    reply = asyncio.run(sales_routes.underwriting_reply(session_id, ApplicantRecord(**APPLICANT)))
+    assert reply["status"] == "rejected"
+    assert "Credit score too low" in reply["agent_reply"]
+    assert memory.get(session_id).empty
+
+
+@pytest.mark.parametrize("eligible", [True, False])
+def test_session_writes_stay_off_the_event_loop(decide, monkeypatch, eligible):
+    decide({"eligible": eligible, "next_step": "proceed_to_documents" if eligible else "end"})
+    session_id = new_session()
+    threads = []
+    for name in ("atomic_update", "clear"):
+        def record(*args, _call=getattr(memory, name)):
+            threads.append(threading.get_ident())
+            return _call(*args)
+        monkeypatch.setattr(memory, name, record)
+
+    async def reply():
+        loop_thread = threading.get_ident()
+        await sales_routes.underwriting_reply(session_id, ApplicantRecord(**APPLICANT))
+        return loop_thread
+
+    loop_thread = asyncio.run(reply())
+    assert threads and loop_thread not in threads
+    memory.clear(session_id)
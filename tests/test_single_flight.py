@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from backend.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_computation():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "text"
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.run("key", compute) for _ in range(3)))
+        assert len(flights) == 0
+        return results
+
+    assert asyncio.run(main()) == [("text", False), ("text", True), ("text", True)]
+    assert len(calls) == 1
+
+
+def test_owner_cancelled_waiter_still_gets_the_result():
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "text"
+
+    async def main():
+        flights = SingleFlight()
+        owner = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        assert await waiter == ("text", True)
+        assert owner.cancelled()
+
+    asyncio.run(main())
+
+
+def test_errors_reach_every_caller():
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("unreadable")
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(flights.run("key", compute), flights.run("key", compute),
+                                       return_exceptions=True)
+        assert [type(result) for result in results] == [ValueError, ValueError]
+        # The failure isn't kept: the next call computes again
+        with pytest.raises(ValueError):
+            await flights.run("key", compute)
+        assert len(flights) == 0
+
+    asyncio.run(main())
+
+
+def test_keys_are_independent():
+    async def main():
+        flights = SingleFlight()
+
+        async def compute(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        return await asyncio.gather(flights.run("a", lambda: compute(1)), flights.run("b", lambda: compute(2)))
+
+    assert asyncio.run(main()) == [(1, False), (2, False)]
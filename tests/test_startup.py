@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import pytest
+from backend import config, startup
+from backend.startup import WarmUp, subsystems
+
+
+@pytest.mark.parametrize("role, expected", [("all", ("chat", "ocr")), (" Chat ", ("chat",)), ("ocr", ("ocr",))])
+def test_subsystems_per_role(role, expected):
+    assert subsystems(role) == expected
+
+
+def test_unknown_role_is_refused():
+    with pytest.raises(ValueError, match="WORKER_ROLE"):
+        subsystems("gpu")
+
+
+def test_chat_workers_never_load_the_ocr_stack():
+    code = ("import json, sys, backend.main as main; "
+            "print(json.dumps([sorted(main.endpoints), [m for m in ('cv2', 'easyocr', 'torch') if m in sys.modules]]))")
+    env = {**os.environ, "WORKER_ROLE": "chat", "LOG_LEVEL": "WARNING"}
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    endpoints, loaded = json.loads(output.splitlines()[-1])
+    assert "chat" in endpoints and "documents" not in endpoints
+    assert loaded == []
+
+
+def test_readiness_waits_for_every_step():
+    async def main():
+        release = asyncio.Event()
+
+        async def llm():
+            await release.wait()
+
+        async def ocr():
+            pass
+
+        warm_up = WarmUp()
+        warm_up.start({"llm": llm, "ocr": ocr})
+        await asyncio.sleep(0.01)
+        before = warm_up.ready, {name: step["status"] for name, step in warm_up.steps.items()}
+        release.set()
+        await asyncio.sleep(0.01)
+        return before, warm_up.ready
+
+    before, after = asyncio.run(main())
+    assert before == (False, {"llm": "pending", "ocr": "ready"})
+    assert after
+
+
+def test_failed_step_keeps_the_worker_unready():
+    async def broken():
+        raise RuntimeError("no GPU")
+
+    async def main():
+        warm_up = WarmUp()
+        warm_up.start({"ocr": broken})
+        await asyncio.sleep(0.01)
+        return warm_up.status()
+
+    status = asyncio.run(main())
+    assert not status["ready"]
+    assert status["steps"]["ocr"] == {"status": "failed", "seconds": None, "error": "no GPU"}
+
+
+def test_llm_priming_retries_until_ollama_answers(monkeypatch):
+    calls = []
+
+    class Client:
+        async def agenerate(self, prompt, system=None, purpose=None, **options):
+            calls.append((purpose, options))
+            if len(calls) < 3:
+                raise ConnectionError("Ollama is starting")
+            return "Hi", {}
+
+    monkeypatch.setattr("backend.models.ollama_model.get_client", lambda: Client())
+    monkeypatch.setattr(config, "LLM_WARM_RETRY_SECONDS", 0)
+    asyncio.run(startup.prime_llm())
+    assert calls == [("warmup", {"num_predict": 1})] * 3
@@ -0,0 +1,154 @@
+import asyncio
+import pytest
+from pydantic import ValidationError
+from backend import config
+from backend.agents import underwriter
+from backend.agents.decision_cache import decision_cache
+from backend.agents.rules import normalize_applicant, rule_engine
+from backend.agents.underwriter import DECISION_SCHEMA, UnderwritingDecision
+from backend.models.records import ApplicantRecord
+
+APPLICANT = {"age": 30, "employment_type": "Salaried", "salary": 60000, "credit_score": 760, "loan_amount": 300000}
+
+
+def evaluate(**changes):
+    return rule_engine.evaluate({**APPLICANT, **changes})
+
+
+def test_clear_approval():
+    decision = evaluate()
+    assert decision.eligible and not decision.borderline
+    assert decision.risk_score == "Low"
+    assert decision.as_result()["next_step"] == "proceed_to_documents"
+
+
+@pytest.mark.parametrize("changes, eligible", [
+    ({"credit_score": 655}, True),     # within 15 points above the minimum
+    ({"credit_score": 640}, False),    # within 15 points below it
+    ({"salary": 21000}, True),         # within ₹2,000 of the minimum
+    ({"salary": 19000}, False),
+    ({"age": 21}, True),
+    ({"age": 56}, False),              # 61 at maturity, one year over
+    ({"loan_amount": 60000 * 24 + 1}, False),  # within 5% of the 24x salary cap
+])
+def test_values_near_a_limit_are_borderline(changes, eligible):
+    decision = evaluate(**changes)
+    assert decision.eligible is eligible
+    assert decision.borderline
+
+
+@pytest.mark.parametrize("changes", [
+    {"credit_score": 600},
+    {"loan_amount": 60000 * 24 * 1.2},
+    {"employment_type": "Student"},
+])
+def test_clear_failures_are_not_borderline(changes):
+    decision = evaluate(**changes)
+    assert not decision.eligible and not decision.borderline
+    assert decision.failures
+
+
+def test_a_clear_failure_outweighs_a_near_limit():
+    decision = evaluate(credit_score=655, salary=10000)
+    assert not decision.eligible and not decision.borderline
+
+
+@pytest.mark.parametrize("changes, risk", [
+    ({"credit_score": 690}, "Medium"),
+    ({"credit_score": 640}, "High"),
+    ({"salary": 25000}, "High"),
+])
+def test_risk_tiers(changes, risk):
+    assert evaluate(**changes).risk_score == risk
+
+
+def test_normalize_applicant():
+    data = normalize_applicant({"age": "30", "salary": "60,000", "employment_type": " salaried "})
+    assert data["age"] == 30 and data["salary"] == 60000 and data["credit_score"] == 0
+    assert data["employment_type"] == "Salaried"
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Replaces the model with a fake one that approves everything; returns the applications it saw"""
+    calls = []
+
+    async def llm_decision(customer_data):
+        calls.append(customer_data)
+        return {"eligible": True, "risk_score": "Medium", "reason": "Model decision",
+                "next_step": "proceed_to_documents"}, True
+
+    monkeypatch.setattr(underwriter, "_llm_decision", llm_decision)
+    monkeypatch.setattr(config, "UNDERWRITING_LLM_REASON", False)
+    decision_cache.clear()
+    yield calls
+    decision_cache.clear()
+
+
+def underwrite(**changes):
+    return asyncio.run(underwriter.underwrite(ApplicantRecord(name="Ravi Kumar", **{**APPLICANT, **changes})))
+
+
+@pytest.mark.parametrize("mode", ["rules", "hybrid"])
+def test_clear_cases_skip_the_llm(llm, monkeypatch, mode):
+    monkeypatch.setattr(config, "UNDERWRITING_MODE", mode)
+    assert underwrite()["decided_by"] == "rules"
+    rejected = underwrite(credit_score=550)
+    assert rejected["eligible"] is False and rejected["decided_by"] == "rules"
+    assert llm == []
+
+
+def test_borderline_cases_go_to_the_llm_in_hybrid_mode(llm, monkeypatch):
+    monkeypatch.setattr(config, "UNDERWRITING_MODE", "hybrid")
+    result = underwrite(credit_score=645)
+    assert result["decided_by"] == "llm" and result["reason"] == "Model decision"
+    assert llm[0]["credit_score"] == 645
+
+    monkeypatch.setattr(config, "UNDERWRITING_MODE", "rules")
+    assert underwrite(credit_score=640)["decided_by"] == "rules"
+    assert len(llm) == 1
+
+
+def test_decision_schema():
+    decision = UnderwritingDecision.model_validate_json('{"eligible": true, "risk_score": "Low", "reason": "ok"}')
+    assert decision.eligible and decision.risk_score == "Low"
+    assert DECISION_SCHEMA["required"] == ["eligible", "risk_score", "reason"]
+
+
+@pytest.mark.parametrize("reply", [
+    '{"eligible": true, "risk_score": "Very low", "reason": "ok"}',
+    '{"eligible": true, "risk_score": "Low"}',
+    '{"eligible": true, "risk_score": "Low", "reason": "' + "x" * 301 + '"}',
+])
+def test_decision_schema_rejects(reply):
+    with pytest.raises(ValidationError):
+        UnderwritingDecision.model_validate_json(reply)
+
+
+class SchemaLLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    async def agenerate_json(self, prompt, schema, system=None, purpose=None, **options):
+        self.calls.append((schema, options))
+        return self.reply, 12
+
+
+@pytest.mark.parametrize("reply, decided_by", [
+    ('{"eligible": false, "risk_score": "High", "reason": "Debt too high"}', "llm"),
+    ('{"eligible": true, "risk_score": "Low"', "rules"),  # cut off: fall back to the rules
+])
+def test_llm_replies_are_parsed_against_the_schema(monkeypatch, reply, decided_by):
+    llm = SchemaLLM(reply)
+    monkeypatch.setattr(underwriter, "get_underwriter_agent", lambda: (llm, "system"))
+    monkeypatch.setattr(config, "UNDERWRITING_MODE", "llm")
+    decision_cache.clear()
+    result = underwrite(credit_score=700 + len(reply))
+    decision_cache.clear()
+    assert result["decided_by"] == decided_by
+    assert llm.calls[0] == (DECISION_SCHEMA, {"num_predict": config.UNDERWRITING_MAX_TOKENS})
+    if decided_by == "llm":
+        assert (result["eligible"], result["next_step"]) == (False, "rejected")
+    else:
+        assert result["eligible"] is True and result["reason"]
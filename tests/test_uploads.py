@@ -0,0 +1,98 @@
+import asyncio
+import os
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from backend import config
+from backend.api.uploads import UploadLimitMiddleware, discard, sniff, spool_upload
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 100
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "UPLOAD_MAX_BYTES", 1000)
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(tmp_path))
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        upload = await spool_upload(file)
+        with open(upload.path, "rb") as spooled:
+            content = spooled.read()
+        discard(upload)
+        return {"size": upload.size, "key": upload.key, "same": content == PNG}
+
+    app.add_middleware(UploadLimitMiddleware, limits={"/upload": 2000})
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("head, kind", [
+    (PNG, "image/png"),
+    (b"\xff\xd8\xff\xe0", "image/jpeg"),
+    (b"RIFF\0\0\0\0WEBPVP8 ", "image/webp"),
+    (b"%PDF-1.7\n", "application/pdf"),
+    (b"MZ\x90\0", None),
+    (b"<html>", None),
+])
+def test_sniff(head, kind):
+    assert sniff(head) == kind
+
+
+def test_spools_and_hashes_the_upload(client, tmp_path):
+    response = client.post("/upload", files={"file": ("pan.png", PNG, "image/png")})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["size"] == len(PNG) and body["same"] and len(body["key"]) > 0
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("filename, content, content_type", [
+    ("notes.txt", PNG, "text/plain"),                         # declared type
+    ("pan.png", b"MZ\x90\0" + b"\0" * 50, "image/png"),      # real type
+    ("pan.png", b"MZ\x90\0" + b"\0" * 50, "application/octet-stream"),
+])
+def test_unsupported_type_is_415(client, tmp_path, filename, content, content_type):
+    response = client.post("/upload", files={"file": (filename, content, content_type)})
+    assert response.status_code == 415
+    assert os.listdir(tmp_path) == []
+
+
+def test_oversized_file_is_413(client, tmp_path):
+    response = client.post("/upload", files={"file": ("pan.png", PNG + b"\0" * 1000, "image/png")})
+    assert response.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+def test_empty_file_is_400(client):
+    assert client.post("/upload", files={"file": ("pan.png", b"", "image/png")}).status_code == 400
+
+
+def test_body_over_the_limit_is_413_before_it_is_read(client, tmp_path):
+    response = client.post("/upload", files={"file": ("pan.png", PNG + b"\0" * 5000, "image/png")})
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Upload larger than 2000 bytes"
+    assert os.listdir(tmp_path) == []
+
+
+def test_chunked_body_stops_at_the_limit():
+    read = []
+
+    async def receive():
+        read.append(500)
+        return {"type": "http.request", "body": b"\0" * 500, "more_body": True}
+
+    async def app(scope, receive, send):
+        while True:
+            await receive()
+
+    middleware = UploadLimitMiddleware(app, limits={"/upload": 2000})
+    scope = {"type": "http", "path": "/upload", "headers": [(b"transfer-encoding", b"chunked")]}
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(middleware(scope, receive, None))
+    assert error.value.status_code == 413
+    assert sum(read) == 2500
+
+
+def test_other_paths_are_not_limited(client):
+    assert client.post("/elsewhere", content=b"\0" * 5000).status_code == 404
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend import config
+from backend.agents import pdf_pages
+from backend.agents.decision import Stage, StageSaturated
+from backend.agents.doc_verify import DocumentVerifier
+from backend.agents.ocr_cache import OCRCache
+from backend.agents.ocr_executor import OCRExecutor
+from backend.api import document_router
+
+PAN_TEXT = "INCOME TAX DEPARTMENT GOVT. OF INDIA Permanent Account Number ABCDE1234F"
+PDF = b"%PDF-1.7\n% a test document, never parsed\n"
+
+
+def executor(workers=1):
+    ocr = OCRExecutor(mode="thread", workers=workers, max_in_flight=4, cache=OCRCache(max_entries=16, disk_dir=""))
+    ocr.start()
+    return ocr
+
+
+@pytest.fixture
+def pdf(monkeypatch):
+    """A PDF of the given page texts, read without pdfium or OCR; returns the pages read"""
+    read = []
+
+    def make(*texts):
+        def extract_page_text(source, index):
+            read.append(index)
+            return texts[index]
+        monkeypatch.setattr(pdf_pages, "page_count", lambda source: len(texts))
+        monkeypatch.setattr(DocumentVerifier, "extract_page_text", staticmethod(extract_page_text))
+        return read
+    return make
+
+
+def test_pdf_is_recognised_by_its_header(tmp_path):
+    path = tmp_path / "slip.pdf"
+    path.write_bytes(b"\r\n" + PDF)
+    assert pdf_pages.is_pdf(str(path))
+    assert pdf_pages.is_pdf(PDF)
+    assert not pdf_pages.is_pdf(b"\x89PNG\r\n\x1a\n")
+
+
+def test_pdf_reading_stops_at_the_first_page_that_passes(pdf):
+    read = pdf("cover letter", PAN_TEXT, "terms and conditions", "more terms")
+    ocr = executor(workers=1)
+    report = asyncio.run(ocr.inspect("pan", PDF, wait=True))
+    ocr.shutdown()
+    assert report["result"]["pan_valid"] is True
+    assert (report["pages"], report["pages_read"]) == (4, 2)
+    assert read == [0, 1]
+
+
+def test_pdf_that_never_passes_is_read_to_the_end(pdf):
+    read = pdf("page one", "page two", "page three")
+    ocr = executor(workers=2)
+    report = asyncio.run(ocr.inspect("pan", PDF, wait=True))
+    ocr.shutdown()
+    assert report["result"]["pan_valid"] is False
+    assert report["pages_read"] == 3
+    assert sorted(read) == [0, 1, 2]
+
+
+def test_batch_reports_every_document_and_isolates_failures(pdf):
+    pdf(PAN_TEXT)
+    ocr = executor(workers=2)
+    inspect = ocr.inspect
+
+    async def failing_inspect(doc_type, source, wait=False, key=None):
+        if source == b"broken":
+            raise ValueError("Unreadable PDF")
+        return await inspect(doc_type, source, wait=wait, key=key)
+
+    ocr.inspect = failing_inspect
+    documents = [("pan", "pan.pdf", PDF, None), ("aadhaar", "aadhaar.pdf", b"broken", None)]
+    report = asyncio.run(ocr.verify_batch(documents))
+    ocr.shutdown()
+    first, second = report["documents"]
+    assert (first["filename"], first["result"]["pan_valid"]) == ("pan.pdf", True)
+    assert second["result"] == {"error": "Unreadable PDF"}
+    assert report["all_verified"] is False
+
+
+def test_batch_fails_when_the_stage_turns_a_document_away():
+    ocr = executor(workers=2)
+    started = []
+
+    async def slow_inspect(doc_type, source, wait=False, key=None):
+        started.append(doc_type)
+        await asyncio.sleep(0.05)
+        return {"document_type": doc_type, "result": {"pan_valid": True}}
+
+    ocr.inspect = slow_inspect
+    documents = [("pan", "pan.pdf", PDF, None), ("aadhaar", "aadhaar.pdf", PDF, None)]
+    with pytest.raises(StageSaturated):
+        asyncio.run(ocr.verify_batch(documents, slot=Stage("ocr", concurrency=1, max_queue=0).slot))
+    ocr.shutdown()
+    assert started == ["pan"]
+
+
+def test_saturated_batch_route_is_429(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(tmp_path))
+
+    async def verify_batch(documents, slot=None):
+        raise StageSaturated("ocr stage is busy, 8 jobs already waiting")
+
+    monkeypatch.setattr(document_router.ocr_executor, "verify_batch", verify_batch)
+    app = FastAPI()
+    app.include_router(document_router.router, prefix="/documents")
+    response = TestClient(app).post("/documents/verify_batch", data={"doc_types": "pan"},
+                                    files={"files": ("pan.pdf", PDF, "application/pdf")})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"]